@@ -0,0 +1,230 @@
+"""Vectorized backtesting of the live confluence rules on stored candles."""
+
+import heapq
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from patterns import PatternScanner
+from risk import RiskManager
+import decision
+from signals import DIRECTIONS, min_confluences
+from technical import TechnicalAnalyzer
+from utils import get_logger
+
+
+class IndicatorCache:
+    """Indicator columns of one candle series, computed once and reused.
+
+    The fixed-period M5 indicators and candlestick patterns are computed on
+    construction; moving averages, volume means and breakouts are memoized
+    per period, so evaluating many parameter sets on the same series only
+    pays for the periods it has not seen yet.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = TechnicalAnalyzer().add_m5_indicators(df.copy())
+        self.close = self.df['close'].to_numpy(dtype=float)
+        self.pattern = PatternScanner().first_pattern(self.df)
+        self._columns = {}
+
+    def _memo(self, key, compute):
+        if key not in self._columns:
+            self._columns[key] = compute()
+        return self._columns[key]
+
+    def ma(self, period: int) -> np.ndarray:
+        return self._memo(('ma', period), lambda: self.df['close'].rolling(period).mean().to_numpy())
+
+    def trend(self, fast: int, slow: int) -> np.ndarray:
+        def compute():
+            ma_fast, ma_slow = self.ma(fast), self.ma(slow)
+            with np.errstate(invalid='ignore'):
+                return np.where(ma_fast > ma_slow, "up", np.where(ma_fast < ma_slow, "down", "flat"))
+        return self._memo(('trend', fast, slow), compute)
+
+    def volume_ratio(self, period: int) -> np.ndarray:
+        def compute():
+            volume = self.df['volume'].to_numpy(dtype=float)
+            avg_volume = self.df['volume'].rolling(period).mean().to_numpy()
+            with np.errstate(invalid='ignore', divide='ignore'):
+                return np.where(avg_volume > 0, volume / avg_volume, 0.0)
+        return self._memo(('volume_ratio', period), compute)
+
+    def breakouts(self, lookback: int) -> np.ndarray:
+        return self._memo(('breakout', lookback), lambda: TechnicalAnalyzer().detect_breakouts(self.df, lookback=lookback))
+
+    def signals(self, config: dict, ml_high=False) -> tuple:
+        """Return ``(trend, breakout, volume_ratio, direction, confluence matrix)`` for *config*."""
+        trend = self.trend(config['trend_ma_fast'], config['trend_ma_slow'])
+        breakout = self.breakouts(config.get('breakout_lookback', 50))
+        volume_ratio = self.volume_ratio(config['volume_period'])
+        direction, matrix = decision.score(self.df, trend, breakout, self.pattern, volume_ratio, ml_high)
+        return trend, breakout, volume_ratio, direction, matrix
+
+
+def compute_signals(df: pd.DataFrame, config: dict, ml_high=False, cache: IndicatorCache = None) -> pd.DataFrame:
+    """Evaluate the live entry rules on every candle of *df*.
+
+    Indicators are computed once over the whole series with the batch
+    pandas-ta path (or taken from *cache*). The result holds the trade
+    direction (``1`` call, ``-1`` put, ``0`` none), the confluence count and
+    the ML feature columns the live loop would have logged for each candle.
+    *ml_high* may be a scalar or an array with one value per candle.
+    """
+    cache = cache or IndicatorCache(df)
+    trend, breakout, volume_ratio, direction, matrix = cache.signals(config, ml_high)
+    return pd.DataFrame(
+        {
+            'close': cache.close,
+            'direction': direction,
+            'confluences': matrix.sum(axis=1),
+            **decision.feature_columns(cache.df, trend, breakout, cache.pattern, volume_ratio),
+        },
+        index=cache.df.index,
+    )
+
+
+def _asset_candidates(asset, df, config, payout, ml_high, expiry_bars, min_count):
+    """Return the entries the live rules would take on *asset*, with their outcome."""
+    signals = compute_signals(df, config, ml_high)
+    close = signals['close'].to_numpy()
+    direction = signals['direction'].to_numpy()
+    entries = np.flatnonzero((direction != 0) & (signals['confluences'].to_numpy() >= min_count))
+    entries = entries[entries + expiry_bars < len(signals)]
+    exits = entries + expiry_bars
+    # A tie at expiry is counted as a loss.
+    win = direction[entries] * (close[exits] - close[entries]) > 0
+    return pd.DataFrame({
+        'time': signals.index[entries],
+        'expiry': signals.index[exits],
+        'asset': asset,
+        'direction': direction[entries],
+        'confluences': signals['confluences'].to_numpy()[entries],
+        'payout': payout,
+        'win': win,
+    })
+
+
+class BacktestResult:
+    """Trades taken by a backtest run and their per-asset summary."""
+
+    def __init__(self, trades: pd.DataFrame):
+        self.trades = trades
+
+    def summary(self) -> pd.DataFrame:
+        """Return trades, wins, win rate and profit per asset plus a total row."""
+        grouped = self.trades.groupby('asset')
+        summary = pd.DataFrame({
+            'trades': grouped.size(),
+            'wins': grouped['win'].sum(),
+            'profit': grouped['profit'].sum(),
+        })
+        summary.loc['TOTAL'] = summary.sum()
+        summary['win_rate'] = summary['wins'] / summary['trades']
+        return summary
+
+
+class Backtester:
+    """Replay stored OHLCV for many assets through the live signal logic.
+
+    Signals are computed vectorized per asset (optionally in a process
+    pool). Binary options expire ``trade_duration`` minutes after entry; only
+    the resulting entries are then walked in time order to apply
+    :class:`RiskManager` sizing and portfolio limits (positions stay open
+    until they expire), one open position per asset and the daily
+    ``stop_win_victories`` limit, mirroring ``bot.main``.
+    """
+
+    def __init__(self, config: dict, workers: int = 0):
+        self.config = config
+        self.workers = workers
+
+    def _payout(self, payouts, asset):
+        if isinstance(payouts, dict):
+            return payouts.get(asset, 0)
+        return payouts
+
+    def candidates(self, candles: dict, payouts=0.8, ml_high=False) -> pd.DataFrame:
+        """Return every entry signal for *candles* (``asset -> OHLCV DataFrame``)."""
+        config = self.config
+        timeframe = config['timeframe_main']
+        duration = config.get('trade_duration', int(timeframe / 60))
+        expiry_bars = max(1, int(round(duration * 60 / timeframe)))
+        min_count = min_confluences("media")
+
+        jobs = []
+        for asset, df in candles.items():
+            payout = self._payout(payouts, asset)
+            if payout < config['min_payout'] or payout > config['max_payout']:
+                continue
+            asset_ml = ml_high.get(asset, False) if isinstance(ml_high, dict) else ml_high
+            jobs.append((asset, df, config, payout, asset_ml, expiry_bars, min_count))
+
+        if self.workers and len(jobs) > 1:
+            with ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+                frames = list(pool.map(_asset_candidates, *zip(*jobs)))
+        else:
+            frames = [_asset_candidates(*job) for job in jobs]
+
+        frames = [f for f in frames if not f.empty]
+        if not frames:
+            return pd.DataFrame(columns=['time', 'expiry', 'asset', 'direction', 'confluences', 'payout', 'win'])
+        return pd.concat(frames, ignore_index=True).sort_values('time', kind='stable', ignore_index=True)
+
+    def run(self, candles: dict, payouts=0.8, ml_high=False, quiet: bool = True) -> BacktestResult:
+        """Backtest *candles* and return the trades actually taken.
+
+        *payouts* is a single payout or a dict per asset; *ml_high* a bool,
+        a per-candle array or a dict of either per asset. With *quiet* the
+        per-trade risk log lines are suppressed for the duration of the run.
+        """
+        entries = self.candidates(candles, payouts, ml_high)
+        risk = RiskManager.from_config(self.config, assets=list(candles))
+        stop_win_victories = self.config['stop_win_victories']
+
+        logger = get_logger()
+        level = logger.level
+        if quiet:
+            logger.setLevel(logging.WARNING)
+        try:
+            taken = []
+            busy_until = {}
+            pending = []  # (expiry, order, asset, win, amount, payout) of open positions
+            day = None
+            times = entries['time'].to_numpy(dtype='datetime64[ns]')
+            days = times.astype('datetime64[D]')
+            expiries = entries['expiry'].to_numpy(dtype='datetime64[ns]')
+            columns = [entries[c].to_numpy() for c in ('asset', 'direction', 'confluences', 'payout', 'win')]
+            for i, (asset, direction, confluences, payout, win) in enumerate(zip(*columns)):
+                while pending and pending[0][0] <= times[i]:
+                    _, _, settled, settled_win, settled_amount, settled_payout = heapq.heappop(pending)
+                    # Wins count towards the daily stop when they settle, as in the live loop.
+                    risk.register_trade(settled, settled_win, amount=settled_amount, payout=settled_payout)
+                if days[i] != day:
+                    day = days[i]
+                    risk.roll_day(day)
+                if risk.daily_wins >= stop_win_victories:
+                    continue
+                if asset in busy_until and times[i] < busy_until[asset]:
+                    continue
+                if not risk.can_trade(asset, risk.stake(asset, high_chance=True, payout=payout)):
+                    continue
+                win = bool(win)
+                amount = risk.next_amount(asset, high_chance=True, payout=payout)
+                risk.open_trade(asset, amount)
+                heapq.heappush(pending, (expiries[i], i, asset, win, amount, payout))
+                busy_until[asset] = expiries[i]
+                profit = amount * payout if win else -amount
+                taken.append((times[i], asset, DIRECTIONS[direction], confluences, amount, payout, win, profit))
+        finally:
+            logger.setLevel(level)
+
+        trades = pd.DataFrame(
+            taken,
+            columns=['time', 'asset', 'direction', 'confluences', 'amount', 'payout', 'win', 'profit'],
+        )
+        return BacktestResult(trades)
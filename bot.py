@@ -1,238 +1,489 @@
 import logging
+import sys
 import time
+
+# Process start, for the time-to-first-decision measurement (before the heavy imports).
+_STARTED = time.perf_counter()
+import numpy as np
 import pandas as pd
-from iqoptionapi.stable_api import IQ_Option
-from utils import log, load_config, entry_strength
+from utils import STRENGTH_LEVELS, configure_logging, entry_strength, load_asset_overrides, load_config, log, log_enabled
 from fundamental import FundamentalAnalyzer
 from technical import TechnicalAnalyzer
 from risk import RiskManager
 from ml_model import MLModel
+from scanner import AssetScanner, analyze_candles
+from candle_store import CandleStore
+from candle_history import CandleHistory
+from candle_source import PollingSource, StreamingSource
+from multi_timeframe import MultiTimeframeEngine
+from order_tracker import OrderTracker
+from connection import CircuitOpenError, ConnectionSupervisor
+from metrics import Metrics
+from scheduler import CLOSE, INTRA, CandleScheduler
+from signals import DIRECTIONS, SIGNALS, signal_names
+import decision
+import snapshot
 
 # Reduz nível de log global
 logging.getLogger().setLevel(logging.CRITICAL)
 
 
-def safe_get_candles_df(IQ, asset, timeframe, num_candles):
+def safe_get_candles(connection, asset, timeframe, num_candles, clock=time):
     """
-    Tenta obter velas até 3 vezes, reconectando em caso de falha.
-    Retorna um DataFrame com colunas OHLCV.
+    Obtém velas pela conexão supervisionada, que reconecta (com backoff) e
+    repete a chamada até 3 vezes em caso de falha.
+    Retorna a lista de velas como entregue pela API.
     """
-    for attempt in range(3):
-        try:
-            root_logger = logging.getLogger()
-            prev_level = root_logger.getEffectiveLevel()
-            root_logger.setLevel(logging.WARNING)
+    def get_candles(api):
+        candles = api.get_candles(asset, timeframe, num_candles, clock.time())
+        if not candles or not isinstance(candles, list):
+            raise ValueError("Resposta de velas inválida ou vazia")
+        return candles
 
-            try:
-                candles = IQ.get_candles(asset, timeframe, num_candles, time.time())
-            finally:
-                root_logger.setLevel(prev_level)
-
-            if not candles or not isinstance(candles, list):
-                raise ValueError("Resposta de velas inválida ou vazia")
-
-            df = pd.DataFrame(candles)
-            df.rename(columns={'min': 'low', 'max': 'high'}, inplace=True)
-            df['time'] = pd.to_datetime(df['from'], unit='s')
-            df.set_index('time', inplace=True)
-            df.sort_index(inplace=True)
-            return df
-        except Exception as exc:
-            log(f"safe_get_candles_df erro ({exc}), reconectando...", level="error")
-            try:
-                IQ.connect()
-            except Exception as e:
-                log(f"Falha ao reconectar: {e}", level="error")
-            time.sleep(1)
-    raise RuntimeError(f"Não foi possível obter velas para {asset} após várias tentativas")
+    try:
+        return connection.call(get_candles, connection.client)
+    except CircuitOpenError:
+        raise
+    except Exception as exc:
+        raise RuntimeError(f"Não foi possível obter velas para {asset} após várias tentativas") from exc
 
 
-def main():
-    """Ponto de entrada para o robô de trading."""
-    config = load_config("config.yaml")
+def safe_get_candles_df(connection, asset, timeframe, num_candles, clock=time):
+    """
+    Igual a :func:`safe_get_candles`, mas retorna um DataFrame com colunas OHLCV.
+    """
+    candles = safe_get_candles(connection, asset, timeframe, num_candles, clock)
+    df = pd.DataFrame(candles)
+    df.rename(columns={'min': 'low', 'max': 'high'}, inplace=True)
+    df['time'] = pd.to_datetime(df['from'], unit='s')
+    df.set_index('time', inplace=True)
+    df.sort_index(inplace=True)
+    return df
+
+
+def make_client(config):
+    """Return ``(client, clock)`` for the configured ``broker``.
+
+    ``iqoption`` is the live API with the real clock; ``simulated`` and
+    ``replay`` run on a :class:`replay.SimulatedClock` against synthetic
+    candles or a recorded session. With ``record_file`` every API response
+    is also recorded for later replay.
+    """
+    broker = config.get('broker', 'iqoption')
+    speed = config.get('simulation_speed', 1000.0)
+    if broker in ('simulated', 'replay') or config.get('record_file'):
+        from replay import Recorder, ReplayClient, SimulatedClock, SimulatedIQOption
+    if broker == 'simulated':
+        clock = SimulatedClock(speed)
+        if config.get('simulation_hours'):
+            clock.end = clock.start + config['simulation_hours'] * 3600
+        client = SimulatedIQOption(config['assets'], clock, seed=config.get('simulation_seed', 0))
+    elif broker == 'replay':
+        client = ReplayClient(config['replay_file'], speed=speed)
+        clock = client.clock
+    else:
+        from iqoptionapi.stable_api import IQ_Option
+
+        client, clock = IQ_Option(config["email"], config["password"]), time
+    if config.get('record_file'):
+        client = Recorder(client, config['record_file'], clock=clock.time)
+    return client, clock
+
+
+def main(config=None, client=None, clock=time, started=None, cycles=None):
+    """Ponto de entrada para o robô de trading.
+
+    *client* and *clock* replace the ones built from ``config`` by
+    :func:`make_client` (e.g. for :func:`replay.benchmark`). *started* is
+    the ``perf_counter`` time the time to the first decision is measured
+    from (default: now); with *cycles* the loop stops after that many cycles.
+    """
+    started = time.perf_counter() if started is None else started
+    config = load_config("config.yaml") if config is None else config
+    configure_logging(config)
 
-    # Intervalos
-    loop_interval = config.get('loop_interval', 5)
     trade_duration = config.get('trade_duration', int(config['timeframe_main'] / 60))
 
-    IQ = IQ_Option(config["email"], config["password"])
+    if client is None:
+        client, clock = make_client(config)
+    IQ = client
+    connection = ConnectionSupervisor(
+        IQ,
+        base_delay=config.get('reconnect_base_delay', 1.0),
+        max_delay=config.get('reconnect_max_delay', 60.0),
+        failure_threshold=config.get('circuit_failure_threshold', 5),
+        reset_seconds=config.get('circuit_reset_seconds', 60.0),
+        heartbeat_seconds=config.get('heartbeat_seconds', 30.0),
+    )
 
-    try:
-        IQ.connect()
-    except Exception as exc:
-        log(f"Falha ao conectar: {exc}", level="error")
+    if not connection.connect():
+        log("Falha ao conectar", level="error")
         return
+    connection.start()
+
+    metrics = Metrics(dump_seconds=config.get('metrics_dump_seconds'))
+    metrics.gauges['bot_connection'] = connection.metrics
+    if config.get('metrics_port'):
+        metrics.serve(config['metrics_port'])
 
     IQ.change_balance(config['account_type'].upper())
 
-    fundamental = FundamentalAnalyzer(buffer_minutes=config['news_buffer_minutes'])
+    fundamental = None
+    if config.get('news_enabled', True):
+        fundamental = FundamentalAnalyzer(
+            buffer_minutes=config['news_buffer_minutes'],
+            refresh_seconds=config.get('news_refresh_seconds', 300),
+            clock=clock.time,
+        )
+        fundamental.start()
+    # Per-asset thresholds and periods chosen by optimizer.py.
+    overrides = load_asset_overrides(config.get('optimized_params_file'))
+    if overrides:
+        log(f"Parâmetros otimizados carregados para {len(overrides)} ativos")
     technical = TechnicalAnalyzer(
         ma_fast=config['trend_ma_fast'],
         ma_slow=config['trend_ma_slow'],
         volume_period=config['volume_period'],
+        periods={
+            asset: (settings['trend_ma_fast'], settings['trend_ma_slow'])
+            for asset, settings in overrides.items() if 'trend_ma_fast' in settings and 'trend_ma_slow' in settings
+        },
+    )
+    risk = RiskManager.from_config(config)
+    ml = MLModel(
+        filename=config.get('trade_journal_file', 'trade_journal.bin'),
+        n_jobs=config.get('ml_train_jobs', -1),
+        online_file=config.get('ml_online_file') or None,
+        mode=config.get('ml_mode', 'batch'),
+    )
+    # Timeframes above the base one are aggregated locally from the base candles.
+    base_timeframe = config.get('base_timeframe', config['timeframe_main'])
+    confirm_timeframes = config.get('confirm_timeframes') or []
+
+    def fetch_rest(asset, timeframe, count):
+        return safe_get_candles(connection, asset, timeframe, count, clock)
+
+    multi = None
+    if base_timeframe != config['timeframe_main'] or confirm_timeframes:
+        multi = MultiTimeframeEngine(
+            base_timeframe,
+            [config['timeframe_main'], *confirm_timeframes],
+            live=(config['timeframe_main'],),
+            size=config.get('candle_buffer_size', 100),
+            ma_fast=config['trend_ma_fast'],
+            ma_slow=config['trend_ma_slow'],
+            fetch=fetch_rest,
+        )
+
+    if config.get('candle_source', 'polling') == 'streaming':
+        source = StreamingSource(
+            IQ, backfill=fetch_rest,
+            maxdict=config.get('stream_maxdict', 10),
+            stale_seconds=config.get('stream_stale_seconds', 60),
+            clock=clock.time,
+        )
+    else:
+        source = PollingSource(fetch_rest)
+    connection.on_reconnect.append(source.resubscribe)
+    candles = CandleStore(
+        fetch=metrics.timed('fetch', source.fetch),
+        timeframe=base_timeframe,
+        size=config.get('base_buffer_size', config.get('candle_buffer_size', 100)),
+        clock=clock.time,
+        history=CandleHistory(config['history_dir']) if config.get('history_dir') else None,
     )
-    risk = RiskManager(
-        stop_loss_amount=config['stop_loss_amount'],
-        stop_loss_consecutive=config['stop_loss_consecutive'],
-        stop_win_amount=config['stop_win_amount'],
-        stop_win_victories=config['stop_win_victories'],
-        strategy=config['strategy'],
-        martingale_factor=config['martingale_factor'],
-        soros_level=config['soros_level'],
-        use_martingale_if_high_chance=config['use_martingale_if_high_chance'],
-        use_soros_if_low_payout=config['use_soros_if_low_payout'],
-        min_payout_for_soros=config['min_payout_for_soros'],
-        assets=config['assets'],
+    streaming = config.get('indicator_engine', 'streaming') == 'streaming'
+    scanner = AssetScanner(
+        fetch=candles.refresh,
+        analyze=None if streaming or multi else analyze_candles,
+        analyze_args=(config['trend_ma_fast'], config['trend_ma_slow'], config['volume_period']),
+        fetch_workers=config.get('scan_fetch_workers', 8),
+        process_workers=config.get('scan_process_workers'),
     )
-    ml = MLModel()
+    tracker = OrderTracker(
+        check=lambda order_id: connection.call(IQ.check_win, order_id),
+        workers=config.get('order_tracker_workers', 16),
+        clock=clock.time,
+    )
+    # Wakes at each close of timeframe_main; "interval" keeps the fixed polling.
+    scheduler = CandleScheduler(
+        config['timeframe_main'],
+        settle=config.get('schedule_settle_seconds', 1.0),
+        jitter=config.get('schedule_jitter_seconds', 0.0),
+        spike_ratio=config.get('volume_spike_ratio', 2.0),
+        spike_interval=config.get('volume_spike_interval'),
+        interval=config.get('loop_interval', 5) if config.get('schedule', 'candle') == 'interval' else None,
+        clock=clock.time,
+        sleep=clock.sleep,
+    )
+
+    # Candles, risk counters, open orders, last candle processed per asset and
+    # model version of the previous session; the loop keeps the file current.
+    snapshot_file = config.get('snapshot_file') or None
+    state = snapshot.SnapshotWriter(snapshot_file, {
+        'candles': candles.snapshot, 'risk': risk.snapshot, 'orders': tracker.snapshot,
+        'scheduler': scheduler.snapshot, 'session': lambda: snapshot.session(ml.version, clock.time),
+    })
+    restore_start = time.perf_counter()
+    saved = snapshot.load(snapshot_file)
+    if saved:
+        restored = candles.restore(saved.get('candles'))
+        risk.restore(saved.get('risk'))
+        scheduler.restore(saved.get('scheduler'))
+        positions = tracker.restore(saved.get('orders'), since=clock.time() - trade_duration * 60)
+        for position in positions:
+            if position.asset in risk.index:
+                risk.open_trade(position.asset, position.amount)
+        model_version = str(saved.get('session', {}).get('model_version', ''))
+        log(
+            f"Snapshot restaurado em {(time.perf_counter() - restore_start) * 1000:.1f} ms: velas de {restored} ativos, "
+            f"contadores de risco e {len(positions)} ordens abertas (modelo {model_version or '-'})"
+        )
+        if model_version != (ml.version or ''):
+            log(f"Modelo mudou desde o snapshot: {model_version or '-'} -> {ml.version or '-'}", level="warning")
+
+    try:
+        _run_loop(connection, config, fundamental, technical, risk, ml, scanner, source, tracker, multi, streaming, scheduler, metrics, trade_duration, clock, started, cycles, state, overrides)
+    finally:
+        state.flush(force=True)
+        scanner.close()
+        source.close()
+        connection.stop()
+        metrics.close()
+        tracker.close()
+        if fundamental is not None:
+            fundamental.stop()
+        ml.close()
+        # replay is only loaded for simulated, replayed or recorded sessions.
+        replay = sys.modules.get('replay')
+        if replay is not None and isinstance(IQ, replay.Recorder):
+            IQ.close()
+        if replay is not None and isinstance(clock, replay.SimulatedClock):
+            clock.stop()
+
+
+def _score_cycle(evaluated, ml, metrics, confirm):
+    """Features, ML predictions and confluences of every evaluated asset in one batch.
+
+    Returns ``(feature rows, directions, confluence matrix, signal names)``.
+    """
+    if not evaluated:
+        return [], np.zeros(0, dtype=int), np.zeros((0, len(SIGNALS)), dtype=bool), SIGNALS
+    _, payouts, records, trends, breakouts, pattern_names, volume_ratios, htfs = zip(*evaluated)
+    trends, breakouts, volume_ratios = np.array(trends), np.array(breakouts), np.array(volume_ratios)
+    pattern_names = np.array(pattern_names, dtype=object)
+    values = decision.stack(records)
+    rows = decision.feature_rows(
+        decision.feature_columns(values, trends, breakouts, pattern_names, volume_ratios, np.array(payouts))
+    )
+    with metrics.time('ml_predict'):
+        ml_highs = ml.predict_high_chances(rows)
+    htf = tuple(np.array([item[k] for item in htfs]) for k in range(3)) if confirm else None
+    directions, matrix = decision.score(values, trends, breakouts, pattern_names, volume_ratios, ml_highs, htf)
+    return rows, directions, matrix, decision.signal_columns(confirm)
+
+
+def _run_loop(connection, config, fundamental, technical, risk, ml, scanner, source, tracker, multi, streaming, scheduler, metrics, trade_duration, clock=time, started=None, cycles=None, state=None, overrides=None):
+    """Run the trading loop until interrupted, or for *cycles* cycles.
 
-    daily_wins = 0
-    last_trade_date = None
+    *overrides* maps assets to the settings of :func:`utils.load_asset_overrides`
+    (``volume_period``, ``breakout_lookback`` and ``strength_levels``).
+
+    Every state change is marked on *state* (a :class:`snapshot.SnapshotWriter`),
+    which is flushed after each order and at the end of each cycle.
+    """
+    confirm_timeframes = config.get('confirm_timeframes') or []
+    overrides = overrides or {}
+    state = state or snapshot.SnapshotWriter(None, {})
+    cycle = 0
+
+    def on_result(position):
+        metrics.observe('bot_order_result_seconds', position.closed_at - position.opened_at, asset=position.asset)
+        risk.register_trade(position.asset, position.result, amount=position.amount, payout=position.features['payout'])
+        ml.log_trade(position.features, position.result)
+        state.mark()
+
+    tracker.on_result.append(on_result)
 
     while True:
-        log("Loop principal...", level="info")
+        trigger = scheduler.wait()
+        cycle_start = time.perf_counter()
+        metrics.dump_if_due()
+        log(f"Loop principal ({trigger})...", level="info")
 
+        tracker.poll()
+        state.flush()
         ml.check_and_train_daily()
 
-        if fundamental.check_high_impact_news():
+        per_currency = fundamental is not None and config.get('news_per_currency', True)
+        if fundamental is not None and not per_currency and fundamental.check_high_impact_news():
             log("Aguardando notícia importante...", level="info")
-            time.sleep(60)
+            clock.sleep(60)
             continue
 
-        now = pd.Timestamp.now()
-        if last_trade_date is None or last_trade_date.date() < now.date():
-            daily_wins = 0
-        last_trade_date = now
+        risk.roll_day(pd.Timestamp.fromtimestamp(clock.time()).date())
 
-        if daily_wins >= config['stop_win_victories']:
+        if risk.daily_wins >= config['stop_win_victories']:
             log("Stop win diário atingido — aguardando amanhã...", level="info")
-            time.sleep(3600)
+            clock.sleep(3600)
             continue
 
-        all_profit = IQ.get_all_profit() or {}
+        if not connection.available():
+            log(f"Conexão indisponível — aguardando... {connection.metrics()}", level="error")
+            continue
 
-        for asset in config['assets']:
-            payout = all_profit.get(asset, {}).get('turbo', 0)
-            if payout < config['min_payout'] or payout > config['max_payout']:
-                continue
+        try:
+            all_profit = connection.call(connection.client.get_all_profit) or {}
+        except Exception as exc:
+            log(f"Erro ao obter payouts: {exc}", level="error")
+            continue
 
-            try:
-                df = safe_get_candles_df(IQ, asset, config['timeframe_main'], num_candles=100)
-            except Exception as exc:
-                log(f"Erro ao obter velas: {exc}", level="error")
+        payouts = {
+            asset: all_profit.get(asset, {}).get('turbo', 0)
+            for asset in config['assets']
+        }
+        tradable = [
+            asset for asset, payout in payouts.items()
+            if config['min_payout'] <= payout <= config['max_payout']
+            and not (per_currency and fundamental.check_high_impact_news(asset))
+        ]
+
+        # First pass: indicators for every asset, so features, the ML model
+        # and the confluences are computed for the whole cycle in one batch.
+        evaluated = []
+        candle_times = {}
+        for asset, df in scanner.scan(source.updated(tradable)):
+            payout = payouts[asset]
+            settings = overrides.get(asset, {})
+            volume_period = settings.get('volume_period', config['volume_period'])
+            htf = None
+            # At a close the newest row is the candle that has just opened; decide on the closed one.
+            if trigger == CLOSE:
+                df = scheduler.closed(df)
+            if multi is not None:
+                multi.update(asset, df)
+                df = multi.frame(asset, config['timeframe_main'])
+            if not scheduler.changed(asset, df):
                 continue
-
-            df = technical.calculate_moving_averages(df)
-            df = technical.add_m5_indicators(df)
-
-            breakout = technical.detect_breakout(df, lookback=config.get('breakout_lookback', 50))
-            trend = technical.detect_trend(df)
-            patterns = technical.detect_candlestick_patterns(df)
+            if trigger == INTRA and not scheduler.spike(asset, df, volume_period):
+                continue
+            candle_times[asset] = float(df['from'].iloc[-1])
+            with metrics.time('indicators', asset):
+                if multi is not None:
+                    latest = multi.values(asset, config['timeframe_main'])
+                    if confirm_timeframes:
+                        htf = multi.confirmations(asset, confirm_timeframes)
+                elif streaming:
+                    latest = technical.stream_indicators(asset, df)
+                else:
+                    latest = technical.latest_values(df)
+
+            breakout = decision.breakout_code(technical.detect_breakout(df, lookback=settings.get('breakout_lookback', config.get('breakout_lookback', 50))))
+            trend = technical.detect_trend(latest)
+            with metrics.time('patterns', asset):
+                patterns = technical.detect_candlestick_patterns(df)
             pattern_name = patterns[0][0] if patterns else None
-            last_candle = df.iloc[-1]
-
-            avg_volume = df['volume'].rolling(config['volume_period']).mean().iloc[-1]
-            volume_ratio = last_candle.volume / avg_volume if avg_volume > 0 else 0
-
-            features = {
-                "pattern_name": pattern_name or "unknown",
-                "breakout": breakout or "none",
-                "trend": trend,
-                "volume_ratio": volume_ratio,
-                "payout": payout,
-                "ema_cross": bool(df['EMA_CROSS'].iloc[-1]),
-                "rsi7": float(df['RSI7'].iloc[-1]) if 'RSI7' in df.columns else 50.0,
-                "macd_hist": float(df['MACD_HIST'].iloc[-1]) if 'MACD_HIST' in df.columns else 0.0,
-                "adx14": float(df['ADX14'].iloc[-1]) if 'ADX14' in df.columns else 0.0,
-                "atr14": float(df['ATR14'].iloc[-1]) if 'ATR14' in df.columns else 0.0,
-            }
-            ml_high = ml.predict_high_chance(features)
-
-            if not risk.can_trade(asset):
+            volume_ratio = decision.volume_ratio(df['volume'].to_numpy(), volume_period)
+            evaluated.append((asset, payout, latest, trend, breakout, pattern_name, volume_ratio, htf))
+
+        # Per-asset stops and portfolio exposure for the whole cycle in one pass,
+        # with the smallest stake each asset may get (the exact one is checked before the order).
+        if evaluated:
+            assets = [item[0] for item in evaluated]
+            stakes = [risk.stake(asset, payout=item[1]) for asset, item in zip(assets, evaluated)]
+            allowed = risk.allowed(assets, stakes)
+            evaluated = [item for item, ok in zip(evaluated, allowed) if ok]
+
+        rows, directions, matrix, names = _score_cycle(evaluated, ml, metrics, bool(confirm_timeframes and multi))
+
+        for i, ((asset, payout, *_), features) in enumerate(zip(evaluated, rows)):
+            tracker.poll()
+            if tracker.is_open(asset):
                 continue
 
-            super_dir = "up" if last_candle.close > last_candle.SUPERT else "down"
-            direction = None
-            if trend == "up" and super_dir == "up":
-                direction = "call"
-            elif trend == "down" and super_dir == "down":
-                direction = "put"
+            direction = DIRECTIONS.get(int(directions[i]))
             if not direction:
                 continue
 
-            signals = []
-            debug_signals = {
-                'breakout': breakout,
-                'pattern': pattern_name,
-                'volume_ratio': round(volume_ratio, 2),
-                'trend': trend,
-                'ema_cross': bool(df['EMA_CROSS'].iloc[-1]),
-                'macd_hist': features['macd_hist'],
-                'adx14': features['adx14'],
-                'supertrend_dir': super_dir,
-            }
-            log(f"[{asset}] Debug signals: {debug_signals}", level="debug")
-
-            if breakout:
-                signals.append("breakout")
-            if pattern_name:
-                signals.append("pattern")
-            if volume_ratio > 1.0:
-                signals.append("volume")
-            if trend != "flat":
-                signals.append("trend")
-            if df['EMA_CROSS'].iloc[-1]:
-                signals.append("ema_cross")
-            if ((trend == "up" and df['MACD_HIST'].iloc[-1] > 0) or (trend == "down" and df['MACD_HIST'].iloc[-1] < 0)):
-                signals.append("macd")
-            if df['ADX14'].iloc[-1] > 20:
-                signals.append("adx")
-            if ((trend == "up" and last_candle.close > last_candle.SUPERT) or (trend == "down" and last_candle.close < last_candle.SUPERT)):
-                signals.append("supertrend")
-            if ((trend == "up" and last_candle.close > last_candle.VWAP) or (trend == "down" and last_candle.close < last_candle.VWAP)):
-                signals.append("vwap")
-            if ml_high:
-                signals.append("ml")
-
-            strength = entry_strength(len(signals))
+            if log_enabled("debug"):
+                debug_signals = {
+                    name: features[name]
+                    for name in ('breakout', 'pattern_name', 'volume_ratio', 'trend', 'ema_cross', 'macd_hist', 'adx14')
+                }
+                debug_signals['supertrend_dir'] = "up" if direction == "call" else "down"
+                log("[%s] Debug signals: %s", asset, debug_signals, level="debug", asset=asset, stage="signals")
+
+            signals = signal_names(matrix[i], names)
+
+            # Time since the newest candle opened, i.e. how old the data behind this decision is.
+            metrics.observe('bot_candle_age_seconds', clock.time() - candle_times[asset], asset=asset)
+            strength = entry_strength(len(signals), overrides.get(asset, {}).get('strength_levels', STRENGTH_LEVELS))
             if strength in ("nenhuma", "fraca"):
-                log(f"[{asset}] Ignorando trade (confluências insuficientes: {len(signals)}) -> {strength}", level="info")
+                log(f"[{asset}] Ignorando trade (confluências insuficientes: {len(signals)}) -> {strength}", level="info", asset=asset, stage="decision")
                 continue
 
-            amount = risk.next_amount(asset, high_chance=strength != "fraca", payout=payout)
-            log(f"[{asset}] Entrando {direction} com {amount} — confluências:{len(signals)} ({strength})")
+            # Exposure limits are checked with the stake after martingale/soros.
+            high_chance = strength != "fraca"
+            if not risk.can_trade(asset, risk.stake(asset, high_chance=high_chance, payout=payout)):
+                continue
+            amount = risk.next_amount(asset, high_chance=high_chance, payout=payout)
+            log(f"[{asset}] Entrando {direction} com {amount} — confluências:{len(signals)} ({strength})", asset=asset, stage="decision")
 
             status, order_id = False, None
             try:
-                status, order_id = IQ.buy(amount, asset, direction, trade_duration)
+                with metrics.time('order', asset):
+                    status, order_id = connection.call(connection.client.buy, amount, asset, direction, trade_duration, retries=1)
             except Exception as exc:
-                log(f"[{asset}] Erro ao enviar ordem: {exc}", level="error")
+                log(f"[{asset}] Erro ao enviar ordem: {exc}", level="error", asset=asset, stage="order")
 
             if not status:
-                log(f"[{asset}] Ordem não executada.", level="error")
+                log(f"[{asset}] Ordem não executada.", level="error", asset=asset, stage="order")
                 risk.register_trade(asset, False)
                 ml.log_trade(features, False)
+                state.mark()
                 continue
 
-            log(f"[{asset}] Ordem enviada com sucesso: order_id={order_id}")
-
-            try:
-                result, _ = IQ.check_win(order_id)
-            except Exception as exc:
-                log(f"[{asset}] Erro ao verificar resultado: {exc}", level="error")
-                result = False
-
-            log(f"[{asset}] Resultado da ordem: {'Win' if result else 'Loss'}")
-
-            risk.register_trade(asset, result)
-            ml.log_trade(features, result)
-
-            if result:
-                daily_wins += 1
-
+            log(f"[{asset}] Ordem enviada com sucesso: order_id={order_id}", asset=asset, stage="order")
+            tracker.track(asset, order_id, amount, direction, features)
+            risk.open_trade(asset, amount)
+            state.mark()
+            state.flush()
+
+        state.mark()
+        state.flush()
+        metrics.observe('bot_stage_seconds', time.perf_counter() - cycle_start, stage='cycle')
+        cycle += 1
+        if cycle == 1 and started is not None:
+            elapsed = time.perf_counter() - started
+            metrics.observe('bot_stage_seconds', elapsed, stage='startup')
+            budget = config.get('startup_budget_seconds')
+            if budget and elapsed > budget:
+                log(f"Primeira decisão {elapsed:.2f}s após o início — acima do limite de {budget}s", level="warning")
+            else:
+                log(f"Primeira decisão {elapsed:.2f}s após o início")
+        if cycles is not None and cycle >= cycles:
+            return
+        log("Conexão: %s", connection.metrics(), level="debug")
         log("Esperando próximo ciclo...", level="info")
-        time.sleep(loop_interval)
 
 
 if __name__ == "__main__":
-    main()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Robô de trading IQ Option")
+    parser.add_argument(
+        "--profile-startup", type=int, nargs="?", const=30, metavar="N",
+        help="perfila a inicialização até a primeira decisão e mostra as N funções mais caras",
+    )
+    args = parser.parse_args()
+    if args.profile_startup:
+        import cProfile
+        import pstats
+
+        imported = time.perf_counter() - _STARTED
+        profiler = cProfile.Profile()
+        profiler.runcall(main, started=_STARTED, cycles=1)
+        print(f"Importações: {imported:.2f}s; inicialização até a primeira decisão:")
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(args.profile_startup)
+    else:
+        main(started=_STARTED)
@@ -0,0 +1,232 @@
+"""On-disk candle history, one append-only columnar file per asset, timeframe and day.
+
+Partitions live at ``<root>/<asset>/<timeframe>/<YYYY-MM-DD>.f8`` and hold
+raw little-endian ``float64`` rows in :data:`candle_store.COLUMNS` order, so
+reads are plain ``np.memmap`` views and appends are a single ``write``. The
+live loop appends every refreshed candle, including repeated versions of the
+in-progress one; :py:meth:`CandleHistory.compact` keeps only the last version
+of each candle. Reads deduplicate uncompacted partitions on the fly.
+"""
+
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from candle_store import COLUMNS, _FROM
+
+DTYPE = np.dtype('<f8')
+_ROW_BYTES = DTYPE.itemsize * len(COLUMNS)
+_DAY = 86400
+
+
+def candle_rows(candles) -> np.ndarray:
+    """Convert raw ``IQ_Option.get_candles`` dicts to an array of :data:`COLUMNS` rows."""
+    return np.array(
+        [(c['from'], c['open'], c['max'], c['min'], c['close'], c['volume']) for c in candles],
+        dtype=DTYPE,
+    ).reshape(-1, len(COLUMNS))
+
+
+def _dedupe(values: np.ndarray) -> np.ndarray:
+    """Sort *values* by open time keeping the last written version of each candle."""
+    times = values[:, _FROM]
+    if len(times) < 2 or (np.diff(times) > 0).all():
+        return values
+    order = np.argsort(times, kind='stable')
+    ordered = values[order]
+    keep = np.r_[ordered[1:, _FROM] != ordered[:-1, _FROM], True]
+    return ordered[keep]
+
+
+class CandleHistory:
+    """Columnar candle history partitioned by asset, timeframe and UTC day."""
+
+    def __init__(self, root: str = "history"):
+        self.root = root
+        self._lock = threading.Lock()
+        self._last_day = {}
+
+    def _dir(self, asset, timeframe) -> str:
+        return os.path.join(self.root, asset, str(int(timeframe)))
+
+    def _path(self, asset, timeframe, day: int) -> str:
+        name = time.strftime('%Y-%m-%d', time.gmtime(day * _DAY))
+        return os.path.join(self._dir(asset, timeframe), f"{name}.f8")
+
+    def days(self, asset, timeframe) -> list:
+        """Return the stored partitions of *asset* as sorted day numbers (days since epoch)."""
+        try:
+            names = os.listdir(self._dir(asset, timeframe))
+        except FileNotFoundError:
+            return []
+        days = []
+        for name in names:
+            if name.endswith('.f8'):
+                days.append(int(np.datetime64(name[:-3], 'D').astype(np.int64)))
+        return sorted(days)
+
+    def append(self, asset, timeframe, rows) -> None:
+        """Append candles (raw API dicts or :data:`COLUMNS` rows) to their day partitions.
+
+        The previous partition is compacted the first time a later day is
+        written, so only the current day accumulates in-progress versions.
+        """
+        if not isinstance(rows, np.ndarray):
+            rows = candle_rows(rows)
+        if len(rows) == 0:
+            return
+        rows = np.ascontiguousarray(rows, dtype=DTYPE)
+        days = (rows[:, _FROM] // _DAY).astype(np.int64)
+        key = (asset, int(timeframe))
+        with self._lock:
+            os.makedirs(self._dir(asset, timeframe), exist_ok=True)
+            for day in np.unique(days):
+                with open(self._path(asset, timeframe, day), 'ab') as file:
+                    torn = file.tell() % _ROW_BYTES
+                    if torn:
+                        # Drop a row left half-written by a crash so later rows stay aligned.
+                        file.truncate(file.tell() - torn)
+                    file.write(rows[days == day].tobytes())
+            last = self._last_day.get(key)
+            newest = int(days.max())
+            if last is not None and newest > last:
+                self._compact_day(asset, timeframe, last)
+            if last is None or newest > last:
+                self._last_day[key] = newest
+
+    def _map(self, asset, timeframe, day: int) -> np.ndarray:
+        """Memory-map one partition, ignoring a torn trailing row."""
+        path = self._path(asset, timeframe, day)
+        try:
+            rows = os.path.getsize(path) // _ROW_BYTES
+        except FileNotFoundError:
+            rows = 0
+        if rows == 0:
+            return np.empty((0, len(COLUMNS)), dtype=DTYPE)
+        return np.memmap(path, dtype=DTYPE, mode='r', shape=(rows, len(COLUMNS)))
+
+    def _compact_day(self, asset, timeframe, day: int) -> int:
+        values = self._map(asset, timeframe, day)
+        compacted = _dedupe(values)
+        if compacted is values and values.nbytes == os.path.getsize(self._path(asset, timeframe, day)):
+            return 0
+        path = self._path(asset, timeframe, day)
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as file:
+            file.write(np.ascontiguousarray(compacted).tobytes())
+            file.flush()
+            os.fsync(file.fileno())
+        removed = len(values) - len(compacted)
+        del values, compacted
+        os.replace(tmp, path)
+        return removed
+
+    def compact(self, asset, timeframe, day: int = None) -> int:
+        """Rewrite partitions sorted with one row per candle; return the rows removed.
+
+        Without *day* every partition of *asset* is compacted. Files are
+        replaced atomically, so readers see either the old or the new file.
+        """
+        with self._lock:
+            days = self.days(asset, timeframe) if day is None else [day]
+            return sum(self._compact_day(asset, timeframe, d) for d in days)
+
+    def read(self, asset, timeframe, start=None, end=None) -> np.ndarray:
+        """Return the candles with ``start <= from < end`` as :data:`COLUMNS` rows.
+
+        *start* and *end* are epoch seconds or anything ``pd.Timestamp``
+        accepts. A range inside one compacted partition is returned as a
+        read-only memory-mapped view without copying.
+        """
+        start = None if start is None else _epoch(start)
+        end = None if end is None else _epoch(end)
+        parts = []
+        for day in self.days(asset, timeframe):
+            if start is not None and (day + 1) * _DAY <= start:
+                continue
+            if end is not None and day * _DAY >= end:
+                break
+            values = _dedupe(self._map(asset, timeframe, day))
+            times = values[:, _FROM]
+            lo = 0 if start is None else np.searchsorted(times, start, side='left')
+            hi = len(values) if end is None else np.searchsorted(times, end, side='left')
+            if hi > lo:
+                parts.append(values[lo:hi])
+        if not parts:
+            return np.empty((0, len(COLUMNS)), dtype=DTYPE)
+        if len(parts) == 1:
+            return parts[0]
+        return np.concatenate(parts)
+
+    def tail(self, asset, timeframe, count: int) -> np.ndarray:
+        """Return the newest *count* stored candles, reading only the partitions needed."""
+        parts, total = [], 0
+        for day in reversed(self.days(asset, timeframe)):
+            values = _dedupe(self._map(asset, timeframe, day))
+            parts.append(values)
+            total += len(values)
+            if total >= count:
+                break
+        if not parts:
+            return np.empty((0, len(COLUMNS)), dtype=DTYPE)
+        values = parts[0] if len(parts) == 1 else np.concatenate(parts[::-1])
+        return values[-count:] if count else values[:0]
+
+    def frame(self, asset, timeframe, start=None, end=None) -> pd.DataFrame:
+        """Return :py:meth:`read` as an OHLCV DataFrame indexed by open time."""
+        values = self.read(asset, timeframe, start, end)
+        index = pd.DatetimeIndex(pd.to_datetime(values[:, _FROM], unit='s'), name='time')
+        return pd.DataFrame(values, columns=list(COLUMNS), index=index, copy=False)
+
+    def frames(self, assets, timeframe, start=None, end=None) -> dict:
+        """Return ``asset -> DataFrame`` for the assets with stored candles (e.g. for :class:`backtest.Backtester`)."""
+        frames = {asset: self.frame(asset, timeframe, start, end) for asset in assets}
+        return {asset: df for asset, df in frames.items() if not df.empty}
+
+
+def _epoch(value) -> float:
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return float(value)
+    stamp = pd.Timestamp(value)
+    if stamp.tzinfo is None:
+        stamp = stamp.tz_localize('UTC')
+    return stamp.timestamp()
+
+
+def benchmark(root: str, days: int = 30, timeframe: int = 60, batch: int = 1) -> dict:
+    """Measure append and read throughput (candles per second) on synthetic candles."""
+    history = CandleHistory(root)
+    n = days * _DAY // timeframe
+    rows = np.zeros((n, len(COLUMNS)), dtype=DTYPE)
+    rows[:, _FROM] = 1700006400 + np.arange(n) * timeframe
+    rows[:, 1:] = 1.0
+
+    start = time.perf_counter()
+    for i in range(0, n, batch):
+        history.append("BENCH", timeframe, rows[i:i + batch])
+    append_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    values = history.read("BENCH", timeframe)
+    float(values[:, 4].sum())
+    read_seconds = time.perf_counter() - start
+    return {
+        'candles': n,
+        'append_per_second': n / append_seconds,
+        'read_per_second': n / read_seconds,
+    }
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as root:
+        for batch in (1, 1000):
+            result = benchmark(os.path.join(root, str(batch)), batch=batch)
+            print(
+                f"batch={batch}: {result['candles']} candles, "
+                f"append {result['append_per_second']:,.0f}/s, read {result['read_per_second']:,.0f}/s"
+            )
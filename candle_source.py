@@ -0,0 +1,151 @@
+"""Where candles come from: REST polling or the realtime candle stream.
+
+Both sources expose ``fetch(asset, timeframe, count)`` returning raw candles
+in the ``IQ_Option.get_candles`` format, so :class:`candle_store.CandleStore`
+works with either.
+
+:class:`PollingSource` calls the REST fetcher on every refresh.
+:class:`StreamingSource` subscribes each asset once with
+``start_candles_stream`` and then serves refreshes from the dictionary the
+client keeps up to date (``get_realtime_candles``), falling back to REST for
+the initial backfill. Subscriptions do not survive a reconnect:
+:py:meth:`StreamingSource.resubscribe` renews them, and streams that stop
+advancing for ``stale_seconds`` are renewed on the next fetch.
+"""
+
+import threading
+import time
+
+from utils import log
+
+
+class PollingSource:
+    """Fetch candles with one REST request per refresh."""
+
+    def __init__(self, fetch):
+        self._fetch = fetch
+
+    def fetch(self, asset, timeframe: int, count: int) -> list:
+        return self._fetch(asset, timeframe, count)
+
+    def updated(self, assets, timeframe: int = None) -> list:
+        """Every asset may have changed; polling cannot tell without asking."""
+        return list(assets)
+
+    def resubscribe(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class StreamingSource:
+    """Serve candles from ``iqoptionapi`` realtime streams.
+
+    *client* needs ``start_candles_stream(asset, size, maxdict)``,
+    ``get_realtime_candles(asset, size)`` and ``stop_candles_stream(asset, size)``.
+    *backfill* is a REST fetcher used when more candles are requested than
+    the stream holds (``maxdict``), e.g. on the first refresh of an asset.
+    """
+
+    def __init__(self, client, backfill, maxdict: int = 10, stale_seconds: float = None, clock=time.time):
+        self.client = client
+        self.backfill = backfill
+        self.maxdict = maxdict
+        self.stale_seconds = stale_seconds
+        self.clock = clock
+        self._streams = {}
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, asset, timeframe: int) -> None:
+        """Start the stream of *asset* on *timeframe* (no-op if already running)."""
+        with self._lock:
+            if (asset, timeframe) in self._streams:
+                return
+            self._streams[(asset, timeframe)] = {'key': None, 'since': self.clock()}
+        # Outside the lock: the client backfills the stream with a REST call.
+        try:
+            self.client.start_candles_stream(asset, timeframe, self.maxdict)
+        except Exception:
+            with self._lock:
+                self._streams.pop((asset, timeframe), None)
+            raise
+        log(f"[{asset}] Stream de velas {timeframe}s iniciado", level="debug")
+
+    def resubscribe(self) -> None:
+        """Renew every subscription, e.g. after the client reconnected."""
+        with self._lock:
+            streams = list(self._streams)
+            self._streams.clear()
+        for asset, timeframe in streams:
+            try:
+                self.subscribe(asset, timeframe)
+            except Exception as exc:
+                log(f"[{asset}] Falha ao renovar stream: {exc}", level="error")
+        if streams:
+            log(f"{len(streams)} streams de velas renovados")
+
+    def _stream_candles(self, asset, timeframe: int) -> list:
+        candles = self.client.get_realtime_candles(asset, timeframe)
+        if not candles or not isinstance(candles, dict):
+            return []
+        # The websocket thread keeps writing to this dict; copying it is atomic.
+        candles = dict(candles)
+        return [candles[key] for key in sorted(candles)]
+
+    def _check_stale(self, asset, timeframe: int, candles: list) -> None:
+        state = self._streams.get((asset, timeframe))
+        if state is None or not candles:
+            return
+        last = candles[-1]
+        key = (last['from'], last['close'], last['volume'])
+        now = self.clock()
+        if key != state['key']:
+            state['key'], state['since'] = key, now
+        elif self.stale_seconds is not None and now - state['since'] > self.stale_seconds:
+            log(f"[{asset}] Stream sem atualização há {now - state['since']:.0f}s, renovando...", level="error")
+            with self._lock:
+                self._streams.pop((asset, timeframe), None)
+            self.subscribe(asset, timeframe)
+
+    def fetch(self, asset, timeframe: int, count: int) -> list:
+        """Return the newest *count* candles of *asset*, from the stream when it holds enough."""
+        self.subscribe(asset, timeframe)
+        candles = self._stream_candles(asset, timeframe)
+        self._check_stale(asset, timeframe, candles)
+        if len(candles) < count:
+            return self.backfill(asset, timeframe, count)
+        return candles[-count:]
+
+    def updated(self, assets, timeframe: int = None) -> list:
+        """Return the assets of *assets* whose stream changed since the last call.
+
+        Assets without a running stream are always returned so they get
+        subscribed and backfilled.
+        """
+        changed = []
+        for asset in assets:
+            streams = [tf for a, tf in list(self._streams) if a == asset and timeframe in (None, tf)]
+            if not streams:
+                changed.append(asset)
+                continue
+            for tf in streams:
+                candles = self._stream_candles(asset, tf)
+                key = (candles[-1]['from'], candles[-1]['close'], candles[-1]['volume']) if candles else None
+                if key is None or self._seen.get((asset, tf)) != key:
+                    self._seen[(asset, tf)] = key
+                    changed.append(asset)
+                    break
+        return changed
+
+    def close(self) -> None:
+        """Stop every stream."""
+        with self._lock:
+            streams = list(self._streams)
+            self._streams.clear()
+        for asset, timeframe in streams:
+            try:
+                self.client.stop_candles_stream(asset, timeframe)
+            except Exception as exc:
+                log(f"[{asset}] Falha ao parar stream: {exc}", level="error")
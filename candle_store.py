@@ -0,0 +1,169 @@
+"""Per-asset candle cache that only asks the API for new candles."""
+
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ('from', 'open', 'high', 'low', 'close', 'volume')
+_FROM, _OPEN, _HIGH, _LOW, _CLOSE, _VOLUME = range(len(COLUMNS))
+
+
+class CandleBuffer:
+    """Ring buffer keeping the last ``size`` OHLCV candles of one asset.
+
+    Every candle is written twice (slot ``i`` and ``i + size``) so the most
+    recent candles are always a contiguous slice of the backing array and
+    :py:meth:`to_frame` can hand out a DataFrame without copying.
+    """
+
+    def __init__(self, size: int = 100):
+        self.size = size
+        self.count = 0
+        self._data = np.zeros((2 * size, len(COLUMNS)), dtype=float)
+        self._slot = -1
+        self._index = None
+
+    @property
+    def last_from(self):
+        """Open time (epoch seconds) of the newest candle, or ``None`` if empty."""
+        if self.count == 0:
+            return None
+        return int(self._data[self._slot, _FROM])
+
+    def values(self) -> np.ndarray:
+        """Return a view of the buffered candles ordered from oldest to newest."""
+        if self.count < self.size:
+            return self._data[:self.count]
+        return self._data[self._slot + 1:self._slot + 1 + self.size]
+
+    def _write(self, slot: int, row) -> None:
+        self._data[slot] = row
+        self._data[slot + self.size] = row
+
+    def merge(self, candles) -> int:
+        """Merge raw API candles, updating the in-progress one in place.
+
+        Candles older than the newest buffered one are ignored. Returns the
+        number of candles appended.
+        """
+        rows = [
+            (c['from'], c['open'], c['max'], c['min'], c['close'], c['volume'])
+            for c in sorted(candles, key=lambda c: c['from'])
+        ]
+        return self.extend(rows)
+
+    def extend(self, rows) -> int:
+        """Like :py:meth:`merge` for rows already in :data:`COLUMNS` order, sorted by open time."""
+        appended = 0
+        for row in rows:
+            last = self.last_from
+            if last is not None and row[_FROM] < last:
+                continue
+            if last is not None and row[_FROM] == last:
+                self._write(self._slot, row)
+                continue
+            self._slot = (self._slot + 1) % self.size
+            self._write(self._slot, row)
+            self.count = min(self.count + 1, self.size)
+            appended += 1
+        if appended:
+            self._index = None
+        return appended
+
+    def to_frame(self) -> pd.DataFrame:
+        """Return the buffered candles as a DataFrame backed by the ring buffer."""
+        values = self.values()
+        if self._index is None:
+            self._index = pd.DatetimeIndex(pd.to_datetime(values[:, _FROM], unit='s'), name='time')
+        return pd.DataFrame(values, columns=list(COLUMNS), index=self._index, copy=False)
+
+
+class CandleStore:
+    """Cache of :class:`CandleBuffer` objects keyed by asset.
+
+    ``fetch(asset, timeframe, count)`` must return raw candles as delivered by
+    ``IQ_Option.get_candles`` (``from``/``open``/``max``/``min``/``close``/``volume``).
+    The first refresh of an asset loads ``size`` candles; later refreshes only
+    request the candles opened since the newest buffered one, including the
+    in-progress candle so it can be updated.
+
+    With a :class:`candle_history.CandleHistory` every fetched candle is also
+    appended to disk, and new buffers are warm-started from the stored
+    history so a restart only fetches the candles missed while it was down.
+    """
+
+    def __init__(self, fetch, timeframe: int, size: int = 100, clock=time.time, history=None):
+        self.fetch = fetch
+        self.timeframe = timeframe
+        self.size = size
+        self.clock = clock
+        self.history = history
+        self._buffers = {}
+        self._lock = threading.Lock()
+
+    def buffer(self, asset) -> CandleBuffer:
+        """Return the buffer for *asset*, creating one (warm-started from history) if needed."""
+        with self._lock:
+            if asset not in self._buffers:
+                buffer = CandleBuffer(self.size)
+                if self.history is not None:
+                    buffer.extend(self.history.tail(asset, self.timeframe, self.size))
+                self._buffers[asset] = buffer
+            return self._buffers[asset]
+
+    def snapshot(self) -> dict:
+        """Return every buffer as arrays for :mod:`snapshot` (``values`` padded to ``size`` rows)."""
+        with self._lock:
+            buffers = list(self._buffers.items())
+        values = np.full((len(buffers), self.size, len(COLUMNS)), np.nan)
+        counts = np.zeros(len(buffers), dtype=np.int64)
+        for i, (_, buffer) in enumerate(buffers):
+            rows = buffer.values()
+            values[i, :len(rows)] = rows
+            counts[i] = len(rows)
+        return {
+            'assets': np.array([asset for asset, _ in buffers], dtype=str),
+            'timeframe': self.timeframe, 'counts': counts, 'values': values,
+        }
+
+    def restore(self, state: dict) -> int:
+        """Fill the buffers from a :py:meth:`snapshot`; return the number of assets restored.
+
+        Only the missing candles are then fetched, like after a warm start
+        from history. Snapshots of another timeframe are ignored.
+        """
+        if not state or int(state['timeframe']) != self.timeframe:
+            return 0
+        restored = 0
+        now = self.clock()
+        for asset, count, values in zip(state['assets'], state['counts'], state['values']):
+            rows = values[max(0, int(count) - self.size):int(count)]
+            rows = rows[rows[:, _FROM] <= now]
+            if len(rows):
+                buffer = CandleBuffer(self.size)
+                buffer.extend(rows)
+                with self._lock:
+                    self._buffers[str(asset)] = buffer
+                restored += 1
+        return restored
+
+    def missing_count(self, asset) -> int:
+        """Number of candles that must be requested to bring *asset* up to date."""
+        last = self.buffer(asset).last_from
+        if last is None:
+            return self.size
+        elapsed = int((self.clock() - last) // self.timeframe)
+        return max(1, min(elapsed + 1, self.size))
+
+    def refresh(self, asset) -> pd.DataFrame:
+        """Fetch the candles missing for *asset* and return its DataFrame."""
+        buffer = self.buffer(asset)
+        candles = self.fetch(asset, self.timeframe, self.missing_count(asset))
+        if not candles or not isinstance(candles, list):
+            raise ValueError("Resposta de velas inválida ou vazia")
+        buffer.merge(candles)
+        if self.history is not None:
+            self.history.append(asset, self.timeframe, candles)
+        return buffer.to_frame()
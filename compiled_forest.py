@@ -0,0 +1,147 @@
+"""RandomForest inference over flat NumPy arrays instead of sklearn estimators.
+
+:py:meth:`CompiledForest.from_model` concatenates the nodes of every tree
+into ``feature``/``threshold``/``left``/``right``/``value`` arrays. Leaves
+point to themselves, so :py:meth:`CompiledForest.predict_proba` can advance
+all trees for all rows ``depth`` times without masking. Inputs are cast to
+``float32`` and tree probabilities are summed in tree order, exactly as
+``RandomForestClassifier.predict_proba`` does with ``n_jobs=1``.
+"""
+
+import sys
+import time
+
+import numpy as np
+
+
+class CompiledForest:
+    """Flat-array copy of a fitted ``RandomForestClassifier``."""
+
+    def __init__(self, feature, threshold, left, right, value, roots, depth, classes, feature_names=None, version=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.depth = int(depth)
+        self.classes = classes
+        self.feature_names = feature_names
+        self.version = version
+
+    @classmethod
+    def from_model(cls, model, version=None) -> 'CompiledForest':
+        """Export the trees of a fitted ``RandomForestClassifier`` (published as *version*)."""
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset, depth = 0, 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n = tree.node_count
+            leaf = tree.children_left == -1
+            nodes = np.arange(n)
+            features.append(np.where(leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            lefts.append(np.where(leaf, nodes, tree.children_left) + offset)
+            rights.append(np.where(leaf, nodes, tree.children_right) + offset)
+            value = tree.value[:, 0, :]
+            normalizer = value.sum(axis=1)[:, None]
+            normalizer[normalizer == 0.0] = 1.0
+            values.append(value / normalizer)
+            roots.append(offset)
+            offset += n
+            depth = max(depth, tree.max_depth)
+        names = getattr(model, 'feature_names_in_', None)
+        return cls(
+            np.concatenate(features).astype(np.intp),
+            np.concatenate(thresholds),
+            np.concatenate(lefts).astype(np.intp),
+            np.concatenate(rights).astype(np.intp),
+            np.concatenate(values),
+            np.array(roots, dtype=np.intp),
+            depth,
+            np.asarray(model.classes_),
+            None if names is None else [str(n) for n in names],
+            version,
+        )
+
+    def leaves(self, X: np.ndarray) -> np.ndarray:
+        """Return the leaf reached in every tree, shape ``(rows, trees)``."""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        rows = np.arange(len(X))[:, None]
+        node = np.broadcast_to(self.roots, (len(X), len(self.roots)))
+        for _ in range(self.depth):
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+        return node
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Class probabilities for one row or a batch, like ``model.predict_proba``."""
+        per_tree = self.value[self.leaves(X)]
+        return np.cumsum(per_tree, axis=1)[:, -1] / len(self.roots)
+
+    def save(self, path) -> None:
+        """Write the arrays to an ``.npz`` file (a path or an open binary file)."""
+        np.savez(
+            path, feature=self.feature, threshold=self.threshold, left=self.left, right=self.right,
+            value=self.value, roots=self.roots, depth=self.depth, classes=self.classes,
+            feature_names=np.array(self.feature_names or [], dtype=str),
+            version=np.array(self.version or '', dtype=str),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> 'CompiledForest':
+        """Read a forest written by :py:meth:`save`."""
+        with np.load(path) as data:
+            names = [str(n) for n in data['feature_names']] or None
+            version = str(data['version']) if 'version' in data.files else ''
+            return cls(
+                data['feature'], data['threshold'], data['left'], data['right'], data['value'],
+                data['roots'], data['depth'], data['classes'], names, version or None,
+            )
+
+
+def benchmark(model, X: np.ndarray, repeat: int = 200) -> dict:
+    """Median latency (seconds) of sklearn and compiled inference for one row and for *X*."""
+    import pandas as pd
+
+    compiled = CompiledForest.from_model(model)
+    names = getattr(model, 'feature_names_in_', None)
+    frame = pd.DataFrame(X, columns=names)
+
+    def median(fn):
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - start)
+        return float(np.median(samples))
+
+    return {
+        'sklearn_row': median(lambda: model.predict_proba(frame.iloc[:1])),
+        'compiled_row': median(lambda: compiled.predict_proba(X[:1])),
+        'sklearn_batch': median(lambda: model.predict_proba(frame)),
+        'compiled_batch': median(lambda: compiled.predict_proba(X)),
+        'rows': len(X),
+    }
+
+
+if __name__ == "__main__":
+    import joblib
+
+    source = sys.argv[1] if len(sys.argv) > 1 else 'ml_model.pkl'
+    payload = joblib.load(source)
+    model = payload['model'] if isinstance(payload, dict) else payload
+    compiled = CompiledForest.from_model(model)
+    target = sys.argv[2] if len(sys.argv) > 2 else source.rsplit('.', 1)[0] + '.npz'
+    compiled.save(target)
+    print(f"{len(compiled.roots)} árvores, {len(compiled.feature)} nós -> {target}")
+
+    X = np.random.default_rng(0).random((33, model.n_features_in_))
+    result = benchmark(model, X)
+    print(
+        f"1 linha: sklearn {result['sklearn_row'] * 1e3:.2f} ms, compilado {result['compiled_row'] * 1e3:.3f} ms | "
+        f"{result['rows']} linhas: sklearn {result['sklearn_batch'] * 1e3:.2f} ms, "
+        f"compilado {result['compiled_batch'] * 1e3:.3f} ms"
+    )
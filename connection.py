@@ -0,0 +1,172 @@
+"""Supervised ``IQ_Option`` session: reconnects, backoff and circuit breaker.
+
+Every API call goes through :py:meth:`ConnectionSupervisor.call`. When a
+call fails, one thread reconnects the existing client (the other threads
+that failed on the same session wait for it and then retry) after an
+exponential backoff with jitter. After ``failure_threshold`` failed
+reconnects in a row the circuit opens: calls fail fast with
+:class:`CircuitOpenError` for ``reset_seconds``, then a single reconnect is
+attempted again. :py:meth:`ConnectionSupervisor.available` lets the trading
+loop back off while the circuit is open, and a heartbeat thread reconnects
+a dropped websocket before the next call notices.
+"""
+
+import random
+import threading
+import time
+
+from utils import log
+
+CLOSED = "closed"
+OPEN = "open"
+
+
+class CircuitOpenError(ConnectionError):
+    """Raised instead of calling the API while the circuit is open."""
+
+
+class ConnectionSupervisor:
+    """Own the API client and serialize reconnects.
+
+    *client* needs ``connect()`` (returning ``(ok, reason)`` like
+    ``IQ_Option.connect`` or a bool) and, for the heartbeat,
+    ``check_connect()``.
+    """
+
+    def __init__(
+        self,
+        client,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        failure_threshold: int = 5,
+        reset_seconds: float = 60.0,
+        heartbeat_seconds: float = 30.0,
+        clock=time.monotonic,
+        sleep=time.sleep,
+        rand=random.random,
+    ):
+        self.client = client
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.clock = clock
+        self.sleep = sleep
+        self.rand = rand
+        self.on_reconnect = []
+        self.state = CLOSED
+        self._opened_at = None
+        self._generation = 0
+        self._consecutive = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._metrics = {
+            'calls': 0, 'call_failures': 0, 'rejected': 0,
+            'reconnects': 0, 'reconnect_failures': 0,
+            'last_reconnect_seconds': None, 'reconnect_seconds_total': 0.0,
+        }
+
+    def backoff(self, attempt: int) -> float:
+        """Delay before reconnect *attempt* (0-based): exponential, capped, half of it random."""
+        if attempt <= 0:
+            return 0.0
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return delay / 2 + self.rand() * delay / 2
+
+    def available(self) -> bool:
+        """``False`` while the circuit is open and calls would be rejected."""
+        return self.state == CLOSED or self.clock() - self._opened_at >= self.reset_seconds
+
+    def connect(self) -> bool:
+        """Connect (or reconnect) the client now; return ``True`` on success."""
+        return self.reconnect(self._generation, force=True)
+
+    def reconnect(self, generation: int = None, force: bool = False) -> bool:
+        """Reconnect unless another thread already did since *generation* was read."""
+        with self._lock:
+            if generation is not None and generation != self._generation and not force:
+                return True
+            if not self.available():
+                return False
+            self.sleep(self.backoff(self._consecutive))
+            start = self.clock()
+            try:
+                result = self.client.connect()
+                ok, reason = result if isinstance(result, tuple) else (bool(result), None)
+            except Exception as exc:
+                ok, reason = False, exc
+            elapsed = self.clock() - start
+            if not ok:
+                self._consecutive += 1
+                self._metrics['reconnect_failures'] += 1
+                log(f"Falha ao reconectar ({self._consecutive}): {reason}", level="error")
+                if self._consecutive >= self.failure_threshold:
+                    if self.state != OPEN:
+                        log(f"Circuito aberto por {self.reset_seconds:.0f}s após {self._consecutive} falhas", level="error")
+                    self.state, self._opened_at = OPEN, self.clock()
+                return False
+            self._generation += 1
+            self._consecutive = 0
+            self.state = CLOSED
+            self._metrics['reconnects'] += 1
+            self._metrics['last_reconnect_seconds'] = elapsed
+            self._metrics['reconnect_seconds_total'] += elapsed
+        for callback in self.on_reconnect:
+            try:
+                callback()
+            except Exception as exc:
+                log(f"Erro após reconectar: {exc}", level="error")
+        return True
+
+    def call(self, fn, *args, retries: int = 3, **kwargs):
+        """Return ``fn(*args, **kwargs)``, reconnecting and retrying up to *retries* times in total.
+
+        Raises :class:`CircuitOpenError` while the circuit is open and the
+        last exception once the retries are exhausted. Use ``retries=1`` for
+        calls that must not be repeated (e.g. placing an order).
+        """
+        error = None
+        for _ in range(max(1, retries)):
+            if not self.available():
+                self._metrics['rejected'] += 1
+                raise CircuitOpenError("Conexão indisponível (circuito aberto)")
+            generation = self._generation
+            self._metrics['calls'] += 1
+            try:
+                return fn(*args, **kwargs)
+            except Exception as exc:
+                error = exc
+                self._metrics['call_failures'] += 1
+                log(f"Erro na chamada à API ({exc}), reconectando...", level="error")
+                self.reconnect(generation)
+        raise error
+
+    def metrics(self) -> dict:
+        """Return call, reconnect and circuit counters."""
+        return dict(self._metrics, state=self.state, consecutive_failures=self._consecutive)
+
+    def _heartbeat(self) -> None:
+        while not self._stop.wait(self.heartbeat_seconds):
+            try:
+                alive = self.client.check_connect()
+            except Exception:
+                alive = False
+            if not alive:
+                log("Heartbeat: conexão perdida, reconectando...", level="error")
+                self.reconnect(self._generation)
+
+    def start(self) -> None:
+        """Start the heartbeat thread."""
+        if self._thread is None and self.heartbeat_seconds:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._heartbeat, name="heartbeat", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the heartbeat thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
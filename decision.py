@@ -0,0 +1,181 @@
+"""Decision kernel shared by the live loop, the backtester and ML features.
+
+:func:`score` turns indicator values into the trade direction and the
+confluence matrix of :mod:`signals`; :func:`feature_columns` turns the same
+inputs into the ML feature columns logged with every trade. Both accept a
+latest-values record of one asset (``StreamingIndicators.values``), a
+DataFrame of indicator columns (every candle of a backtest), or columns
+stacked across many assets with :func:`stack`, and broadcast like NumPy.
+
+Breakouts are passed encoded as ``1`` (up), ``-1`` (down) or ``0`` like
+:py:meth:`technical.TechnicalAnalyzer.detect_breakouts`; patterns as the
+pattern name or ``None``.
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from signals import HTF_SIGNALS, SIGNALS, confluence_matrix, htf_confluence_matrix, trade_direction
+
+BREAKOUTS = {"breakout_up": 1, "breakout_down": -1}
+# Indicator columns read by the kernel, with the value used when one is missing.
+COLUMNS = {
+    'close': np.nan, 'SUPERT': np.nan, 'VWAP': np.nan, 'EMA_CROSS': False,
+    'MACD_HIST': 0.0, 'ADX14': 0.0, 'RSI7': 50.0, 'ATR14': 0.0,
+}
+
+
+def breakout_code(label) -> int:
+    """Encode a :py:meth:`technical.TechnicalAnalyzer.detect_breakout` label."""
+    return BREAKOUTS.get(label, 0)
+
+
+def volume_ratio(volume, period: int) -> float:
+    """Latest volume over the mean of the last *period* volumes (``0`` if unknown).
+
+    Same value as ``volume / volume.rolling(period).mean()`` on the last
+    candle, without computing the rolling mean over the whole window.
+    """
+    volume = np.asarray(volume, dtype=float)
+    if len(volume) < period:
+        return 0.0
+    average = volume[-period:].mean()
+    return float(volume[-1] / average) if average > 0 else 0.0
+
+
+def stack(records) -> dict:
+    """Stack latest-values records of many assets into one array per :data:`COLUMNS` entry."""
+    return {
+        column: np.array([record.get(column, default) for record in records], dtype=type(default))
+        for column, default in COLUMNS.items()
+    }
+
+
+def _column(values, name):
+    return np.asarray(values.get(name, COLUMNS[name]), dtype=type(COLUMNS[name]))
+
+
+def score(values, trend, breakout, pattern, volume_ratio, ml_high=False, htf=None) -> tuple:
+    """Return ``(direction, matrix)`` for the given indicator *values*.
+
+    *direction* is ``1`` (call), ``-1`` (put) or ``0`` per row; *matrix*
+    has one column per :data:`signals.SIGNALS` entry, followed by the
+    :data:`signals.HTF_SIGNALS` columns when *htf* (``(trends, closes,
+    supertrends)`` per confirmation timeframe) is given.
+    """
+    close = _column(values, 'close')
+    supertrend = _column(values, 'SUPERT')
+    direction = trade_direction(trend, close, supertrend)
+    matrix = confluence_matrix(
+        trend, np.asarray(breakout) != 0, np.not_equal(np.asarray(pattern, dtype=object), None), volume_ratio,
+        _column(values, 'EMA_CROSS'), _column(values, 'MACD_HIST'), _column(values, 'ADX14'),
+        close, supertrend, _column(values, 'VWAP'), ml_high,
+    )
+    if htf is not None:
+        matrix = np.column_stack((matrix, htf_confluence_matrix(direction, *htf)))
+    return direction, matrix
+
+
+def signal_columns(htf: bool = False) -> tuple:
+    """Names of the columns of a :func:`score` matrix."""
+    return SIGNALS + HTF_SIGNALS if htf else SIGNALS
+
+
+def feature_columns(values, trend, breakout, pattern, volume_ratio, payout=None) -> dict:
+    """Return the ML feature columns (``MLModel``/``TradeJournal`` fields) for *values*.
+
+    ``payout`` is left out when *payout* is ``None``.
+    """
+    pattern = np.asarray(pattern, dtype=object)
+    breakout = np.asarray(breakout)
+    columns = {
+        'pattern_name': np.where(np.not_equal(pattern, None), pattern, "unknown"),
+        'breakout': np.select([breakout > 0, breakout < 0], ["breakout_up", "breakout_down"], "none"),
+        'trend': np.asarray(trend),
+        'volume_ratio': np.asarray(volume_ratio, dtype=float),
+        'payout': np.asarray(np.nan if payout is None else payout, dtype=float),
+        'ema_cross': _column(values, 'EMA_CROSS').astype(bool),
+        'rsi7': _column(values, 'RSI7'),
+        'macd_hist': _column(values, 'MACD_HIST'),
+        'adx14': _column(values, 'ADX14'),
+        'atr14': _column(values, 'ATR14'),
+    }
+    if payout is None:
+        del columns['payout']
+    return columns
+
+
+def feature_rows(columns: dict) -> list:
+    """Split :func:`feature_columns` of many rows into one dict of plain Python values per row."""
+    names = list(columns)
+    lists = [column.tolist() for column in np.broadcast_arrays(*(np.atleast_1d(columns[n]) for n in names))]
+    return [dict(zip(names, row)) for row in zip(*lists)]
+
+
+def _old_decision(df, latest, payout, period):
+    """The per-asset computation the live loop did before this kernel (for the benchmark)."""
+    avg_volume = df['volume'].rolling(period).mean().iloc[-1]
+    ratio = latest['volume'] / avg_volume if avg_volume > 0 else 0
+    trend = "up" if latest['MA_fast'] > latest['MA_slow'] else "down"
+    feature_row = {
+        "pattern_name": "unknown", "breakout": "none", "trend": trend, "volume_ratio": ratio,
+        "payout": payout, "ema_cross": bool(latest['EMA_CROSS']),
+        "rsi7": float(latest.get('RSI7', 50.0)), "macd_hist": float(latest.get('MACD_HIST', 0.0)),
+        "adx14": float(latest.get('ADX14', 0.0)), "atr14": float(latest.get('ATR14', 0.0)),
+    }
+    direction = int(trade_direction(trend, latest['close'], latest['SUPERT'])[0])
+    row = confluence_matrix(
+        trend, False, False, ratio, latest['EMA_CROSS'], latest['MACD_HIST'], latest['ADX14'],
+        latest['close'], latest['SUPERT'], latest['VWAP'], False,
+    )[0]
+    return direction, int(row.sum()), feature_row
+
+
+def benchmark(assets: int = 35, candles: int = 100, repeat: int = 50) -> dict:
+    """Median seconds per cycle for *assets* assets: per-asset pandas path vs the batched kernel."""
+    import pandas as pd
+
+    rng = np.random.default_rng(0)
+    frames, records = [], []
+    for _ in range(assets):
+        close = 1.1 + np.cumsum(rng.normal(0, 0.001, candles))
+        df = pd.DataFrame({'close': close, 'volume': rng.integers(1, 100, candles).astype(float)})
+        latest = {
+            'close': close[-1], 'volume': df['volume'].iloc[-1], 'MA_fast': close[-20:].mean(),
+            'MA_slow': close[-50:].mean(), 'SUPERT': close[-1] - 0.001, 'VWAP': close.mean(),
+            'EMA_CROSS': True, 'MACD_HIST': 0.0001, 'ADX14': 25.0, 'RSI7': 55.0, 'ATR14': 0.001,
+        }
+        frames.append(df)
+        records.append(latest)
+
+    def kernel_cycle():
+        trends = np.array(["up" if r['MA_fast'] > r['MA_slow'] else "down" for r in records])
+        ratios = np.array([volume_ratio(df['volume'].to_numpy(), 20) for df in frames])
+        values = stack(records)
+        rows = feature_rows(feature_columns(values, trends, 0, None, ratios, 0.85))
+        direction, matrix = score(values, trends, 0, None, ratios)
+        return direction, matrix.sum(axis=1), rows
+
+    def median(fn):
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - start)
+        return float(np.median(samples))
+
+    return {
+        'per_asset': median(lambda: [_old_decision(df, latest, 0.85, 20) for df, latest in zip(frames, records)]),
+        'kernel': median(kernel_cycle),
+        'assets': assets,
+    }
+
+
+if __name__ == "__main__":
+    result = benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 35)
+    print(
+        f"{result['assets']} ativos por ciclo: por ativo {result['per_asset'] * 1e3:.2f} ms, "
+        f"kernel {result['kernel'] * 1e3:.2f} ms"
+    )
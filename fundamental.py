@@ -1,34 +1,151 @@
 """Fundamental analysis using ForexFactory news feed."""
 
-import feedparser
+import calendar
+import re
+import threading
+import time
+from bisect import bisect_left
 from datetime import datetime
+
 from utils import log
 
+HIGH_IMPACT = ('high', 'important')
+CURRENCIES = ('USD', 'EUR', 'GBP', 'JPY', 'AUD', 'CAD', 'CHF', 'NZD', 'CNY')
+_CURRENCY = re.compile(r'\b(' + '|'.join(CURRENCIES) + r')\b')
+
+
+def asset_currencies(asset: str) -> set:
+    """Return the currencies of an asset name such as ``EURUSD`` or ``BTCUSD-OTC``."""
+    symbol = asset.split('-')[0].upper()
+    return {symbol[:-3], symbol[-3:]} if len(symbol) > 3 else {symbol}
+
+
 class FundamentalAnalyzer:
-    """Check for upcoming high-impact news events."""
+    """Check for upcoming high-impact news events.
 
-    def __init__(self, buffer_minutes: int = 60):
+    The calendar is downloaded at most every ``refresh_seconds`` with a
+    conditional GET (ETag/Last-Modified), either lazily on the next check or
+    by a background thread started with :py:meth:`start`. Events are kept as
+    sorted epoch times, globally and per currency, so each check is a
+    bisect.
+    """
+
+    def __init__(self, buffer_minutes: int = 60, refresh_seconds: float = 300, feed_url: str = None, clock=time.time):
         self.buffer_minutes = buffer_minutes
-        self.feed_url = "https://nfs.forexfactory.net/rss/economic_calendar.xml"
+        self.refresh_seconds = refresh_seconds
+        self.feed_url = feed_url or "https://nfs.forexfactory.net/rss/economic_calendar.xml"
+        self.clock = clock
+        self.last_refresh = None
+        self._etag = None
+        self._modified = None
+        self._events = ([], [])
+        self._by_currency = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
 
-    def check_high_impact_news(self) -> bool:
-        """Return ``True`` if a relevant news event is within the buffer."""
+    def refresh(self) -> bool:
+        """Download the calendar if it changed; return ``True`` when events were replaced."""
         log("Verificando notícias...")
-        feed = feedparser.parse(self.feed_url)
-        now = datetime.utcnow()
+        self.last_refresh = self.clock()
+        import feedparser
+
+        feed = feedparser.parse(self.feed_url, etag=self._etag, modified=self._modified)
+        if feed.get('status') == 304:
+            return False
+        if feed.get('bozo') and not feed.entries:
+            log(f"Falha ao ler calendário de notícias: {feed.get('bozo_exception')}", level="warning")
+            return False
+        self._etag = feed.get('etag')
+        self._modified = feed.get('modified')
+
+        events = []
         for entry in feed.entries:
             impact = entry.get('category', '').lower()
-            event_time = self._parse_time(entry.get('published', ''))
-            if event_time and impact in ['high', 'important']:
-                diff = (event_time - now).total_seconds() / 60
-                if 0 <= diff <= self.buffer_minutes:
-                    log(f"Notícia {entry.title} em {diff:.1f} min — Pausando robô!")
-                    return True
+            event_time = self._event_time(entry)
+            if event_time is not None and impact in HIGH_IMPACT:
+                events.append((event_time, entry.get('title', ''), self._currency(entry)))
+        events.sort(key=lambda e: e[0])
+
+        by_currency = {}
+        for event in events:
+            times, titles = by_currency.setdefault(event[2], ([], []))
+            times.append(event[0])
+            titles.append(event[1])
+        with self._lock:
+            self._events = ([e[0] for e in events], [e[1] for e in events])
+            self._by_currency = by_currency
+        return True
+
+    def start(self) -> None:
+        """Refresh the calendar every ``refresh_seconds`` in a daemon thread."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._refresh_loop, name="news", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background refresh thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _refresh_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as exc:
+                log(f"Falha ao atualizar notícias: {exc}", level="error")
+            self._stop.wait(self.refresh_seconds)
+
+    def _ensure_fresh(self) -> None:
+        if self._thread is not None:
+            return
+        if self.last_refresh is None or self.clock() - self.last_refresh >= self.refresh_seconds:
+            self.refresh()
+
+    def check_high_impact_news(self, asset: str = None) -> bool:
+        """Return ``True`` if a relevant news event is within the buffer.
+
+        With *asset* only events for its currencies count (events whose
+        currency is unknown always count); without it any event does.
+        """
+        self._ensure_fresh()
+        now = self.clock()
+        with self._lock:
+            if asset is None:
+                calendars = [self._events]
+            else:
+                calendars = [self._by_currency[c] for c in (asset_currencies(asset) | {None}) if c in self._by_currency]
+        for times, titles in calendars:
+            i = bisect_left(times, now)
+            if i < len(times) and times[i] - now <= self.buffer_minutes * 60:
+                diff = (times[i] - now) / 60
+                log(f"Notícia {titles[i]} em {diff:.1f} min — Pausando {asset or 'robô'}!")
+                return True
         return False
 
+    def _event_time(self, entry):
+        """Return the event time of a feed entry in epoch seconds, or ``None``."""
+        parsed = entry.get('published_parsed')
+        if parsed:
+            return float(calendar.timegm(parsed))
+        event_time = self._parse_time(entry.get('published', ''))
+        return None if event_time is None else float(calendar.timegm(event_time.timetuple()))
+
+    def _currency(self, entry):
+        """Return the currency an entry refers to (``country`` field or a currency code in the title)."""
+        country = entry.get('country') or entry.get('ff_country')
+        if country:
+            return country.strip().upper()
+        match = _CURRENCY.search(entry.get('title', ''))
+        return match.group(1) if match else None
+
     def _parse_time(self, time_str):
         """Parse a time string from the feed into ``datetime``."""
         try:
             return datetime.strptime(time_str, "%a, %d %b %Y %H:%M:%S %Z")
-        except:
-            return None
\ No newline at end of file
+        except ValueError:
+            return None
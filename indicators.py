@@ -0,0 +1,340 @@
+"""Incremental (streaming) versions of the indicators in ``TechnicalAnalyzer``.
+
+Every indicator keeps the state reached after the last *closed* candle and
+the state including the current candle. ``update(..., new=True)`` commits the
+current candle and applies a new one; ``new=False`` re-applies the in-progress
+candle on top of the committed state. Both cost O(1) regardless of history.
+
+The formulas mirror pandas-ta (non TA-Lib mode): EMAs seeded with an SMA,
+Wilder smoothing as ``ewm(alpha=1/n, adjust=False)``, rolling windows with
+``min_periods=length``.
+"""
+
+import math
+from collections import deque
+
+NAN = float('nan')
+
+
+class _Smoothed:
+    """Exponential smoothing matching ``Series.ewm(alpha, adjust=False).mean()``.
+
+    With ``presma`` the first ``length`` inputs are replaced by their mean,
+    as pandas-ta does for EMA and ATR.
+    """
+
+    def __init__(self, length: int, alpha: float, presma: bool = False):
+        self.length = length
+        self.alpha = alpha
+        self.presma = presma
+        # (inputs seen, seed sum, seed count, weighted, old weight)
+        self._base = self._state = (0, 0.0, 0, NAN, 1.0)
+
+    def update(self, x: float, new: bool = True) -> float:
+        if new:
+            self._base = self._state
+        seen, total, valid, weighted, old_wt = self._base
+        seen += 1
+        if self.presma and seen <= self.length:
+            if x == x:
+                total += x
+                valid += 1
+            if seen < self.length:
+                self._state = (seen, total, valid, weighted, old_wt)
+                return NAN
+            x = total / valid if valid else NAN
+
+        if weighted == weighted:
+            old_wt *= 1.0 - self.alpha
+            if x == x:
+                if weighted != x:
+                    weighted = (old_wt * weighted + self.alpha * x) / (old_wt + self.alpha)
+                old_wt = 1.0
+        elif x == x:
+            weighted = x
+        self._state = (seen, total, valid, weighted, old_wt)
+        return weighted
+
+
+def ema(length: int) -> _Smoothed:
+    """EMA seeded with the SMA of the first ``length`` values."""
+    return _Smoothed(length, 2.0 / (length + 1), presma=True)
+
+
+def rma(length: int) -> _Smoothed:
+    """Wilder's moving average."""
+    return _Smoothed(length, 1.0 / length)
+
+
+class RollingWindow:
+    """Rolling mean and sample standard deviation over ``length`` values.
+
+    Sums are kept relative to a reference value and recomputed exactly every
+    ``length`` insertions, so rounding errors never accumulate.
+    """
+
+    def __init__(self, length: int):
+        self.length = length
+        self._values = deque(maxlen=length)
+        self._ref = 0.0
+        self._sum = 0.0
+        self._sumsq = 0.0
+        self._pushes = 0
+
+    def _add(self, x: float) -> None:
+        d = x - self._ref
+        self._sum += d
+        self._sumsq += d * d
+
+    def _remove(self, x: float) -> None:
+        d = x - self._ref
+        self._sum -= d
+        self._sumsq -= d * d
+
+    def _resum(self) -> None:
+        self._ref = self._values[-1]
+        deltas = [v - self._ref for v in self._values]
+        self._sum = math.fsum(deltas)
+        self._sumsq = math.fsum(d * d for d in deltas)
+
+    def update(self, x: float, new: bool = True) -> None:
+        if new or not self._values:
+            if len(self._values) == self.length:
+                self._remove(self._values[0])
+            self._values.append(x)
+            self._add(x)
+            self._pushes += 1
+            if self._pushes % self.length == 0:
+                self._resum()
+        else:
+            self._remove(self._values[-1])
+            self._values[-1] = x
+            self._add(x)
+
+    @property
+    def full(self) -> bool:
+        return len(self._values) == self.length
+
+    def mean(self) -> float:
+        if not self.full:
+            return NAN
+        return self._ref + self._sum / self.length
+
+    def std(self) -> float:
+        if not self.full or self.length < 2:
+            return NAN
+        n = self.length
+        var = (self._sumsq - self._sum * self._sum / n) / (n - 1)
+        return math.sqrt(var) if var > 0 else 0.0
+
+
+class _Previous:
+    """Remember the value of the previous candle for differencing."""
+
+    def __init__(self):
+        self._base = self._state = None
+
+    def update(self, value, new: bool = True):
+        """Store *value* and return the one from the previous candle."""
+        if new:
+            self._base = self._state
+        self._state = value
+        return self._base
+
+
+class ATR:
+    """Average true range with pandas-ta's SMA seed."""
+
+    def __init__(self, length: int = 14, prenan: bool = False):
+        self.prenan = prenan
+        self._prev_close = _Previous()
+        self._avg = _Smoothed(length, 1.0 / length, presma=True)
+
+    def update(self, high, low, close, new: bool = True) -> float:
+        pc = self._prev_close.update(close, new)
+        if pc is None:
+            tr = NAN if self.prenan else high - low
+        else:
+            tr = max(high - low, abs(high - pc), abs(pc - low))
+        return self._avg.update(tr, new)
+
+
+class RSI:
+    def __init__(self, length: int = 14):
+        self._prev_close = _Previous()
+        self._gain = rma(length)
+        self._loss = rma(length)
+
+    def update(self, close, new: bool = True) -> float:
+        pc = self._prev_close.update(close, new)
+        diff = NAN if pc is None else close - pc
+        gain = self._gain.update(max(diff, 0.0) if diff == diff else NAN, new)
+        loss = self._loss.update(min(diff, 0.0) if diff == diff else NAN, new)
+        denom = gain + abs(loss)
+        return 100.0 * gain / denom if denom else NAN
+
+
+class MACD:
+    """MACD histogram; the signal EMA starts at the first valid MACD value."""
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self._fast = ema(fast)
+        self._slow = ema(slow)
+        self._signal = ema(signal)
+
+    def update(self, close, new: bool = True) -> float:
+        macd = self._fast.update(close, new) - self._slow.update(close, new)
+        if macd != macd:
+            return NAN
+        return macd - self._signal.update(macd, new)
+
+
+class ADX:
+    def __init__(self, length: int = 14):
+        self._atr = ATR(length, prenan=True)
+        self._prev = _Previous()
+        self._pos = rma(length)
+        self._neg = rma(length)
+        self._adx = rma(length)
+
+    def update(self, high, low, close, new: bool = True) -> float:
+        atr = self._atr.update(high, low, close, new)
+        prev = self._prev.update((high, low), new)
+        if prev is None:
+            pos = neg = NAN
+        else:
+            up = high - prev[0]
+            dn = prev[1] - low
+            pos = up if up > dn and up > 0 else 0.0
+            neg = dn if dn > up and dn > 0 else 0.0
+        k = 100.0 / atr if atr else NAN
+        dmp = k * self._pos.update(pos, new)
+        dmn = k * self._neg.update(neg, new)
+        denom = dmp + dmn
+        dx = 100.0 * abs(dmp - dmn) / denom if denom else NAN
+        return self._adx.update(dx, new)
+
+
+class Supertrend:
+    def __init__(self, length: int = 10, multiplier: float = 3.0):
+        self.multiplier = multiplier
+        self._atr = ATR(length)
+        # (direction, lower band, upper band) of the previous candle
+        self._base = self._state = None
+
+    def update(self, high, low, close, new: bool = True) -> float:
+        if new:
+            self._base = self._state
+        matr = self.multiplier * self._atr.update(high, low, close, new)
+        hl2 = (high + low) / 2.0
+        lb = hl2 - matr
+        ub = hl2 + matr
+        if self._base is None:
+            self._state = (1, lb, ub)
+            return NAN
+        direction, prev_lb, prev_ub = self._base
+        if close > prev_ub:
+            direction = 1
+        elif close < prev_lb:
+            direction = -1
+        else:
+            if direction > 0 and lb < prev_lb:
+                lb = prev_lb
+            if direction < 0 and ub > prev_ub:
+                ub = prev_ub
+        self._state = (direction, lb, ub)
+        return lb if direction > 0 else ub
+
+
+class VWAP:
+    """Volume weighted average price anchored to the UTC day."""
+
+    def __init__(self):
+        self._base = self._state = (None, 0.0, 0.0)
+
+    def update(self, timestamp, high, low, close, volume, new: bool = True) -> float:
+        if new:
+            self._base = self._state
+        day, pv, vol = self._base
+        today = int(timestamp // 86400)
+        if day != today:
+            pv, vol = 0.0, 0.0
+        pv += (high + low + close) / 3.0 * volume
+        vol += volume
+        self._state = (today, pv, vol)
+        return pv / vol if vol else NAN
+
+
+class StreamingIndicators:
+    """Incremental indicator state for a single asset.
+
+    :py:meth:`update` takes one candle (new or an update of the latest one)
+    and returns the latest values under the same names the batch path writes
+    as DataFrame columns.
+    """
+
+    def __init__(self, ma_fast: int = 20, ma_slow: int = 50):
+        self.last_time = None
+        self._ma_fast = RollingWindow(ma_fast)
+        self._ma_slow = RollingWindow(ma_slow)
+        self._vwap = VWAP()
+        self._supertrend = Supertrend(10, 3.0)
+        self._ema5 = ema(5)
+        self._ema20 = ema(20)
+        self._rsi7 = RSI(7)
+        self._macd = MACD(12, 26, 9)
+        self._bbands = RollingWindow(20)
+        self._adx14 = ADX(14)
+        self._atr14 = ATR(14)
+        self.values = {}
+
+    def update(self, timestamp, open_, high, low, close, volume) -> dict:
+        """Apply the candle opened at *timestamp* (epoch seconds).
+
+        Candles older than the latest one seen are ignored.
+        """
+        if self.last_time is not None and timestamp < self.last_time:
+            return self.values
+        new = timestamp != self.last_time
+        self.last_time = timestamp
+
+        self._ma_fast.update(close, new)
+        self._ma_slow.update(close, new)
+        self._bbands.update(close, new)
+        ema5 = self._ema5.update(close, new)
+        ema20 = self._ema20.update(close, new)
+        mid = self._bbands.mean()
+        std = self._bbands.std()
+
+        self.values = {
+            'open': open_,
+            'high': high,
+            'low': low,
+            'close': close,
+            'volume': volume,
+            'MA_fast': self._ma_fast.mean(),
+            'MA_slow': self._ma_slow.mean(),
+            'VWAP': self._vwap.update(timestamp, high, low, close, volume, new),
+            'SUPERT': self._supertrend.update(high, low, close, new),
+            'EMA5': ema5,
+            'EMA20': ema20,
+            'EMA_CROSS': bool(ema5 > ema20),
+            'RSI7': self._rsi7.update(close, new),
+            'MACD_HIST': self._macd.update(close, new),
+            'BB_UP': mid + 2 * std,
+            'BB_DN': mid - 2 * std,
+            'ADX14': self._adx14.update(high, low, close, new),
+            'ATR14': self._atr14.update(high, low, close, new),
+        }
+        return self.values
+
+    def update_frame(self, df) -> dict:
+        """Feed the candles of *df* that are not older than the latest one seen."""
+        times = df['from'].to_numpy() if 'from' in df.columns else df.index.as_unit('s').asi8
+        start = 0
+        if self.last_time is not None:
+            start = int(times.searchsorted(self.last_time))
+        rows = df[['open', 'high', 'low', 'close', 'volume']].to_numpy()
+        for t, row in zip(times[start:], rows[start:]):
+            self.update(int(t), *(float(v) for v in row))
+        return self.values
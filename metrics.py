@@ -0,0 +1,201 @@
+"""Latency histograms for the trading loop, exported in Prometheus text format.
+
+:py:meth:`Metrics.time` and :py:meth:`Metrics.observe` add one sample to a
+fixed-bucket histogram keyed by metric name and labels (``stage``,
+``asset``...). A sample costs a ``perf_counter`` call, a ``bisect`` and a
+few additions under a lock, so instrumentation can stay on in production.
+
+:py:meth:`Metrics.serve` exposes ``/metrics`` on a local port for
+Prometheus; :py:meth:`Metrics.dump_if_due` logs a per-stage summary every
+``dump_seconds`` instead, for setups without a scraper.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils import log
+
+# Upper bounds (seconds) of the histogram buckets; +Inf is implicit.
+BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0,
+)
+
+
+class Histogram:
+    """Cumulative-bucket histogram with sum, count and max."""
+
+    __slots__ = ('counts', 'sum', 'count', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the *q* quantile."""
+        rank, seen = q * self.count, 0
+        for bound, count in zip(BUCKETS + (float('inf'),), self.counts):
+            seen += count
+            if seen >= rank and count:
+                return min(bound, self.max)
+        return self.max
+
+
+def _labels(labels) -> str:
+    return ",".join(f'{key}="{value}"' for key, value in labels)
+
+
+class Metrics:
+    """Registry of histograms plus gauges read from callables at export time."""
+
+    def __init__(self, dump_seconds: float = None, clock=time.monotonic):
+        self.dump_seconds = dump_seconds
+        self.clock = clock
+        self.gauges = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._last_dump = clock()
+        self._server = None
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        """Add *value* to the histogram *name* with *labels*."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def time(self, stage: str, asset=None):
+        """Time the enclosed block as ``bot_stage_seconds{stage, asset}``."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            if asset is None:
+                self.observe('bot_stage_seconds', elapsed, stage=stage)
+            else:
+                self.observe('bot_stage_seconds', elapsed, stage=stage, asset=asset)
+
+    def timed(self, stage: str, fn):
+        """Wrap ``fn(asset, ...)`` so each call is timed under *stage* for its asset."""
+        def wrapper(asset, *args, **kwargs):
+            with self.time(stage, asset):
+                return fn(asset, *args, **kwargs)
+        return wrapper
+
+    def histograms(self) -> dict:
+        """Return a snapshot ``(name, labels) -> Histogram``."""
+        with self._lock:
+            snapshot = {}
+            for key, histogram in self._histograms.items():
+                copy = Histogram()
+                copy.counts, copy.sum = list(histogram.counts), histogram.sum
+                copy.count, copy.max = histogram.count, histogram.max
+                snapshot[key] = copy
+            return snapshot
+
+    def render(self) -> str:
+        """Return all metrics in the Prometheus text exposition format."""
+        lines = []
+        typed = set()
+        for (name, labels), histogram in sorted(self.histograms().items()):
+            if name not in typed:
+                lines.append(f"# TYPE {name} histogram")
+                typed.add(name)
+            cumulative = 0
+            for bound, count in zip(BUCKETS + (float('inf'),), histogram.counts):
+                cumulative += count
+                le = "+Inf" if bound == float('inf') else repr(bound)
+                lines.append(f'{name}_bucket{{{_labels(labels + (("le", le),))}}} {cumulative}')
+            suffix = f"{{{_labels(labels)}}}" if labels else ""
+            lines.append(f"{name}_sum{suffix} {histogram.sum!r}")
+            lines.append(f"{name}_count{suffix} {histogram.count}")
+        for prefix, source in self.gauges.items():
+            try:
+                values = source()
+            except Exception as exc:
+                log(f"Erro ao ler métricas {prefix}: {exc}", level="error")
+                continue
+            for key, value in sorted(values.items()):
+                if isinstance(value, (bool, int, float)):
+                    lines.append(f"# TYPE {prefix}_{key} gauge")
+                    lines.append(f"{prefix}_{key} {float(value)!r}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> dict:
+        """Per ``(name, stage)``, all assets merged: count, mean, p95 and max in seconds."""
+        merged = {}
+        for (name, labels), histogram in self.histograms().items():
+            key = (name, dict(labels).get('stage'))
+            total = merged.setdefault(key, Histogram())
+            total.counts = [a + b for a, b in zip(total.counts, histogram.counts)]
+            total.sum += histogram.sum
+            total.count += histogram.count
+            total.max = max(total.max, histogram.max)
+        return {
+            key: {
+                'count': h.count, 'mean': h.sum / h.count if h.count else 0.0,
+                'p95': h.quantile(0.95), 'max': h.max,
+            }
+            for key, h in merged.items()
+        }
+
+    def dump_if_due(self) -> bool:
+        """Log :py:meth:`summary` if ``dump_seconds`` passed since the last dump."""
+        if not self.dump_seconds or self.clock() - self._last_dump < self.dump_seconds:
+            return False
+        self._last_dump = self.clock()
+        for (name, stage), values in sorted(self.summary().items(), key=lambda item: (item[0][0], str(item[0][1]))):
+            label = f"{name}[{stage}]" if stage else name
+            log(
+                f"Métricas {label}: n={values['count']} média={values['mean'] * 1e3:.1f}ms "
+                f"p95<={values['p95'] * 1e3:.1f}ms máx={values['max'] * 1e3:.1f}ms"
+            )
+        return True
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> int:
+        """Serve ``/metrics`` from a daemon thread; return the bound port."""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True).start()
+        log(f"Métricas em http://{host}:{self._server.server_address[1]}/metrics")
+        return self._server.server_address[1]
+
+    def close(self) -> None:
+        """Stop the HTTP endpoint."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
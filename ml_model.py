@@ -1,102 +1,346 @@
 """ml_model.py — Machine learning utilities for trade decision making."""
+import multiprocessing
 import os
-from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
 
-import joblib
+import numpy as np
 import pandas as pd
-from sklearn.ensemble import RandomForestClassifier
 
+from compiled_forest import CompiledForest
+from online_model import ModelComparison, OnlineModel
+from trade_journal import TEXT_FIELDS, TradeJournal
 from utils import log
 
 
+class FeatureEncoder:
+    """Encode feature dicts into the column layout of a fitted model.
+
+    The layout is derived once from ``feature_names_in_``: numeric columns
+    are copied as is and ``<field>_<value>`` columns produced by
+    ``pd.get_dummies`` for the text fields become one-hot lookups. Unknown
+    categories encode as all zeros, like the missing dummy columns of the
+    per-row path.
+    """
+
+    def __init__(self, columns, text_fields=TEXT_FIELDS):
+        self.columns = list(columns)
+        self.numeric = []
+        self.onehot = {}
+        for index, column in enumerate(self.columns):
+            field = next((f for f in text_fields if column.startswith(f + '_')), None)
+            if field is None:
+                self.numeric.append((column, index))
+            else:
+                self.onehot[(field, column[len(field) + 1:])] = index
+        self.text_fields = sorted({field for field, _ in self.onehot})
+        self._buffer = np.zeros((0, len(self.columns)))
+
+    def encode(self, rows) -> np.ndarray:
+        """Return a matrix with one row per feature dict (reuses an internal buffer)."""
+        n = len(rows)
+        if self._buffer.shape[0] < n:
+            self._buffer = np.zeros((max(n, 2 * self._buffer.shape[0]), len(self.columns)))
+        X = self._buffer[:n]
+        X.fill(0.0)
+        for i, row in enumerate(rows):
+            for column, index in self.numeric:
+                X[i, index] = row.get(column, 0)
+            for field in self.text_fields:
+                index = self.onehot.get((field, row.get(field)))
+                if index is not None:
+                    X[i, index] = 1.0
+        return X
+
+
+def compiled_path(model_file: str) -> str:
+    """Path of the :class:`CompiledForest` snapshot published next to *model_file*."""
+    return os.path.splitext(model_file)[0] + '.npz'
+
+
+def save_compiled(compiled: CompiledForest, model_file: str) -> None:
+    """Publish *compiled* as the snapshot of *model_file*, atomically."""
+    tmp = f"{compiled_path(model_file)}.{compiled.version}.tmp"
+    with open(tmp, 'wb') as file:
+        compiled.save(file)
+    os.replace(tmp, compiled_path(model_file))
+
+
+def fit_model(journal_path: str, model_file: str, days: int = 7, n_jobs: int = -1):
+    """Train a RandomForest on the last *days* of the journal and publish it to *model_file*.
+
+    Runs in a worker process. The model is written next to *model_file* and
+    moved over it with ``os.replace``, so readers never see a partial file;
+    its :class:`CompiledForest` snapshot is published after it, so the
+    trading process can load the model without importing sklearn.
+    Returns ``(version, message)``; ``version`` is ``None`` when nothing was
+    trained.
+    """
+    import joblib
+    from sklearn.ensemble import RandomForestClassifier
+
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    df = TradeJournal(journal_path).read(since=cutoff)
+    if df.empty:
+        return None, "Nenhum dado disponível para treinar!"
+
+    if len(df) < 50:
+        return None, f"Dados insuficientes para treinar — apenas {len(df)} trades"
+
+    X = pd.get_dummies(df.drop(columns=['timestamp', 'result']))
+    y = df['result']
+
+    # Check class balance
+    if len(y.unique()) < 2:
+        return None, "Apenas uma classe presente nos dados — pulando treino."
+
+    model = RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=n_jobs)
+    model.fit(X, y)
+    version = datetime.now().strftime('%Y%m%dT%H%M%S')
+    tmp = f"{model_file}.{version}.tmp"
+    joblib.dump({'model': model, 'version': version, 'trades': len(df)}, tmp)
+    os.replace(tmp, model_file)
+    save_compiled(CompiledForest.from_model(model, version), model_file)
+    return version, f"Modelo {version} treinado com {len(df)} trades e salvo!"
+
+
 class MLModel:
-    def __init__(self, filename: str = 'trade_data.csv', model_file: str = 'ml_model.pkl'):
+    def __init__(
+        self,
+        filename: str = 'trade_journal.bin',
+        model_file: str = 'ml_model.pkl',
+        legacy_csv: str = 'trade_data.csv',
+        n_jobs: int = -1,
+        online_file: str = None,
+        mode: str = 'batch',
+    ):
         self.filename = filename
         self.model_file = model_file
-        self.model = None
+        self.n_jobs = n_jobs
+        self.online_file = online_file
+        self.mode = mode
+        self.online = None
+        self.comparison = ModelComparison()
+        if online_file:
+            self.online = OnlineModel.load(online_file) if os.path.exists(online_file) else OnlineModel()
+        self._model = None
+        self.version = None
+        self._compiled = None
+        self._encoder = None
+        self._training = None
+        self._pool = None
         self.last_train_date = None
-        # Initialize by attempting to load or train a model
+        self.journal = TradeJournal(filename)
+        if not os.path.exists(filename) and legacy_csv and os.path.exists(legacy_csv):
+            imported = self.journal.import_csv(legacy_csv)
+            log(f"{imported} trades importados de {legacy_csv} para {filename}")
+        # Start from the last published model; train in the background if there is none
         self.load_model()
+        if self.version is None and len(self.journal) >= 50:
+            self.train_async()
 
     def log_trade(self, features: dict, result: bool) -> None:
-        """Persist a single trade's features and outcome."""
-        features['timestamp'] = datetime.now()
-        features['result'] = int(result)
-        df = pd.DataFrame([features])
-        df.to_csv(
-            self.filename,
-            mode='a',
-            header=not os.path.exists(self.filename),
-            index=False
-        )
+        """Queue a single trade's features and outcome in the journal.
+
+        With an online model the outcome is first scored by both models for
+        :py:attr:`comparison` and then learned by the online model.
+        """
+        self.journal.append(features, result)
+        if self.online is not None:
+            batch = self.probabilities([features])
+            self.comparison.record(
+                {
+                    'batch': None if batch is None else float(batch[0]),
+                    'online': float(self.online.predict_proba([features])[0]),
+                },
+                result,
+            )
+            self.online.update([features], [result])
 
     def train_model(self) -> None:
-        """Train the RandomForest model using data from the last seven days."""
+        """Train the RandomForest model using data from the last seven days (blocking)."""
         log("Treinando modelo de ML com dados dos últimos 7 dias...")
-        if not os.path.exists(self.filename):
-            log("Nenhum dado disponível para treinar!")
-            return
-
-        df = pd.read_csv(self.filename, parse_dates=['timestamp'])
-        cutoff = datetime.now() - timedelta(days=7)
-        df = df[df['timestamp'] >= cutoff]
-
-        if len(df) < 50:
-            log(f"Dados insuficientes para treinar — apenas {len(df)} trades")
-            return
-
-        X = pd.get_dummies(df.drop(columns=['timestamp', 'result']))
-        y = df['result']
-
-        # Check class balance
-        if len(y.unique()) < 2:
-            log("Apenas uma classe presente nos dados — pulando treino.", level="warning")
-            return
-
-        model = RandomForestClassifier(n_estimators=100, random_state=42)
-        model.fit(X, y)
-        joblib.dump(model, self.model_file)
-        self.model = model
-        log("Modelo treinado e salvo!")
-
-    def load_model(self) -> None:
-        """Attempt to train with recent data, then fallback to saved model."""
-        self.train_model()
+        self.journal.flush()
+        self._published(fit_model(self.filename, self.model_file, n_jobs=self.n_jobs))
+        self.last_train_date = datetime.now()
+
+    def train_async(self) -> bool:
+        """Start :func:`fit_model` in a worker process; return ``False`` if one is already running.
+
+        The current model keeps serving predictions until :py:meth:`poll_training`
+        sees the new one published and swaps it in.
+        """
+        if self._training is not None:
+            return False
+        log("Treinando modelo de ML em segundo plano com dados dos últimos 7 dias...")
+        self.journal.flush()
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+        self._training = self._pool.submit(fit_model, self.filename, self.model_file, n_jobs=self.n_jobs)
         self.last_train_date = datetime.now()
+        return True
 
-        if self.model is None and os.path.exists(self.model_file):
-            self.model = joblib.load(self.model_file)
-            log("Modelo de ML carregado!")
+    def poll_training(self) -> bool:
+        """Swap in the model published by a finished background training; return ``True`` if swapped."""
+        if self._training is None or not self._training.done():
+            return False
+        future, self._training = self._training, None
+        try:
+            return self._published(future.result())
+        except Exception as exc:
+            log(f"Erro no treino do modelo: {exc}", level="error")
+            return False
+
+    def _published(self, outcome) -> bool:
+        version, message = outcome
+        log(message, level="info" if version else "warning")
+        return version is not None and self.load_model()
+
+    @property
+    def model(self):
+        """The published sklearn model, unpickled on first use when only its snapshot was loaded."""
+        if self._model is None and self._compiled is not None and os.path.exists(self.model_file):
+            model, version = self._unpickle()
+            if version == self.version:
+                self._model = model
+        return self._model
+
+    @model.setter
+    def model(self, model) -> None:
+        self._model = model
+
+    def _unpickle(self):
+        import joblib
+
+        payload = joblib.load(self.model_file)
+        if isinstance(payload, dict):
+            return payload['model'], payload['version']
+        return payload, 'legacy'
+
+    def load_model(self) -> bool:
+        """Load the last published model from disk; return ``True`` if one was loaded.
+
+        The :class:`CompiledForest` snapshot is read when it is at least as
+        new as *model_file*, which takes milliseconds and no sklearn import;
+        otherwise the model is unpickled and the snapshot written for the
+        next start.
+        """
+        if not os.path.exists(self.model_file):
+            return False
+        snapshot = compiled_path(self.model_file)
+        if os.path.exists(snapshot) and os.path.getmtime(snapshot) >= os.path.getmtime(self.model_file):
+            model, compiled = None, CompiledForest.load(snapshot)
+            version = compiled.version or 'legacy'
+        else:
+            model, version = self._unpickle()
+            compiled = CompiledForest.from_model(model, version) if hasattr(model, 'estimators_') else None
+            if compiled is not None:
+                try:
+                    save_compiled(compiled, self.model_file)
+                except OSError as exc:
+                    log(f"Não foi possível salvar {snapshot}: {exc}", level="warning")
+        # Swapped on the loop thread, so a cycle sees either the old or the new model.
+        self._model, self._compiled = model, compiled
+        self.version = version
+        log(f"Modelo de ML {version} carregado!")
+        return True
+
+    def close(self) -> None:
+        """Write pending trades, save the online model and stop the training worker."""
+        self.journal.close()
+        if self.online is not None:
+            self.online.save(self.online_file)
+            log(f"Comparação batch x online: {self.comparison.summary()}")
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
 
     def predict_high_chance(self, features: dict) -> bool:
         """Return True if model predicts probability >= 0.8, or allow if insufficient classes or no model."""
-        if self.model is None:
-            self.load_model()
-        if self.model is None:
-            return True
-
-        X = pd.DataFrame([features])
-        X = pd.get_dummies(X)
-        cols = getattr(self.model, 'feature_names_in_', None)
-        if cols is None:
-            return True
-        for col in cols:
-            if col not in X.columns:
-                X[col] = 0
-        X = X[cols]
+        return bool(self.predict_high_chances([features])[0])
+
+    def predict_high_chances(self, rows) -> np.ndarray:
+        """Batch :py:meth:`predict_high_chance` for the feature dicts of every asset in a cycle.
+
+        The rows are encoded into one matrix and scored in one call of the
+        compiled forest (see :mod:`compiled_forest`). With ``mode='online'`` the online model
+        decides instead of the RandomForest.
+        """
+        if self.mode == 'online' and self.online is not None and rows:
+            return self.online.predict_proba(rows) >= 0.8
+        proba = self.probabilities(rows)
+        if proba is None:
+            return np.ones(len(rows), dtype=bool)
+        return proba >= 0.8
 
-        proba = self.model.predict_proba(X)[0]
+    def probabilities(self, rows):
+        """Return the batch model's win probability per row, or ``None`` when it cannot score."""
+        model, compiled = self._model, self._compiled
+        if (model is None and compiled is None) or not rows:
+            return None
+
+        if compiled is not None and model is None:
+            cols = compiled.feature_names
+        else:
+            cols = getattr(model, 'feature_names_in_', None)
+        if cols is None:
+            return None
+        if self._encoder is None or self._encoder.columns != list(cols):
+            self._encoder = FeatureEncoder(cols)
+        if compiled is not None:
+            proba = compiled.predict_proba(self._encoder.encode(rows))
+        else:
+            X = pd.DataFrame(self._encoder.encode(rows), columns=self._encoder.columns, copy=False)
+            proba = model.predict_proba(X)
 
         # Check number of classes present
-        if proba.shape[0] < 2:
+        if proba.shape[1] < 2:
             log("Modelo treinado apenas em uma classe — liberando operação.", level="warning")
-            return True
+            return None
 
-        return proba[1] >= 0.8
+        return proba[:, 1]
 
     def check_and_train_daily(self) -> None:
-        """Train the model at 6 AM once per day."""
+        """Start the daily 6 AM training, swap in finished models and write due journal batches."""
+        self.journal.flush_if_due()
+        self.poll_training()
         now = datetime.now()
         if now.hour == 6 and (self.last_train_date is None or self.last_train_date.date() < now.date()):
-            self.train_model()
-            self.last_train_date = now
+            self.train_async()
+
+
+def _old_predict_high_chance(model, features: dict) -> bool:
+    """The per-row ``pd.get_dummies`` scoring used before :class:`FeatureEncoder` (for the benchmark)."""
+    X = pd.get_dummies(pd.DataFrame([features]))
+    cols = model.feature_names_in_
+    for col in cols:
+        if col not in X.columns:
+            X[col] = 0
+    return model.predict_proba(X[cols])[0][1] >= 0.8
+
+
+def benchmark(ml: MLModel, rows, repeat: int = 20) -> dict:
+    """Time scoring *rows* with the old per-row path versus one batched call (seconds per cycle)."""
+    import time
+
+    model = ml.model
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for row in rows:
+            _old_predict_high_chance(model, row)
+    per_row = (time.perf_counter() - start) / repeat
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        ml.predict_high_chances(rows)
+    batched = (time.perf_counter() - start) / repeat
+    return {'rows': len(rows), 'per_row': per_row, 'batched': batched}
+
+
+if __name__ == "__main__":
+    model = MLModel()
+    sample = model.journal.read().drop(columns=['timestamp', 'result']).tail(33).to_dict('records')
+    result = benchmark(model, sample)
+    print(
+        f"{result['rows']} ativos: por linha {result['per_row'] * 1000:.1f} ms, "
+        f"em lote {result['batched'] * 1000:.1f} ms"
+    )
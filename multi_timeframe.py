@@ -0,0 +1,166 @@
+"""Higher-timeframe bars and indicators built from one base candle feed.
+
+:class:`MultiTimeframeEngine` receives the base candles of an asset (e.g.
+M1) and aggregates them into M5/M15/H1 bars aligned to the epoch, so no
+extra ``get_candles`` calls are needed after startup. Each timeframe keeps its own
+:class:`candle_store.CandleBuffer` and :class:`indicators.StreamingIndicators`.
+"Live" timeframes (the one trades are decided on) also apply the
+in-progress bar; the others only update their indicators when a bar closes,
+i.e. when the first base candle of the next bar arrives.
+
+With ``fetch(asset, timeframe, count)`` (raw ``get_candles`` candles) the
+first update of an asset backfills every higher timeframe with its closed
+bars, so slow moving averages are ready at once instead of after the base
+feed has covered ``ma_slow`` bars (about two days for H1).
+"""
+
+import numpy as np
+
+from candle_store import COLUMNS, CandleBuffer, _FROM
+from indicators import StreamingIndicators
+from utils import log
+
+
+class TimeframeSeries:
+    """Bars and indicator state of one asset on one timeframe."""
+
+    def __init__(self, timeframe: int, size: int = 100, ma_fast: int = 20, ma_slow: int = 50, live: bool = False):
+        self.timeframe = timeframe
+        self.live = live
+        self.buffer = CandleBuffer(size)
+        self.indicators = StreamingIndicators(ma_fast, ma_slow)
+        self._start = None
+        self._parts = {}
+        self._floor = None
+
+    def _bar(self) -> tuple:
+        parts = [self._parts[t] for t in sorted(self._parts)]
+        return (
+            self._start, parts[0][1], max(p[2] for p in parts),
+            min(p[3] for p in parts), parts[-1][4], sum(p[5] for p in parts),
+        )
+
+    def _apply(self, bar) -> None:
+        self.buffer.extend([bar])
+        self.indicators.update(*bar)
+
+    def backfill(self, bars, until) -> int:
+        """Apply the closed *bars* (``COLUMNS`` rows) opened before *until*; return how many.
+
+        Base candles of those bars are ignored afterwards.
+        """
+        bars = [tuple(bar) for bar in bars if bar[_FROM] < until]
+        for bar in bars:
+            self._apply(bar)
+        self._floor = until
+        return len(bars)
+
+    def add(self, row) -> bool:
+        """Add or update one base candle; return ``True`` if it closed the previous bar."""
+        start = int(row[_FROM]) // self.timeframe * self.timeframe
+        if self._start is not None and start < self._start:
+            return False
+        if self._floor is not None and start < self._floor:
+            return False
+        closed = False
+        if self._start is not None and start > self._start:
+            bar = self._bar()
+            if not self.live:
+                self._apply(bar)
+            closed = True
+            self._parts = {}
+        self._start = start
+        self._parts[int(row[_FROM])] = tuple(row)
+        if self.live:
+            self._apply(self._bar())
+        return closed
+
+    @property
+    def values(self) -> dict:
+        """Latest indicator values (including the in-progress bar for live timeframes)."""
+        return self.indicators.values
+
+
+class MultiTimeframeEngine:
+    """Per-asset :class:`TimeframeSeries` for every configured timeframe."""
+
+    def __init__(self, base_timeframe: int, timeframes, live=(), size: int = 100, ma_fast: int = 20, ma_slow: int = 50, fetch=None):
+        for timeframe in timeframes:
+            if timeframe % base_timeframe:
+                raise ValueError(f"Timeframe {timeframe}s não é múltiplo da base {base_timeframe}s")
+        self.base_timeframe = base_timeframe
+        self.timeframes = tuple(timeframes)
+        self.live = set(live)
+        self.size = size
+        self.ma_fast = ma_fast
+        self.ma_slow = ma_slow
+        self.fetch = fetch
+        self._series = {}
+        self._last = {}
+
+    def _asset(self, asset) -> dict:
+        if asset not in self._series:
+            self._series[asset] = {
+                tf: TimeframeSeries(tf, self.size, self.ma_fast, self.ma_slow, live=tf in self.live)
+                for tf in self.timeframes
+            }
+        return self._series[asset]
+
+    def series(self, asset, timeframe) -> TimeframeSeries:
+        """Return the series of *asset* on *timeframe*."""
+        return self._asset(asset)[timeframe]
+
+    def update(self, asset, df) -> list:
+        """Feed the base candles of *df* not older than the last one seen.
+
+        Returns the timeframes on which a bar closed.
+        """
+        series = self._asset(asset)
+        values = df[list(COLUMNS)].to_numpy(dtype=float)
+        last = self._last.get(asset)
+        if last is None and self.fetch is not None and len(values):
+            self._backfill(asset, series, values[-1, _FROM])
+        if last is not None:
+            values = values[values[:, _FROM] >= last]
+        closed = set()
+        for row in values:
+            for timeframe, timeframe_series in series.items():
+                if timeframe_series.add(row):
+                    closed.add(timeframe)
+        if len(values):
+            self._last[asset] = values[-1, _FROM]
+        return sorted(closed)
+
+    def _backfill(self, asset, series, now) -> None:
+        for timeframe, timeframe_series in series.items():
+            if timeframe == self.base_timeframe:
+                continue
+            try:
+                candles = self.fetch(asset, timeframe, self.size) or []
+            except Exception as exc:
+                log(f"[{asset}] Sem histórico de {timeframe}s ({exc}); indicadores aquecem com as velas ao vivo", level="warning")
+                continue
+            bars = [
+                (c['from'], c['open'], c['max'], c['min'], c['close'], c['volume'])
+                for c in sorted(candles, key=lambda c: c['from'])
+            ]
+            timeframe_series.backfill(bars, now // timeframe * timeframe)
+
+    def frame(self, asset, timeframe):
+        """Return the bars of *asset* on *timeframe* as an OHLCV DataFrame."""
+        return self.series(asset, timeframe).buffer.to_frame()
+
+    def values(self, asset, timeframe) -> dict:
+        """Latest indicator values of *asset* on *timeframe*."""
+        return self.series(asset, timeframe).values
+
+    def confirmations(self, asset, timeframes) -> tuple:
+        """Return ``(trends, closes, supertrends)`` of the last closed bar on each of *timeframes*."""
+        trends, closes, supertrends = [], [], []
+        for timeframe in timeframes:
+            latest = self.values(asset, timeframe)
+            fast, slow = latest.get('MA_fast', np.nan), latest.get('MA_slow', np.nan)
+            trends.append("up" if fast > slow else "down" if fast < slow else "flat")
+            closes.append(latest.get('close', np.nan))
+            supertrends.append(latest.get('SUPERT', np.nan))
+        return trends, closes, supertrends
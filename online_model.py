@@ -0,0 +1,131 @@
+"""Online logistic model of trade outcomes, updated on every logged trade.
+
+The encoding is fixed up front (:data:`NUMERIC` plus one-hot columns for
+:data:`CATEGORIES`), so an update costs the same no matter how many trades
+were seen. Numeric features are standardized with exponentially weighted
+statistics whose half-life is ``half_life`` updates; together with a
+constant learning rate the model follows recent trades and forgets old ones
+without storing them.
+"""
+
+import os
+
+import numpy as np
+
+from patterns import PATTERNS
+
+NUMERIC = ('volume_ratio', 'payout', 'ema_cross', 'rsi7', 'macd_hist', 'adx14', 'atr14')
+CATEGORIES = {
+    'pattern_name': ('unknown',) + tuple(sorted(PATTERNS)),
+    'breakout': ('none', 'breakout_up', 'breakout_down'),
+    'trend': ('up', 'down', 'flat'),
+}
+
+
+class OnlineModel:
+    """Logistic regression fitted by SGD on single trades or mini-batches."""
+
+    def __init__(self, learning_rate: float = 0.05, l2: float = 1e-4, half_life: float = 500):
+        self.learning_rate = learning_rate
+        self.l2 = l2
+        self.half_life = half_life
+        self.decay = 0.5 ** (1.0 / half_life)
+        self._offsets = {}
+        offset = len(NUMERIC)
+        for field, values in CATEGORIES.items():
+            self._offsets[field] = {value: offset + i for i, value in enumerate(values)}
+            offset += len(values)
+        self.size = offset + 1  # last column is the bias
+        self.weights = np.zeros(self.size)
+        self.mean = np.zeros(len(NUMERIC))
+        self.var = np.zeros(len(NUMERIC))
+        self.weight_sum = 0.0
+        self.updates = 0
+
+    def encode(self, rows) -> np.ndarray:
+        """Return the standardized design matrix for a list of feature dicts."""
+        X = np.zeros((len(rows), self.size))
+        X[:, -1] = 1.0
+        for i, row in enumerate(rows):
+            X[i, :len(NUMERIC)] = [float(row.get(name, 0) or 0) for name in NUMERIC]
+            for field, offsets in self._offsets.items():
+                index = offsets.get(row.get(field))
+                if index is not None:
+                    X[i, index] = 1.0
+        return X
+
+    def _standardize(self, X: np.ndarray) -> np.ndarray:
+        X[:, :len(NUMERIC)] = (X[:, :len(NUMERIC)] - self.mean) / (np.sqrt(self.var) + 1e-9)
+        return X
+
+    def predict_proba(self, rows) -> np.ndarray:
+        """Return the probability of a win for each feature dict."""
+        X = self._standardize(self.encode(rows))
+        return 1.0 / (1.0 + np.exp(-(X @ self.weights)))
+
+    def update(self, rows, results) -> None:
+        """Take one SGD step on a trade or mini-batch of trades and their outcomes."""
+        X = self.encode(rows)
+        y = np.asarray(results, dtype=float)
+        for x in X[:, :len(NUMERIC)]:
+            self.weight_sum = self.decay * self.weight_sum + 1.0
+            alpha = 1.0 / self.weight_sum
+            delta = x - self.mean
+            self.mean += alpha * delta
+            self.var = (1.0 - alpha) * (self.var + alpha * delta ** 2)
+        X = self._standardize(X)
+        p = 1.0 / (1.0 + np.exp(-(X @ self.weights)))
+        gradient = X.T @ (p - y) / len(y) + self.l2 * self.weights
+        self.weights -= self.learning_rate * gradient
+        self.updates += len(y)
+
+    def save(self, path: str) -> None:
+        """Write the model state to *path* (``.npz``), replacing it atomically."""
+        tmp = path + '.tmp.npz'
+        np.savez(
+            tmp, weights=self.weights, mean=self.mean, var=self.var,
+            scalars=np.array([self.learning_rate, self.l2, self.half_life, self.weight_sum, self.updates]),
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'OnlineModel':
+        """Restore a model written by :py:meth:`save`."""
+        with np.load(path) as state:
+            learning_rate, l2, half_life, weight_sum, updates = state['scalars']
+            model = cls(learning_rate, l2, half_life)
+            if state['weights'].shape != model.weights.shape:
+                raise ValueError(f"{path} foi salvo com outra codificação de features")
+            model.weights = state['weights']
+            model.mean = state['mean']
+            model.var = state['var']
+        model.weight_sum = float(weight_sum)
+        model.updates = int(updates)
+        return model
+
+
+class ModelComparison:
+    """Prequential scores of two models: each trade is scored before either learns it."""
+
+    def __init__(self):
+        self.trades = 0
+        self.correct = {'batch': 0, 'online': 0}
+        self.log_loss = {'batch': 0.0, 'online': 0.0}
+
+    def record(self, probabilities: dict, result: bool) -> None:
+        """Add one outcome; *probabilities* maps model name to its win probability (or ``None``)."""
+        self.trades += 1
+        for name, p in probabilities.items():
+            if p is None:
+                p = 0.5
+            self.correct[name] += int((p >= 0.5) == bool(result))
+            p = min(max(p, 1e-15), 1 - 1e-15)
+            self.log_loss[name] -= np.log(p if result else 1 - p)
+
+    def summary(self) -> dict:
+        """Return accuracy and mean log-loss per model."""
+        n = max(self.trades, 1)
+        return {
+            name: {'accuracy': self.correct[name] / n, 'log_loss': self.log_loss[name] / n}
+            for name in self.correct
+        }
@@ -0,0 +1,240 @@
+"""Walk-forward search for the confluence thresholds and indicator periods.
+
+Every asset is optimized independently in a process pool. A worker builds
+one :class:`backtest.IndicatorCache` for its asset, so the fixed M5
+indicators and patterns are computed once and moving averages, volume means
+and breakouts once per distinct period, however many parameter sets share
+them. For each walk-forward fold the parameter set with the best flat-stake
+profit on the training window is replayed on the following test window;
+the out-of-sample results of all folds are reported with the parameters
+chosen on the most recent training window.
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from backtest import IndicatorCache
+from utils import STRENGTH_LEVELS, load_config, log
+
+# Parameter -> candidate values searched by default.
+SPACE = {
+    'trend_ma_fast': (5, 10, 20, 30),
+    'trend_ma_slow': (30, 50, 100, 200),
+    'volume_period': (10, 20, 50),
+    'breakout_lookback': (10, 20, 50),
+    'min_confluences': (4, 5, 6, 7),
+}
+# Only worth searching with per-candle payouts: a single payout passes every
+# threshold alike (see walk_forward), e.g. ``parameter_sets({**SPACE, **PAYOUT_SPACE})``.
+PAYOUT_SPACE = {'min_payout': (0.70, 0.75, 0.80, 0.85)}
+
+
+def parameter_sets(space: dict = SPACE, trials: int = None, seed: int = 0) -> list:
+    """Return the full grid of *space*, or *trials* sets sampled from it at random."""
+    names = list(space)
+    grid = [dict(zip(names, values)) for values in itertools.product(*(space[n] for n in names))]
+    grid = [p for p in grid if p.get('trend_ma_fast', 0) < p.get('trend_ma_slow', np.inf)]
+    if trials is None or trials >= len(grid):
+        return grid
+    rng = np.random.default_rng(seed)
+    return [grid[i] for i in sorted(rng.choice(len(grid), size=trials, replace=False))]
+
+
+def folds(times: np.ndarray, train_days: float, test_days: float) -> list:
+    """Return ``(train_start, train_end, test_end)`` index triples stepping by the test window."""
+    times = np.asarray(times, dtype='datetime64[ns]')
+    if len(times) == 0:
+        return []
+    train, test = np.timedelta64(int(train_days * 86400), 's'), np.timedelta64(int(test_days * 86400), 's')
+    result = []
+    start = times[0]
+    while start + train + test <= times[-1] + np.timedelta64(1, 's'):
+        lo, mid, hi = np.searchsorted(times, [start, start + train, start + train + test])
+        result.append((int(lo), int(mid), int(hi)))
+        start += test
+    return result
+
+
+class AssetEvaluator:
+    """Score parameter sets on windows of one asset's candles."""
+
+    def __init__(self, df, config: dict, payout=0.8):
+        self.cache = IndicatorCache(df)
+        self.config = config
+        n = len(self.cache.close)
+        self.payout = np.broadcast_to(np.asarray(payout, dtype=float), (n,))
+        timeframe = config['timeframe_main']
+        duration = config.get('trade_duration', int(timeframe / 60))
+        self.expiry_bars = max(1, int(round(duration * 60 / timeframe)))
+        self._counts = {}
+
+    def _signals(self, params: dict):
+        key = (params['trend_ma_fast'], params['trend_ma_slow'], params['volume_period'], params['breakout_lookback'])
+        if key not in self._counts:
+            config = dict(self.config, **params)
+            _, _, _, direction, matrix = self.cache.signals(config)
+            self._counts[key] = (direction.astype(np.int8), matrix.sum(axis=1).astype(np.int8))
+        return self._counts[key]
+
+    def evaluate(self, params: dict, lo: int = 0, hi: int = None) -> dict:
+        """Flat-stake results of *params* for entries in candles ``[lo, hi)``.
+
+        Entries follow the live rules: a direction, at least
+        ``min_confluences`` signals, payout within ``min_payout`` (default:
+        the config's) and one open position at a time; the option expires
+        ``expiry_bars`` later.
+        """
+        direction, counts = self._signals(params)
+        min_payout = params.get('min_payout', self.config.get('min_payout', 0.0))
+        close = self.cache.close
+        hi = len(close) if hi is None else hi
+        last = min(hi, len(close) - self.expiry_bars)
+        window = slice(lo, max(lo, last))
+        ok = (
+            (direction[window] != 0)
+            & (counts[window] >= params['min_confluences'])
+            & (self.payout[window] >= min_payout)
+            & (self.payout[window] <= self.config.get('max_payout', 1.0))
+        )
+        entries = lo + np.flatnonzero(ok)
+        if self.expiry_bars > 1 and len(entries):
+            taken, busy = [], -1
+            for entry in entries.tolist():
+                if entry >= busy:
+                    taken.append(entry)
+                    busy = entry + self.expiry_bars
+            entries = np.array(taken, dtype=np.intp)
+        exits = entries + self.expiry_bars
+        win = direction[entries] * (close[exits] - close[entries]) > 0
+        profit = np.where(win, self.payout[entries], -1.0)
+        return {'trades': int(len(entries)), 'wins': int(win.sum()), 'profit': float(profit.sum())}
+
+
+def _better(result: dict, best: dict, min_trades: int) -> bool:
+    if best is None:
+        return True
+    enough, best_enough = result['trades'] >= min_trades, best['trades'] >= min_trades
+    if enough != best_enough:
+        return enough
+    return (result['profit'], result['trades']) > (best['profit'], best['trades'])
+
+
+def walk_forward(asset, df, config: dict, candidates: list, payout=0.8,
+                 train_days: float = 30, test_days: float = 7, min_trades: int = 10) -> dict:
+    """Run the walk-forward search for one asset; return its chosen parameters and OOS results.
+
+    *payout* is one payout or an array with the payout of every candle;
+    ``min_payout`` can only be searched with the latter.
+    """
+    if np.ndim(payout) == 0 and len({params.get('min_payout') for params in candidates}) > 1:
+        raise ValueError("min_payout só pode ser otimizado com o payout de cada vela")
+    evaluator = AssetEvaluator(df, config, payout)
+    splits = folds(df.index.to_numpy(), train_days, test_days)
+    if not splits:
+        splits = [(0, len(df), len(df))]
+    history = []
+    for lo, mid, hi in splits:
+        best_params, best = None, None
+        for params in candidates:
+            result = evaluator.evaluate(params, lo, mid)
+            if _better(result, best, min_trades):
+                best_params, best = params, result
+        history.append({
+            'train': best,
+            'test': evaluator.evaluate(best_params, mid, hi),
+            'params': best_params,
+        })
+    out_of_sample = {
+        key: sum(fold['test'][key] for fold in history) for key in ('trades', 'wins', 'profit')
+    }
+    return {
+        'asset': asset,
+        'params': history[-1]['params'],
+        'out_of_sample': out_of_sample,
+        'folds': history,
+    }
+
+
+def _walk_forward_quiet(*args, **kwargs):
+    logging.getLogger().setLevel(logging.WARNING)
+    return walk_forward(*args, **kwargs)
+
+
+def optimize(candles: dict, config: dict, candidates: list, payouts=0.8, workers: int = None, **kwargs) -> dict:
+    """Walk-forward optimize every asset of *candles* (``asset -> OHLCV DataFrame``) in a process pool."""
+    def payout_of(asset):
+        return payouts.get(asset, 0.8) if isinstance(payouts, dict) else payouts
+
+    results = {}
+    if workers == 0:
+        for asset, df in candles.items():
+            results[asset] = walk_forward(asset, df, config, candidates, payout_of(asset), **kwargs)
+        return results
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = {
+            pool.submit(_walk_forward_quiet, asset, df, config, candidates, payout_of(asset), **kwargs): asset
+            for asset, df in candles.items()
+        }
+        for future in as_completed(futures):
+            result = future.result()
+            results[result['asset']] = result
+            oos = result['out_of_sample']
+            log(f"[{result['asset']}] Otimizado: {result['params']} | fora da amostra: {oos}")
+    return results
+
+
+def best_configs(results: dict) -> dict:
+    """Return ``asset -> overrides`` for ``optimized_params_file`` in ``config.yaml``.
+
+    The searched periods keep their ``config.yaml`` keys; ``min_confluences``
+    becomes ``strength_levels``, the ``[forte, media, fraca]`` minimums that
+    :func:`utils.load_asset_overrides` turns into :func:`utils.entry_strength`
+    levels. ``out_of_sample`` is informative only.
+    """
+    configs = {}
+    for asset, result in results.items():
+        params = dict(result['params'])
+        media = params.pop('min_confluences')
+        forte, _, fraca = (level for level, _ in STRENGTH_LEVELS)
+        params['strength_levels'] = [max(forte, media + 1), media, min(fraca, media - 1)]
+        params['out_of_sample'] = result['out_of_sample']
+        configs[asset] = params
+    return configs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Walk-forward optimization over the stored candle history.")
+    parser.add_argument('--config', default='config.yaml')
+    parser.add_argument('--output', default='optimized_params.json')
+    parser.add_argument('--trials', type=int, default=None, help="random subset of the grid (default: full grid)")
+    parser.add_argument('--train-days', type=float, default=30)
+    parser.add_argument('--test-days', type=float, default=7)
+    parser.add_argument('--payout', type=float, default=0.85)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args(argv)
+
+    from candle_history import CandleHistory
+
+    config = load_config(args.config)
+    history = CandleHistory(config.get('history_dir') or 'history')
+    candles = history.frames(config['assets'], config['timeframe_main'])
+    candidates = parameter_sets(trials=args.trials)
+    log(f"Otimizando {len(candidates)} combinações em {len(candles)} ativos...")
+    results = optimize(
+        candles, config, candidates, payouts=args.payout, workers=args.workers,
+        train_days=args.train_days, test_days=args.test_days,
+    )
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(best_configs(results), file, indent=2, sort_keys=True)
+    log(f"Melhores parâmetros por ativo salvos em {args.output} (use em optimized_params_file no config.yaml)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Background tracking of open binary options until their result is known."""
+
+import json
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from utils import log
+
+
+class Position:
+    """An order waiting for its result."""
+
+    def __init__(self, asset, order_id, amount, direction, features, opened_at):
+        self.asset = asset
+        self.order_id = order_id
+        self.amount = amount
+        self.direction = direction
+        self.features = features
+        self.opened_at = opened_at
+        self.closed_at = None
+        self.result = None
+        self.profit = None
+
+
+class OrderTracker:
+    """Wait for order results in a thread pool instead of blocking the trading loop.
+
+    ``check(order_id)`` is called from a worker thread and must block until
+    the option closes, returning ``(won, profit)`` like ``IQ_Option.check_win``.
+    Finished positions are queued and handed to every ``on_result(position)``
+    callback from :py:meth:`poll`, i.e. on the thread running the loop, so
+    callbacks may update :class:`RiskManager` or :class:`MLModel` without locks.
+
+    :py:meth:`snapshot` and :py:meth:`restore` carry the open positions over
+    a restart, so their results still reach the callbacks.
+    """
+
+    def __init__(self, check, workers: int = 16, on_result=(), clock=time.time):
+        self.check = check
+        self.on_result = list(on_result)
+        self.clock = clock
+        self._open = {}
+        self._done = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._threads = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="orders")
+
+    def track(self, asset, order_id, amount, direction=None, features=None, opened_at=None) -> Position:
+        """Register an order just placed on *asset* and start waiting for its result."""
+        opened_at = self.clock() if opened_at is None else opened_at
+        position = Position(asset, order_id, amount, direction, features, opened_at)
+        with self._lock:
+            self._open[order_id] = position
+        self._threads.submit(self._wait, position)
+        return position
+
+    def _wait(self, position: Position) -> None:
+        try:
+            won, profit = self.check(position.order_id)
+        except Exception as exc:
+            log(f"[{position.asset}] Erro ao verificar resultado: {exc}", level="error")
+            won, profit = False, None
+        position.result = bool(won)
+        position.profit = profit
+        position.closed_at = self.clock()
+        self._done.put(position)
+
+    def poll(self) -> list:
+        """Dispatch the positions closed since the last call and return them."""
+        closed = []
+        while True:
+            try:
+                position = self._done.get_nowait()
+            except queue.Empty:
+                break
+            with self._lock:
+                self._open.pop(position.order_id, None)
+            log(f"[{position.asset}] Resultado da ordem {position.order_id}: {'Win' if position.result else 'Loss'}")
+            for callback in self.on_result:
+                try:
+                    callback(position)
+                except Exception as exc:
+                    log(f"[{position.asset}] Erro ao processar resultado: {exc}", level="error")
+            closed.append(position)
+        return closed
+
+    def is_open(self, asset) -> bool:
+        """Return ``True`` while *asset* has an order without a dispatched result."""
+        with self._lock:
+            return any(p.asset == asset for p in self._open.values())
+
+    @property
+    def open_positions(self) -> list:
+        """Positions still waiting for their result."""
+        with self._lock:
+            return list(self._open.values())
+
+    def snapshot(self) -> dict:
+        """Return the open positions as JSON strings for :mod:`snapshot`."""
+        positions = [
+            json.dumps({
+                'asset': p.asset, 'order_id': p.order_id, 'amount': p.amount,
+                'direction': p.direction, 'features': p.features, 'opened_at': p.opened_at,
+            }, default=str)
+            for p in self.open_positions
+        ]
+        return {'positions': np.array(positions, dtype=str)}
+
+    def restore(self, state: dict, since: float = None) -> list:
+        """Track again the positions of a :py:meth:`snapshot` and return them.
+
+        Positions opened before *since* (e.g. already expired, so the broker
+        will not report them any more) are skipped.
+        """
+        if not state:
+            return []
+        restored = []
+        for item in state['positions']:
+            saved = json.loads(str(item))
+            if since is not None and saved['opened_at'] < since:
+                log(f"[{saved['asset']}] Ordem {saved['order_id']} expirou durante a parada — resultado desconhecido", level="warning")
+                continue
+            restored.append(self.track(**saved))
+        return restored
+
+    def close(self, wait: bool = False) -> None:
+        """Stop the worker threads; with *wait* block until pending results are known."""
+        self._threads.shutdown(wait=wait, cancel_futures=not wait)
+        if wait:
+            self.poll()
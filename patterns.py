@@ -0,0 +1,242 @@
+"""Vectorized candlestick pattern detection on OHLC arrays.
+
+Each pattern is a NumPy expression over the current candle and the few
+candles before it. Values follow the TA-Lib convention: ``100`` bullish,
+``-100`` bearish, ``0`` no pattern.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class _Candles:
+    """OHLC arrays aligned so that ``o(k)`` is the open ``k`` candles back.
+
+    Shifted columns are cached because most patterns reuse the same ones.
+    """
+
+    def __init__(self, ohlc: np.ndarray, positions: np.ndarray, pad: int):
+        self._ohlc = ohlc
+        self._idx = positions + pad
+        self._cache = {}
+
+    def _col(self, col, k):
+        key = (col, k)
+        if key not in self._cache:
+            self._cache[key] = self._ohlc[self._idx - k, col]
+        return self._cache[key]
+
+    def o(self, k=0):
+        return self._col(0, k)
+
+    def h(self, k=0):
+        return self._col(1, k)
+
+    def l(self, k=0):
+        return self._col(2, k)
+
+    def c(self, k=0):
+        return self._col(3, k)
+
+    def body(self, k=0):
+        return np.abs(self.c(k) - self.o(k))
+
+    def range(self, k=0):
+        return self.h(k) - self.l(k)
+
+    def upper(self, k=0):
+        return self.h(k) - np.maximum(self.o(k), self.c(k))
+
+    def lower(self, k=0):
+        return np.minimum(self.o(k), self.c(k)) - self.l(k)
+
+    def bull(self, k=0):
+        return self.c(k) > self.o(k)
+
+    def bear(self, k=0):
+        return self.c(k) < self.o(k)
+
+
+def _signed(bullish, bearish):
+    return np.where(bullish, 100, np.where(bearish, -100, 0))
+
+
+def _doji(x):
+    rng = x.range()
+    return _signed((rng > 0) & (x.body() <= 0.1 * rng), False)
+
+
+def _hammer_shape(x):
+    rng = x.range()
+    return (rng > 0) & (x.body() <= 0.35 * rng) & (x.lower() >= 0.6 * rng) & (x.upper() <= 0.1 * rng)
+
+
+def _inverted_shape(x):
+    rng = x.range()
+    return (rng > 0) & (x.body() <= 0.35 * rng) & (x.upper() >= 0.6 * rng) & (x.lower() <= 0.1 * rng)
+
+
+def _hammer(x):
+    return _signed(_hammer_shape(x) & x.bear(1), False)
+
+
+def _hanging_man(x):
+    return _signed(False, _hammer_shape(x) & x.bull(1))
+
+
+def _inverted_hammer(x):
+    return _signed(_inverted_shape(x) & x.bear(1), False)
+
+
+def _shooting_star(x):
+    return _signed(False, _inverted_shape(x) & x.bull(1))
+
+
+def _engulfing(x):
+    larger = x.body() > x.body(1)
+    bullish = x.bear(1) & x.bull() & (x.o() <= x.c(1)) & (x.c() >= x.o(1)) & larger
+    bearish = x.bull(1) & x.bear() & (x.o() >= x.c(1)) & (x.c() <= x.o(1)) & larger
+    return _signed(bullish, bearish)
+
+
+def _harami(x):
+    top = np.maximum(x.o(), x.c())
+    bottom = np.minimum(x.o(), x.c())
+    bullish = x.bear(1) & x.bull() & (top < x.o(1)) & (bottom > x.c(1))
+    bearish = x.bull(1) & x.bear() & (top < x.c(1)) & (bottom > x.o(1))
+    return _signed(bullish, bearish)
+
+
+def _piercing(x):
+    mid = (x.o(1) + x.c(1)) / 2
+    return _signed(x.bear(1) & x.bull() & (x.o() < x.l(1)) & (x.c() > mid) & (x.c() < x.o(1)), False)
+
+
+def _dark_cloud_cover(x):
+    mid = (x.o(1) + x.c(1)) / 2
+    return _signed(False, x.bull(1) & x.bear() & (x.o() > x.h(1)) & (x.c() < mid) & (x.c() > x.o(1)))
+
+
+def _star(x):
+    long_first = x.body(2) > 0.6 * x.range(2)
+    small_middle = x.body(1) <= 0.3 * x.range(1)
+    mid = (x.o(2) + x.c(2)) / 2
+    morning = (
+        long_first & x.bear(2) & small_middle
+        & (np.maximum(x.o(1), x.c(1)) < x.c(2)) & x.bull() & (x.c() > mid)
+    )
+    evening = (
+        long_first & x.bull(2) & small_middle
+        & (np.minimum(x.o(1), x.c(1)) > x.c(2)) & x.bear() & (x.c() < mid)
+    )
+    return morning, evening
+
+
+def _morning_star(x):
+    return _signed(_star(x)[0], False)
+
+
+def _evening_star(x):
+    return _signed(False, _star(x)[1])
+
+
+def _three_soldiers(x):
+    small_wicks = (x.upper() <= 0.3 * x.body()) & (x.upper(1) <= 0.3 * x.body(1)) & (x.upper(2) <= 0.3 * x.body(2))
+    return _signed(
+        x.bull(2) & x.bull(1) & x.bull() & (x.c() > x.c(1)) & (x.c(1) > x.c(2))
+        & (x.o(1) > x.o(2)) & (x.o(1) < x.c(2)) & (x.o() > x.o(1)) & (x.o() < x.c(1)) & small_wicks,
+        False,
+    )
+
+
+def _three_crows(x):
+    small_wicks = (x.lower() <= 0.3 * x.body()) & (x.lower(1) <= 0.3 * x.body(1)) & (x.lower(2) <= 0.3 * x.body(2))
+    return _signed(
+        False,
+        x.bear(2) & x.bear(1) & x.bear() & (x.c() < x.c(1)) & (x.c(1) < x.c(2))
+        & (x.o(1) < x.o(2)) & (x.o(1) > x.c(2)) & (x.o() < x.o(1)) & (x.o() > x.c(1)) & small_wicks,
+    )
+
+
+def _marubozu(x):
+    rng = x.range()
+    full = (rng > 0) & (x.body() >= 0.95 * rng)
+    return _signed(full & x.bull(), full & x.bear())
+
+
+# name -> (candles needed, function)
+PATTERNS = {
+    'cdl3blackcrows': (3, _three_crows),
+    'cdl3whitesoldiers': (3, _three_soldiers),
+    'cdldarkcloudcover': (2, _dark_cloud_cover),
+    'cdldoji': (1, _doji),
+    'cdlengulfing': (2, _engulfing),
+    'cdleveningstar': (3, _evening_star),
+    'cdlhammer': (2, _hammer),
+    'cdlhangingman': (2, _hanging_man),
+    'cdlharami': (2, _harami),
+    'cdlinvertedhammer': (2, _inverted_hammer),
+    'cdlmarubozu': (1, _marubozu),
+    'cdlmorningstar': (3, _morning_star),
+    'cdlpiercing': (2, _piercing),
+    'cdlshootingstar': (2, _shooting_star),
+}
+
+
+class PatternScanner:
+    """Detect candlestick patterns using only the candles each pattern needs.
+
+    The pattern functions are resolved once here; :py:meth:`scan` evaluates
+    all of them on the last few candles and :py:meth:`label` on every candle
+    of a historical series.
+    """
+
+    def __init__(self, names=None):
+        names = sorted(PATTERNS) if names is None else list(names)
+        self.names = names
+        self._patterns = [PATTERNS[name] for name in names]
+        self.lookback = max(needed for needed, _ in self._patterns)
+
+    def _evaluate(self, ohlc: np.ndarray, positions: np.ndarray) -> np.ndarray:
+        """Return an ``(n_patterns, len(positions))`` matrix of pattern values."""
+        pad = self.lookback - 1
+        padded = np.vstack([np.full((pad, 4), np.nan), ohlc]) if pad else ohlc
+        candles = _Candles(padded, positions, pad)
+        out = np.zeros((len(self._patterns), len(positions)), dtype=np.int16)
+        with np.errstate(invalid='ignore'):
+            for i, (needed, func) in enumerate(self._patterns):
+                values = func(candles)
+                out[i] = np.where(positions >= needed - 1, values, 0)
+        return out
+
+    @staticmethod
+    def _ohlc(df: pd.DataFrame, last: int = None) -> np.ndarray:
+        cols = ('open', 'high', 'low', 'close')
+        if last is None:
+            return np.column_stack([df[c].to_numpy(dtype=float) for c in cols])
+        return np.column_stack([df[c].to_numpy(dtype=float)[-last:] for c in cols])
+
+    def scan(self, df: pd.DataFrame) -> list:
+        """Return ``(name, value)`` for every pattern formed by the last candle."""
+        if df.empty:
+            return []
+        ohlc = self._ohlc(df, last=self.lookback)
+        values = self._evaluate(ohlc, np.array([len(ohlc) - 1]))[:, 0]
+        return [(self.names[i], int(values[i])) for i in np.flatnonzero(values)]
+
+    def label(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Return one column of pattern values per pattern for every candle of *df*."""
+        values = self._evaluate(self._ohlc(df), np.arange(len(df)))
+        return pd.DataFrame(values.T, index=df.index, columns=self.names)
+
+    def first_pattern(self, df: pd.DataFrame) -> np.ndarray:
+        """Return the name of the first pattern found on each candle (``None`` if none).
+
+        Matches the live choice of ``patterns[0][0]`` in the bot.
+        """
+        values = self._evaluate(self._ohlc(df), np.arange(len(df)))
+        hit = values != 0
+        first = hit.argmax(axis=0)
+        names = np.array(self.names, dtype=object)[first]
+        names[~hit.any(axis=0)] = None
+        return names
@@ -0,0 +1,477 @@
+"""Run the bot without a broker: recorded sessions and a simulated ``IQ_Option``.
+
+:class:`Recorder` wraps the live client and appends every response of the
+calls the bot depends on (candles, payouts, orders and their results) to a
+JSON-lines file, gzip-compressed when the name ends in ``.gz``.
+:class:`ReplayClient` serves a recording back on a :class:`SimulatedClock`
+starting at the first recorded response: each call returns the newest
+response recorded for it up to the simulated time, and recorded failures
+are raised again. :class:`SimulatedIQOption` needs no recording: it
+generates deterministic random-walk candles and payouts per asset and
+settles orders against the same price path.
+
+The simulated clock runs ``speed`` times faster than real time (``0``:
+sleeps return at once and just advance it), so hours of trading replay in
+seconds. Pass it to :func:`bot.main` with the client::
+
+    python replay.py --hours 6 --speed 0
+
+runs the whole loop against :class:`SimulatedIQOption` and prints how long
+the cycles took.
+"""
+
+import argparse
+import gzip
+import json
+import os
+import tempfile
+import threading
+import time
+import zlib
+from bisect import bisect_right
+from collections import Counter, defaultdict, deque
+
+import numpy as np
+
+from utils import load_config, log
+
+# Client methods whose responses are recorded and replayed.
+RECORDED = ('get_candles', 'get_all_profit', 'buy', 'check_win', 'get_realtime_candles')
+
+
+class SimulationFinished(BaseException):
+    """Raised by the simulated clock once its end time has passed.
+
+    Derives from ``BaseException`` like ``KeyboardInterrupt`` so it stops
+    the loop through the ``except Exception`` handlers of the connection
+    supervisor and the loop itself.
+    """
+
+
+class SimulatedClock:
+    """Wall clock running *speed* times faster than real time, from *start*.
+
+    Provides ``time()`` and ``sleep()`` like the :mod:`time` module. With
+    ``speed=0`` sleeping does not wait at all and moves the clock forward
+    instead. Past *end*, :py:meth:`sleep` and :py:meth:`check` raise
+    :class:`SimulationFinished`.
+    """
+
+    def __init__(self, speed: float = 1000.0, start: float = None, end: float = None):
+        self.speed = speed
+        self.start = time.time() if start is None else start
+        self.end = end
+        self._origin = time.perf_counter()
+        self._skipped = 0.0
+        self._cond = threading.Condition()
+
+    def time(self) -> float:
+        return self.start + (time.perf_counter() - self._origin) * (self.speed or 1.0) + self._skipped
+
+    def check(self) -> None:
+        """Raise :class:`SimulationFinished` if the end time has passed."""
+        if self.end is not None and self.time() >= self.end:
+            raise SimulationFinished(f"Simulação encerrada em {self.end:.0f}")
+
+    def sleep(self, seconds: float) -> None:
+        self.check()
+        if seconds <= 0:
+            return
+        if self.speed:
+            time.sleep(seconds / self.speed)
+            return
+        with self._cond:
+            self._skipped += seconds
+            self._cond.notify_all()
+
+    def wait_until(self, when: float) -> None:
+        """Block the calling thread until the clock reaches *when* or is stopped (never raises).
+
+        For background threads: unlike :py:meth:`sleep` it does not move the
+        clock when ``speed`` is ``0``, it waits for the loop to do so.
+        """
+        with self._cond:
+            while (remaining := when - self.time()) > 0 and not (self.end is not None and self.time() >= self.end):
+                self._cond.wait(remaining / self.speed if self.speed else 0.05)
+
+    def stop(self) -> None:
+        """End the simulation now, releasing the threads in :py:meth:`wait_until`."""
+        with self._cond:
+            now = self.time()
+            self.end = now if self.end is None else min(self.end, now)
+            self._cond.notify_all()
+
+
+def _open(path, mode):
+    return gzip.open(path, mode, encoding='utf-8') if str(path).endswith('.gz') else open(path, mode, encoding='utf-8')
+
+
+class Recorder:
+    """Proxy for an ``IQ_Option`` client that records the :data:`RECORDED` calls to *path*.
+
+    Each line holds the time the response arrived, the method, its
+    arguments and either ``result`` or ``error``. Other attributes are
+    passed through unchanged.
+    """
+
+    def __init__(self, client, path, clock=time.time):
+        self.client = client
+        self.path = path
+        self.clock = clock
+        self._file = _open(path, 'at')
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        attribute = getattr(self.client, name)
+        if name not in RECORDED or not callable(attribute):
+            return attribute
+
+        def recorded(*args):
+            try:
+                result = attribute(*args)
+            except Exception as exc:
+                self._write({'method': name, 'args': args, 'error': f"{type(exc).__name__}: {exc}"})
+                raise
+            if name == 'get_realtime_candles' and isinstance(result, dict):
+                self._write({'method': name, 'args': args, 'result': [result[k] for k in sorted(result)]})
+            else:
+                self._write({'method': name, 'args': args, 'result': result})
+            return result
+
+        return recorded
+
+    def _write(self, record: dict) -> None:
+        line = json.dumps({'t': self.clock(), **record}, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+def _key(method, args):
+    """Requests answered by the same recorded responses (candle counts and end times aside)."""
+    if method in ('get_candles', 'get_realtime_candles'):
+        return method, args[0], args[1]
+    if method == 'buy':
+        return method, args[1], args[2]
+    if method == 'check_win':
+        return method, args[0]
+    return (method,)
+
+
+class ReplayClient:
+    """Serve the responses of a :class:`Recorder` file as an ``IQ_Option`` stand-in.
+
+    Candles and payouts are looked up by simulated time. Orders are
+    answered in recorded order per asset and direction; an order the
+    recording does not hold is refused with ``(False, None)``, and
+    ``check_win`` returns when the simulated time reaches the recorded
+    result. The clock ends with the last recorded response.
+    """
+
+    def __init__(self, path, speed: float = 1000.0, clock=None):
+        self.path = path
+        responses = defaultdict(list)
+        with _open(path, 'rt') as file:
+            for line in file:
+                if line.strip():
+                    record = json.loads(line)
+                    responses[_key(record['method'], record['args'])].append(record)
+        if not responses:
+            raise ValueError(f"Gravação vazia: {path}")
+        for records in responses.values():
+            records.sort(key=lambda record: record['t'])
+        times = [record['t'] for records in responses.values() for record in records]
+        self.clock = clock or SimulatedClock(speed, start=min(times), end=max(times))
+        self._responses = {key: records for key, records in responses.items() if key[0] != 'buy'}
+        self._times = {key: [record['t'] for record in records] for key, records in self._responses.items()}
+        self._orders = {key: deque(records) for key, records in responses.items() if key[0] == 'buy'}
+        self._streams = set()
+        self._lock = threading.Lock()
+        self.calls = Counter()
+
+    @staticmethod
+    def _answer(record):
+        if 'error' in record:
+            raise ConnectionError(record['error'])
+        return record['result']
+
+    def _at(self, key, now):
+        records = self._responses.get(key)
+        if not records:
+            return None
+        return records[max(0, bisect_right(self._times[key], now) - 1)]
+
+    def connect(self):
+        return True, None
+
+    def check_connect(self) -> bool:
+        return True
+
+    def change_balance(self, balance_mode) -> None:
+        pass
+
+    def get_candles(self, asset, interval, count, endtime=None):
+        self.calls['get_candles'] += 1
+        record = self._at(('get_candles', asset, interval), self.clock.time())
+        if record is None:
+            raise ConnectionError(f"Sem velas gravadas para {asset} {interval}s")
+        return self._answer(record)[-count:]
+
+    def get_all_profit(self):
+        self.calls['get_all_profit'] += 1
+        self.clock.check()
+        record = self._at(('get_all_profit',), self.clock.time())
+        return {} if record is None else self._answer(record)
+
+    def buy(self, amount, asset, action, duration):
+        self.calls['buy'] += 1
+        with self._lock:
+            orders = self._orders.get(('buy', asset, action))
+            record = orders.popleft() if orders else None
+        if record is None:
+            log(f"[{asset}] Ordem {action} fora da gravação, recusada", level="warning")
+            return False, None
+        return tuple(self._answer(record))
+
+    def check_win(self, order_id):
+        self.calls['check_win'] += 1
+        records = self._responses.get(('check_win', order_id))
+        if not records:
+            raise ValueError(f"Ordem {order_id} não está na gravação")
+        self.clock.wait_until(records[-1]['t'])
+        return tuple(self._answer(records[-1]))
+
+    def start_candles_stream(self, asset, size, maxdict) -> None:
+        self._streams.add((asset, size))
+
+    def stop_candles_stream(self, asset, size) -> None:
+        self._streams.discard((asset, size))
+
+    def get_realtime_candles(self, asset, size) -> dict:
+        self.calls['get_realtime_candles'] += 1
+        record = self._at(('get_realtime_candles', asset, size), self.clock.time())
+        if record is None or (asset, size) not in self._streams:
+            return {}
+        return {candle['from']: candle for candle in self._answer(record)}
+
+
+class SimulatedIQOption:
+    """``IQ_Option`` stand-in generating candles, payouts and order results.
+
+    Every asset follows its own geometric random walk of ``resolution``
+    second bars, seeded from *seed* and the asset name, starting
+    ``history`` bars before the clock's start. Candles of any multiple of
+    ``resolution`` are aggregated from the bars closed so far, so the
+    newest candle of ``get_candles`` is the one in progress once it holds
+    a closed bar. Orders expire
+    on the minute ``duration`` minutes after they are placed and win when
+    the price moved in their direction. *latency* adds a real delay to
+    every call, like a network round trip.
+    """
+
+    def __init__(
+        self,
+        assets,
+        clock=None,
+        resolution: int = 60,
+        history: int = 10_000,
+        seed: int = 0,
+        volatility: float = 0.0005,
+        payout: float = 0.85,
+        payout_spread: float = 0.1,
+        latency: float = 0.0,
+    ):
+        self.assets = list(assets)
+        self.clock = clock or SimulatedClock()
+        self.resolution = resolution
+        self.seed = seed
+        self.volatility = volatility
+        self.latency = latency
+        self.origin = (self.clock.time() // resolution - history) * resolution
+        self.balance = 10_000.0
+        self.calls = Counter()
+        self._payouts = {
+            asset: round(payout + payout_spread * ((zlib.crc32(asset.encode()) % 11) - 5) / 5, 2)
+            for asset in self.assets
+        }
+        self._bars = {}
+        self._orders = {}
+        self._next_order = 1
+        self._lock = threading.Lock()
+
+    def _call(self, name) -> None:
+        self.calls[name] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _series(self, asset, bars: int) -> dict:
+        """Return the bar arrays of *asset*, generated up to at least *bars* bars."""
+        with self._lock:
+            series = self._bars.get(asset)
+            if series is None:
+                crc = zlib.crc32(asset.encode())
+                series = self._bars[asset] = {
+                    'rng': np.random.default_rng([self.seed, crc]), 'price': 1.0 + crc % 100 / 100,
+                    'open': np.zeros(0), 'high': np.zeros(0), 'low': np.zeros(0),
+                    'close': np.zeros(0), 'volume': np.zeros(0),
+                }
+            missing = bars - len(series['close'])
+            if missing > 0:
+                n = max(missing, 1024)
+                rng = series['rng']
+                close = series['price'] * np.exp(np.cumsum(rng.normal(0.0, self.volatility, n)))
+                open_ = np.concatenate(([series['price']], close[:-1]))
+                wick = np.abs(rng.normal(0.0, self.volatility / 2, (2, n)))
+                series['price'] = close[-1]
+                for name, values in (
+                    ('open', open_), ('close', close),
+                    ('high', np.maximum(open_, close) * (1 + wick[0])),
+                    ('low', np.minimum(open_, close) * (1 - wick[1])),
+                    ('volume', np.round(rng.lognormal(4.0, 0.6, n))),
+                ):
+                    series[name] = np.concatenate((series[name], values))
+            return series
+
+    def _closed_bars(self, when: float) -> int:
+        return max(0, int((when - self.origin) // self.resolution))
+
+    def price(self, asset, when: float = None) -> float:
+        """Close of the last bar of *asset* closed at *when* (default: now)."""
+        bars = self._closed_bars(self.clock.time() if when is None else when)
+        return float(self._series(asset, bars)['close'][max(0, bars - 1)])
+
+    # --- IQ_Option API ---------------------------------------------------
+
+    def connect(self):
+        self._call('connect')
+        return True, None
+
+    def check_connect(self) -> bool:
+        return True
+
+    def change_balance(self, balance_mode) -> None:
+        self._call('change_balance')
+
+    def get_balance(self) -> float:
+        return self.balance
+
+    def get_server_timestamp(self) -> float:
+        return self.clock.time()
+
+    def get_all_profit(self) -> dict:
+        self._call('get_all_profit')
+        self.clock.check()
+        return {asset: {'turbo': payout, 'binary': payout} for asset, payout in self._payouts.items()}
+
+    def get_candles(self, asset, interval, count, endtime) -> list:
+        """Return up to *count* candles of *interval* seconds ending with the one open at *endtime*."""
+        self._call('get_candles')
+        if interval % self.resolution:
+            raise ValueError(f"Intervalo {interval}s não é múltiplo de {self.resolution}s")
+        step = interval // self.resolution
+        closed = self._closed_bars(min(endtime, self.clock.time()))
+        last = (self.origin + (closed - 1) * self.resolution) // interval * interval
+        first = max(last - (count - 1) * interval, -(-self.origin // interval) * interval)
+        series = self._series(asset, closed)
+        candles = []
+        for start in range(int(first), int(last) + 1, interval):
+            lo = int((start - self.origin) // self.resolution)
+            hi = min(lo + step, closed)
+            candles.append({
+                'id': start // interval, 'from': start, 'to': start + interval,
+                'open': float(series['open'][lo]), 'close': float(series['close'][hi - 1]),
+                'max': float(series['high'][lo:hi].max()), 'min': float(series['low'][lo:hi].min()),
+                'volume': float(series['volume'][lo:hi].sum()),
+            })
+        return candles
+
+    def buy(self, amount, asset, action, duration):
+        self._call('buy')
+        now = self.clock.time()
+        with self._lock:
+            order_id = self._next_order
+            self._next_order += 1
+            self.balance -= amount
+        self._orders[order_id] = {
+            'asset': asset, 'amount': amount, 'action': action, 'entry': self.price(asset, now),
+            'expiry': (now // 60 + duration) * 60, 'payout': self._payouts.get(asset, 0.8),
+        }
+        return True, order_id
+
+    def check_win(self, order_id):
+        """Block until the order expires; return ``(won, profit)``."""
+        self._call('check_win')
+        order = self._orders[order_id]
+        self.clock.wait_until(order['expiry'])
+        move = self.price(order['asset'], order['expiry']) - order['entry']
+        if move == 0:
+            won, profit = False, 0.0
+        else:
+            won = (move > 0) == (order['action'] == 'call')
+            profit = order['amount'] * order['payout'] if won else -order['amount']
+        with self._lock:
+            self.balance += order['amount'] + profit
+        return won, profit
+
+    def start_candles_stream(self, asset, size, maxdict) -> None:
+        self._call('start_candles_stream')
+
+    def stop_candles_stream(self, asset, size) -> None:
+        pass
+
+    def get_realtime_candles(self, asset, size) -> dict:
+        return {candle['from']: candle for candle in self.get_candles(asset, size, 10, self.clock.time())}
+
+
+def benchmark(hours: float = 6.0, speed: float = 0.0, assets: int = None, latency: float = 0.0, config=None) -> dict:
+    """Run :func:`bot.main` against :class:`SimulatedIQOption` for *hours* of simulated time.
+
+    Logs, the trade journal and other files go to a temporary directory.
+    Returns the real seconds taken, the cycles run and orders placed.
+    """
+    import bot
+
+    config = dict(load_config("config.yaml") if config is None else config)
+    if assets:
+        config['assets'] = config['assets'][:assets]
+    with tempfile.TemporaryDirectory() as tmp:
+        config.update(
+            broker='simulated', record_file=None, log_file=os.path.join(tmp, 'bot.log'), log_level='warning',
+            trade_journal_file=os.path.join(tmp, 'trade_journal.bin'), ml_online_file=None, history_dir=None,
+            metrics_port=0, metrics_dump_seconds=0, heartbeat_seconds=0, news_enabled=False,
+            schedule_jitter_seconds=0, snapshot_file=None,
+        )
+        clock = SimulatedClock(speed)
+        clock.end = clock.start + hours * 3600
+        client = SimulatedIQOption(config['assets'], clock, latency=latency)
+        start = time.perf_counter()
+        try:
+            bot.main(config, client=client, clock=clock)
+        except SimulationFinished:
+            pass
+        elapsed = time.perf_counter() - start
+    cycles = client.calls['get_all_profit']
+    return {
+        'seconds': elapsed, 'cycles': cycles, 'orders': client.calls['buy'],
+        'candle_requests': client.calls['get_candles'], 'seconds_per_cycle': elapsed / max(1, cycles),
+        'assets': len(config['assets']), 'hours': hours,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Roda o robô contra a IQ Option simulada")
+    parser.add_argument("--hours", type=float, default=6.0, help="horas simuladas")
+    parser.add_argument("--speed", type=float, default=0.0, help="velocidade do relógio (0 = sem esperas)")
+    parser.add_argument("--assets", type=int, default=None, help="usa só os N primeiros ativos")
+    parser.add_argument("--latency", type=float, default=0.0, help="atraso real por chamada, em segundos")
+    args = parser.parse_args()
+    result = benchmark(args.hours, args.speed, args.assets, args.latency)
+    print(
+        f"{result['hours']:g}h simuladas com {result['assets']} ativos em {result['seconds']:.1f}s: "
+        f"{result['cycles']} ciclos ({result['seconds_per_cycle'] * 1e3:.1f} ms/ciclo), "
+        f"{result['orders']} ordens, {result['candle_requests']} pedidos de velas"
+    )
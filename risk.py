@@ -1,9 +1,82 @@
-"""Risk management helpers."""
+"""Risk management helpers.
 
+Per-asset counters live in NumPy arrays indexed by asset (``self.index``),
+so :py:meth:`RiskManager.allowed` checks the per-asset stops and every
+portfolio limit for all candidates of a cycle at once:
+
+* ``max_open_trades`` / ``max_exposure``: simultaneous positions and stake;
+* ``max_currency_exposure``: open stake per currency (``EURUSD`` counts
+  towards both EUR and USD);
+* ``max_correlated``: open positions per correlation group (by default an
+  asset and its ``-OTC`` twin, or the groups passed in ``correlated_groups``,
+  lists of names or ``"A, B, C"`` strings);
+* ``max_daily_drawdown``: drop of the day's net result from its peak.
+
+The day's net result and wins (``daily_wins``, the bot's daily stop win)
+restart at each :py:meth:`roll_day`.
+
+Positions count as open from :py:meth:`open_trade` until
+:py:meth:`register_trade`. Limits set to ``None`` are not enforced.
+"""
+
+from collections.abc import MutableMapping
+from datetime import date
+
+import numpy as np
+
+from fundamental import asset_currencies
 from utils import log
 
+_STOPS = (
+    ("losses_amount", "stop_loss_amount", "Stop loss global atingido — perdas: %s"),
+    ("consecutive_losses", "stop_loss_consecutive", "Stop loss consecutivo atingido — %s perdas seguidas"),
+    ("wins_amount", "stop_win_amount", "Stop win global atingido — ganhos: %s"),
+    ("consecutive_wins", "stop_win_victories", "Stop win consecutivo atingido — %s vitórias seguidas"),
+)
+_NO_RESULT, _LOSS, _WIN = -1, 0, 1
+# Per-asset arrays carried over a restart by snapshot()/restore().
+_COUNTERS = ("current_amount", "losses_amount", "wins_amount", "consecutive_losses", "consecutive_wins", "last_result")
+
+
+def _limit(value) -> float:
+    # Keys left empty in config.yaml load as ``[]``.
+    return np.inf if value in (None, []) else float(value)
+
+
+class _AssetCounters(MutableMapping):
+    """Dict view of one asset's counters, backed by the manager's arrays."""
+
+    def __init__(self, manager, i):
+        self._manager = manager
+        self._i = i
+
+    def __getitem__(self, key):
+        if key not in _COUNTERS:
+            raise KeyError(key)
+        value = getattr(self._manager, key)[self._i].item()
+        if key == "last_result":
+            return None if value == _NO_RESULT else bool(value)
+        return value
+
+    def __setitem__(self, key, value):
+        if key not in _COUNTERS:
+            raise KeyError(key)
+        if key == "last_result":
+            value = _NO_RESULT if value is None else int(bool(value))
+        getattr(self._manager, key)[self._i] = value
+
+    def __delitem__(self, key):
+        raise TypeError("Contadores de risco não podem ser removidos")
+
+    def __iter__(self):
+        return iter(_COUNTERS)
+
+    def __len__(self):
+        return len(_COUNTERS)
+
+
 class RiskManager:
-    """Manage trade amounts and stop conditions for each asset."""
+    """Manage trade amounts, stop conditions and portfolio exposure."""
 
     def __init__(
         self,
@@ -18,6 +91,12 @@ class RiskManager:
         use_soros_if_low_payout: bool,
         min_payout_for_soros: float,
         assets,
+        max_open_trades: int = None,
+        max_exposure: float = None,
+        max_currency_exposure: float = None,
+        max_correlated: int = None,
+        max_daily_drawdown: float = None,
+        correlated_groups=None,
     ):
         self.stop_loss_amount = stop_loss_amount
         self.stop_loss_consecutive = stop_loss_consecutive
@@ -29,35 +108,202 @@ class RiskManager:
         self.use_martingale_if_high_chance = use_martingale_if_high_chance
         self.use_soros_if_low_payout = use_soros_if_low_payout
         self.min_payout_for_soros = min_payout_for_soros
-        self.assets = {
-            asset: {
-                "current_amount": 1,
-                "losses_amount": 0,
-                "wins_amount": 0,
-                "consecutive_losses": 0,
-                "consecutive_wins": 0,
-                "last_result": None,
-            }
-            for asset in assets
+        self.max_open_trades = _limit(max_open_trades)
+        self.max_exposure = _limit(max_exposure)
+        self.max_currency_exposure = _limit(max_currency_exposure)
+        self.max_correlated = _limit(max_correlated)
+        self.max_daily_drawdown = _limit(max_daily_drawdown)
+
+        assets = list(assets)
+        self.index = {asset: i for i, asset in enumerate(assets)}
+        n = len(assets)
+        self.current_amount = np.ones(n)
+        self.losses_amount = np.zeros(n)
+        self.wins_amount = np.zeros(n)
+        self.consecutive_losses = np.zeros(n, dtype=np.int64)
+        self.consecutive_wins = np.zeros(n, dtype=np.int64)
+        self.last_result = np.full(n, _NO_RESULT, dtype=np.int8)
+        self.open_count = np.zeros(n, dtype=np.int64)
+        self.open_amount = np.zeros(n)
+
+        currencies = sorted({c for asset in assets for c in asset_currencies(asset)})
+        self.currencies = currencies
+        self._currency_matrix = np.zeros((n, len(currencies)))
+        for asset, i in self.index.items():
+            for currency in asset_currencies(asset):
+                self._currency_matrix[i, currencies.index(currency)] = 1.0
+
+        group_of = {}
+        for group in correlated_groups or ():
+            # config.yaml lists one group per line as "A, B, C".
+            if isinstance(group, str):
+                group = [name.strip() for name in group.split(',')]
+            if not isinstance(group, (list, tuple)) or not all(
+                isinstance(name, str) and name and not set(name) & set('[]') for name in group
+            ):
+                raise ValueError(f"Grupo correlacionado inválido: {group!r} (use uma linha '- A, B, C' por grupo)")
+            for asset in group:
+                group_of.setdefault(asset, tuple(group))
+        names = [group_of.get(asset, asset.split('-')[0].upper()) for asset in assets]
+        labels = {name: g for g, name in enumerate(dict.fromkeys(names))}
+        self.group = np.array([labels[name] for name in names], dtype=np.intp)
+        self._groups = len(labels)
+
+        self.day = None
+        self.daily_pnl = 0.0
+        self.daily_peak = 0.0
+        self.daily_wins = 0
+
+    @classmethod
+    def from_config(cls, config: dict, assets=None):
+        """Build a manager from the bot configuration (``config.yaml``)."""
+        return cls(
+            stop_loss_amount=config['stop_loss_amount'],
+            stop_loss_consecutive=config['stop_loss_consecutive'],
+            stop_win_amount=config['stop_win_amount'],
+            stop_win_victories=config['stop_win_victories'],
+            strategy=config['strategy'],
+            martingale_factor=config['martingale_factor'],
+            soros_level=config['soros_level'],
+            use_martingale_if_high_chance=config['use_martingale_if_high_chance'],
+            use_soros_if_low_payout=config['use_soros_if_low_payout'],
+            min_payout_for_soros=config['min_payout_for_soros'],
+            assets=config['assets'] if assets is None else assets,
+            max_open_trades=config.get('max_open_trades'),
+            max_exposure=config.get('max_exposure'),
+            max_currency_exposure=config.get('max_currency_exposure'),
+            max_correlated=config.get('max_correlated'),
+            max_daily_drawdown=config.get('max_daily_drawdown'),
+            correlated_groups=config.get('correlated_groups'),
+        )
+
+    @property
+    def assets(self) -> dict:
+        """``asset -> counters`` as writable dicts, the layout used before the arrays."""
+        return {asset: _AssetCounters(self, i) for asset, i in self.index.items()}
+
+    def state(self, asset) -> dict:
+        """Return the counters of *asset* as a dict (for logs and inspection)."""
+        i = self.index[asset]
+        last = int(self.last_result[i])
+        return {
+            "current_amount": float(self.current_amount[i]),
+            "losses_amount": float(self.losses_amount[i]),
+            "wins_amount": float(self.wins_amount[i]),
+            "consecutive_losses": int(self.consecutive_losses[i]),
+            "consecutive_wins": int(self.consecutive_wins[i]),
+            "last_result": None if last == _NO_RESULT else bool(last),
+            "open": int(self.open_count[i]),
         }
 
-    def can_trade(self, asset):
-        """Return ``True`` if trading on *asset* is allowed under risk limits."""
-        a = self.assets[asset]
-        if a["losses_amount"] >= self.stop_loss_amount:
-            log(f"[{asset}] Stop loss global atingido — perdas: {a['losses_amount']}")
-            return False
-        if a["consecutive_losses"] >= self.stop_loss_consecutive:
-            log(f"[{asset}] Stop loss consecutivo atingido — {a['consecutive_losses']} perdas seguidas")
-            return False
-        if a["wins_amount"] >= self.stop_win_amount:
-            log(f"[{asset}] Stop win global atingido — ganhos: {a['wins_amount']}")
-            return False
-        if a["consecutive_wins"] >= self.stop_win_victories:
-            log(f"[{asset}] Stop win consecutivo atingido — {a['consecutive_wins']} vitórias seguidas")
+    def snapshot(self) -> dict:
+        """Return the per-asset counters and the day's result as arrays for :mod:`snapshot`."""
+        return {
+            'assets': np.array(list(self.index), dtype=str),
+            **{field: getattr(self, field) for field in _COUNTERS},
+            'day': '' if self.day is None else self.day.isoformat(),
+            'daily_pnl': self.daily_pnl, 'daily_peak': self.daily_peak, 'daily_wins': self.daily_wins,
+        }
+
+    def restore(self, state: dict) -> int:
+        """Load the counters of a :py:meth:`snapshot`; return the number of assets restored.
+
+        Assets are matched by name, so the asset list may change between
+        sessions. The day's result only carries over within the same day.
+        """
+        if not state:
+            return 0
+        pairs = [(self.index[str(a)], j) for j, a in enumerate(state['assets']) if str(a) in self.index]
+        if pairs:
+            mine, theirs = (np.array(side, dtype=np.intp) for side in zip(*pairs))
+            for field in _COUNTERS:
+                getattr(self, field)[mine] = state[field][theirs]
+        if str(state['day']):
+            self.day = date.fromisoformat(str(state['day']))
+            self.daily_pnl = float(state['daily_pnl'])
+            self.daily_peak = float(state['daily_peak'])
+            self.daily_wins = int(state.get('daily_wins', 0))
+        return len(pairs)
+
+    def roll_day(self, day) -> None:
+        """Start a new daily window (drawdown and wins) when *day* differs from the current one."""
+        if day != self.day:
+            self.day = day
+            self.daily_pnl = 0.0
+            self.daily_peak = 0.0
+            self.daily_wins = 0
+
+    def _stopped(self, idx) -> np.ndarray:
+        return (
+            (self.losses_amount[idx] >= self.stop_loss_amount)
+            | (self.consecutive_losses[idx] >= self.stop_loss_consecutive)
+            | (self.wins_amount[idx] >= self.stop_win_amount)
+            | (self.consecutive_wins[idx] >= self.stop_win_victories)
+        )
+
+    def allowed(self, assets, amounts=None) -> np.ndarray:
+        """Return a boolean mask of the *assets* that may open a position now.
+
+        Each candidate is checked on its own against the current open
+        positions, with a stake of *amounts* (default: its current amount).
+        """
+        idx = np.fromiter((self.index[a] for a in assets), dtype=np.intp, count=len(assets))
+        amounts = self.current_amount[idx] if amounts is None else np.asarray(amounts, dtype=float)
+        if self.daily_peak - self.daily_pnl >= self.max_daily_drawdown:
+            return np.zeros(len(idx), dtype=bool)
+        ok = ~self._stopped(idx)
+        ok &= self.open_count.sum() + 1 <= self.max_open_trades
+        ok &= self.open_amount.sum() + amounts <= self.max_exposure
+        if np.isfinite(self.max_currency_exposure):
+            exposure = self.open_amount @ self._currency_matrix
+            after = self._currency_matrix[idx] * (exposure + amounts[:, None])
+            ok &= (after <= self.max_currency_exposure).all(axis=1)
+        if np.isfinite(self.max_correlated):
+            per_group = np.bincount(self.group, weights=self.open_count, minlength=self._groups)
+            ok &= per_group[self.group[idx]] + 1 <= self.max_correlated
+        return ok
+
+    def can_trade(self, asset, amount=None):
+        """Return ``True`` if trading on *asset* is allowed under risk limits.
+
+        *amount* is the stake about to be placed (default: the current
+        amount); pass :py:meth:`stake` so the exposure limits see the stake
+        after martingale/soros.
+        """
+        i = self.index[asset]
+        for field, limit, message in _STOPS:
+            value = getattr(self, field)[i]
+            if value >= getattr(self, limit):
+                log("[%s] " + message, asset, value, asset=asset, stage="risk")
+                return False
+        if not self.allowed([asset], None if amount is None else [amount])[0]:
+            log("[%s] Limite de exposição da carteira atingido", asset, level="debug", asset=asset, stage="risk")
             return False
         return True
 
+    def stake(self, asset, high_chance=False, payout=1.0) -> float:
+        """Return the amount :py:meth:`next_amount` would return, without updating the counters.
+
+        With the default ``high_chance=False`` it is the smallest stake the
+        asset may get next, fit for a pre-filter with :py:meth:`allowed`.
+        """
+        i = self.index[asset]
+        # Reset if any global/consecutive limit was hit, or after a win
+        if self._stopped(i) or self.last_result[i] == _WIN:
+            return 1.0
+        amount = float(self.current_amount[i])
+        if self.last_result[i] == _LOSS:
+            if self.strategy == "martingale" and (
+                high_chance or not self.use_martingale_if_high_chance
+            ):
+                amount *= self.martingale_factor
+            elif self.strategy == "soros" and (
+                not self.use_soros_if_low_payout
+                or payout >= self.min_payout_for_soros
+            ):
+                amount *= self.soros_level
+        return amount
+
     def next_amount(self, asset, high_chance=False, payout=1.0):
         """Return the next order amount for *asset* based on strategy.
 
@@ -65,43 +311,46 @@ class RiskManager:
         trade stored in ``last_result``. Losses increase the stake according to
         the strategy while wins or triggered limits reset it to ``1``.
         """
-        a = self.assets[asset]
-
-        # Reset if any global/consecutive limit was hit
-        if not self.can_trade(asset):
-            a["current_amount"] = 1
-            a["last_result"] = None
-            return a["current_amount"]
-
-        if a["last_result"] is not None:
-            if a["last_result"]:
-                a["current_amount"] = 1
-            else:
-                if self.strategy == "martingale" and (
-                    high_chance or not self.use_martingale_if_high_chance
-                ):
-                    a["current_amount"] *= self.martingale_factor
-                elif self.strategy == "soros" and (
-                    not self.use_soros_if_low_payout
-                    or payout >= self.min_payout_for_soros
-                ):
-                    a["current_amount"] *= self.soros_level
-            a["last_result"] = None
-
-        return a["current_amount"]
-
-    def register_trade(self, asset, result):
-        """Update statistics after a trade finishes."""
-        a = self.assets[asset]
+        i = self.index[asset]
+        self.current_amount[i] = self.stake(asset, high_chance, payout)
+        self.last_result[i] = _NO_RESULT
+        return float(self.current_amount[i])
+
+    def open_trade(self, asset, amount) -> None:
+        """Count a position just placed on *asset* towards the exposure limits."""
+        i = self.index[asset]
+        self.open_count[i] += 1
+        self.open_amount[i] += amount
+
+    def register_trade(self, asset, result, amount=None, payout=1.0):
+        """Update statistics after a trade finishes.
+
+        *amount* is the stake of the closed position (default: the current
+        amount); if it was opened with :py:meth:`open_trade` it stops
+        counting as open. *payout* sizes the win in the daily result.
+        """
+        i = self.index[asset]
+        if amount is None:
+            amount = self.current_amount[i]
+        if self.open_count[i] > 0:
+            self.open_count[i] -= 1
+            self.open_amount[i] = max(0.0, self.open_amount[i] - amount)
+        stake = self.current_amount[i]
         if result:
-            a["wins_amount"] += a["current_amount"]
-            a["consecutive_wins"] += 1
-            a["consecutive_losses"] = 0
+            self.wins_amount[i] += stake
+            self.consecutive_wins[i] += 1
+            self.consecutive_losses[i] = 0
+            self.daily_pnl += amount * payout
+            self.daily_wins += 1
         else:
-            a["losses_amount"] += a["current_amount"]
-            a["consecutive_losses"] += 1
-            a["consecutive_wins"] = 0
-        a["last_result"] = result
+            self.losses_amount[i] += stake
+            self.consecutive_losses[i] += 1
+            self.consecutive_wins[i] = 0
+            self.daily_pnl -= amount
+        self.daily_peak = max(self.daily_peak, self.daily_pnl)
+        self.last_result[i] = _WIN if result else _LOSS
         log(
-            f"[{asset}] Valor atual: {a['current_amount']} | perdas: {a['losses_amount']} | vitórias seguidas: {a['consecutive_wins']} | perdas seguidas: {a['consecutive_losses']} | ganhos totais: {a['wins_amount']}"
-        )
\ No newline at end of file
+            "[%s] Valor atual: %s | perdas: %s | vitórias seguidas: %s | perdas seguidas: %s | ganhos totais: %s",
+            asset, self.current_amount[i], self.losses_amount[i], self.consecutive_wins[i],
+            self.consecutive_losses[i], self.wins_amount[i], level="debug", asset=asset, stage="risk",
+        )
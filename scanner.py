@@ -0,0 +1,100 @@
+"""Concurrent candle fetching and indicator computation for all assets."""
+
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from utils import log
+
+
+def analyze_candles(df, ma_fast: int = 20, ma_slow: int = 50, volume_period: int = 20):
+    """Add moving averages and M5 indicators to *df* (runs inside a worker process)."""
+    from technical import TechnicalAnalyzer
+
+    technical = TechnicalAnalyzer(ma_fast=ma_fast, ma_slow=ma_slow, volume_period=volume_period)
+    df = technical.calculate_moving_averages(df)
+    return technical.add_m5_indicators(df)
+
+
+class AssetScanner:
+    """Fetch candles for many assets concurrently and analyze them in a process pool.
+
+    ``fetch(asset)`` is called from a bounded thread pool and must return the
+    candle DataFrame for *asset*. Each DataFrame is then handed to
+    ``analyze(df, *analyze_args)`` in a process pool (or inline when
+    ``process_workers`` is ``0``); with ``analyze=None`` the fetched
+    DataFrame is yielded as is. :py:meth:`scan` yields ``(asset, result)``
+    pairs in completion order so trade decisions can start before the slowest
+    asset has been fetched.
+    """
+
+    def __init__(
+        self,
+        fetch,
+        analyze=analyze_candles,
+        analyze_args: tuple = (),
+        fetch_workers: int = 8,
+        process_workers: int = None,
+    ):
+        self.fetch = fetch
+        self.analyze = analyze
+        self.analyze_args = tuple(analyze_args)
+        self.last_cycle_seconds = None
+        self._threads = ThreadPoolExecutor(max_workers=max(1, fetch_workers), thread_name_prefix="scan")
+        self._processes = None
+        if analyze is not None and process_workers != 0:
+            # The IQ Option client keeps websocket threads alive, which do not
+            # survive ``fork`` reliably, so workers are spawned instead.
+            self._processes = ProcessPoolExecutor(
+                max_workers=process_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+
+    def scan(self, assets):
+        """Yield ``(asset, result)`` for every asset whose candles were analyzed."""
+        start = time.perf_counter()
+        fetching = {self._threads.submit(self.fetch, asset): asset for asset in assets}
+        analyzing = {}
+        done_count = 0
+
+        while fetching or analyzing:
+            done, _ = wait(list(fetching) + list(analyzing), return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in fetching:
+                    asset = fetching.pop(future)
+                    try:
+                        df = future.result()
+                    except Exception as exc:
+                        log(f"[{asset}] Erro ao obter velas: {exc}", level="error")
+                        continue
+                    if self.analyze is None:
+                        done_count += 1
+                        yield asset, df
+                    elif self._processes is None:
+                        try:
+                            result = self.analyze(df, *self.analyze_args)
+                        except Exception as exc:
+                            log(f"[{asset}] Erro ao calcular indicadores: {exc}", level="error")
+                            continue
+                        done_count += 1
+                        yield asset, result
+                    else:
+                        analyzing[self._processes.submit(self.analyze, df, *self.analyze_args)] = asset
+                else:
+                    asset = analyzing.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as exc:
+                        log(f"[{asset}] Erro ao calcular indicadores: {exc}", level="error")
+                        continue
+                    done_count += 1
+                    yield asset, result
+
+        self.last_cycle_seconds = time.perf_counter() - start
+        log(f"Varredura concluída: {done_count}/{len(assets)} ativos em {self.last_cycle_seconds:.2f}s")
+
+    def close(self) -> None:
+        """Shut down the worker pools."""
+        self._threads.shutdown(wait=False, cancel_futures=True)
+        if self._processes is not None:
+            self._processes.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,142 @@
+"""Wake the trading loop at candle closes instead of every few seconds.
+
+:py:meth:`CandleScheduler.wait` sleeps until the next ``timeframe``
+boundary plus ``settle`` seconds (time for the broker to publish the closed
+candle) and a random ``jitter``. With ``spike_interval`` set it also wakes
+inside the candle so assets whose in-progress volume reaches
+``spike_ratio`` times the recent average can be evaluated early. With
+``interval`` set it falls back to fixed polling every ``interval`` seconds.
+
+After each wake-up :py:meth:`CandleScheduler.changed` and
+:py:meth:`CandleScheduler.spike` tell the loop which assets actually have
+new data, so unchanged assets are not evaluated again. At a close the API
+already returns the candle that has just opened; :py:meth:`CandleScheduler.closed`
+drops it so decisions are made on the closed candle, like in backtests.
+The last candle processed per asset is kept over a restart with
+:py:meth:`CandleScheduler.snapshot` and :py:meth:`CandleScheduler.restore`.
+"""
+
+import random
+import time
+
+import numpy as np
+
+CLOSE = "close"
+INTRA = "intra"
+
+
+class CandleScheduler:
+    """Decide when the loop wakes and which assets it evaluates."""
+
+    def __init__(
+        self,
+        timeframe: int,
+        settle: float = 1.0,
+        jitter: float = 0.0,
+        spike_ratio: float = 2.0,
+        spike_interval: float = None,
+        interval: float = None,
+        clock=time.time,
+        sleep=time.sleep,
+        rand=random.random,
+    ):
+        self.timeframe = timeframe
+        self.settle = settle
+        self.jitter = jitter
+        self.spike_ratio = spike_ratio
+        self.spike_interval = spike_interval or None
+        self.interval = interval or None
+        self.clock = clock
+        self.sleep = sleep
+        self.rand = rand
+        self._handled = None
+        self._delay = None
+        self._seen = {}
+        self._spiked = {}
+
+    def next_close(self, now: float = None) -> float:
+        """Epoch time at which the candle in progress at *now* closes."""
+        now = self.clock() if now is None else now
+        return (now // self.timeframe + 1) * self.timeframe
+
+    def wait(self) -> str:
+        """Sleep until the next trigger and return :data:`CLOSE` or :data:`INTRA`.
+
+        The first call returns at once, as does a call made after a whole
+        candle was missed (e.g. a slow cycle), so no close is skipped.
+        """
+        now = self.clock()
+        if self.interval is not None:
+            if self._handled is not None:
+                self.sleep(self.interval)
+            self._handled = now
+            return CLOSE
+        if self._handled is None:
+            self._handled = now // self.timeframe * self.timeframe
+            return CLOSE
+        if self._delay is None:
+            self._delay = self.settle + self.jitter * self.rand()
+        due = self._handled + self.timeframe + self._delay
+        if now < due:
+            if self.spike_interval is not None and now + self.spike_interval < due:
+                self.sleep(self.spike_interval)
+                return INTRA
+            self.sleep(due - now)
+            now = due
+        current = now // self.timeframe * self.timeframe
+        # Closes missed while a cycle ran are handled at once; the latest
+        # one is still waited for if its settle delay has not passed yet.
+        self._handled = current if now - current >= self._delay else current - self.timeframe
+        self._delay = None
+        return CLOSE
+
+    def closed(self, df, now: float = None):
+        """Return *df* without the candles still in progress at *now* (``from`` at or after the last close)."""
+        if df is None or len(df) == 0:
+            return df
+        cutoff = self.next_close(now) - self.timeframe
+        return df.iloc[:int(np.searchsorted(df['from'].to_numpy(), cutoff))]
+
+    def changed(self, asset, df) -> bool:
+        """Return ``True`` if the newest candle of *df* differs from the last one seen for *asset*."""
+        if df is None or len(df) == 0:
+            return False
+        last = df.iloc[-1]
+        key = (float(last['from']), float(last['close']), float(last['volume']))
+        if self._seen.get(asset) == key:
+            return False
+        self._seen[asset] = key
+        return True
+
+    def snapshot(self) -> dict:
+        """Return the last candle processed per asset (open time, close, volume) for :mod:`snapshot`."""
+        seen = list(self._seen.items())
+        return {
+            'assets': np.array([asset for asset, _ in seen], dtype=str),
+            'candles': np.array([key for _, key in seen], dtype=float).reshape(-1, 3),
+        }
+
+    def restore(self, state: dict) -> int:
+        """Load a :py:meth:`snapshot` so candles already processed are not evaluated again."""
+        if not state:
+            return 0
+        for asset, key in zip(state['assets'], state['candles']):
+            self._seen[str(asset)] = tuple(float(v) for v in key)
+        return len(state['assets'])
+
+    def spike(self, asset, df, period: int = 20) -> bool:
+        """Return ``True`` once per candle when its volume reaches ``spike_ratio`` times the average.
+
+        The average is taken over the *period* candles before the one in progress.
+        """
+        if df is None or len(df) < 2:
+            return False
+        volume = df['volume'].to_numpy()
+        start = float(df['from'].iloc[-1])
+        if self._spiked.get(asset) == start:
+            return False
+        average = np.mean(volume[-period - 1:-1])
+        if average <= 0 or volume[-1] < self.spike_ratio * average:
+            return False
+        self._spiked[asset] = start
+        return True
@@ -0,0 +1,83 @@
+"""Confluence rules shared by the live loop and the backtester.
+
+All functions accept scalars (one asset, latest candle) or NumPy arrays
+(many candles at once) and broadcast their arguments.
+"""
+
+import numpy as np
+
+from utils import STRENGTH_LEVELS
+
+SIGNALS = (
+    "breakout", "pattern", "volume", "trend", "ema_cross",
+    "macd", "adx", "supertrend", "vwap", "ml",
+)
+HTF_SIGNALS = ("htf_trend", "htf_supertrend")
+DIRECTIONS = {1: "call", -1: "put"}
+
+
+def trade_direction(trend, close, supertrend) -> np.ndarray:
+    """Return ``1`` (call), ``-1`` (put) or ``0`` when trend and Supertrend disagree."""
+    trend = np.asarray(trend)
+    with np.errstate(invalid='ignore'):
+        super_up = np.asarray(close) > np.asarray(supertrend)
+    call = (trend == "up") & super_up
+    put = (trend == "down") & ~super_up
+    return np.atleast_1d(np.where(call, 1, np.where(put, -1, 0)))
+
+
+def confluence_matrix(
+    trend, breakout, has_pattern, volume_ratio, ema_cross,
+    macd_hist, adx, close, supertrend, vwap, ml_high,
+) -> np.ndarray:
+    """Return a boolean matrix with one column per entry in :data:`SIGNALS`."""
+    trend = np.asarray(trend)
+    up = trend == "up"
+    down = trend == "down"
+    close = np.asarray(close, dtype=float)
+    supertrend = np.asarray(supertrend, dtype=float)
+    vwap = np.asarray(vwap, dtype=float)
+    macd_hist = np.asarray(macd_hist, dtype=float)
+    with np.errstate(invalid='ignore'):
+        columns = (
+            np.asarray(breakout, dtype=bool),
+            np.asarray(has_pattern, dtype=bool),
+            np.asarray(volume_ratio, dtype=float) > 1.0,
+            (trend != "flat"),
+            np.asarray(ema_cross, dtype=bool),
+            (up & (macd_hist > 0)) | (down & (macd_hist < 0)),
+            np.asarray(adx, dtype=float) > 20,
+            (up & (close > supertrend)) | (down & (close < supertrend)),
+            (up & (close > vwap)) | (down & (close < vwap)),
+            np.asarray(ml_high, dtype=bool),
+        )
+    return np.column_stack(np.broadcast_arrays(*(np.atleast_1d(c) for c in columns)))
+
+
+def htf_confluence_matrix(direction, trends, closes, supertrends) -> np.ndarray:
+    """Return a boolean matrix with one column per entry in :data:`HTF_SIGNALS`.
+
+    *trends*, *closes* and *supertrends* hold one value per confirmation
+    timeframe in their last axis; a signal is active when every timeframe
+    agrees with *direction* (``1`` call, ``-1`` put).
+    """
+    direction = np.atleast_1d(np.asarray(direction))[:, None]
+    trends = np.atleast_2d(np.asarray(trends))
+    closes = np.atleast_2d(np.asarray(closes, dtype=float))
+    supertrends = np.atleast_2d(np.asarray(supertrends, dtype=float))
+    call = direction == 1
+    put = direction == -1
+    with np.errstate(invalid='ignore'):
+        trend_ok = (call & (trends == "up")) | (put & (trends == "down"))
+        super_ok = (call & (closes > supertrends)) | (put & (closes < supertrends))
+    return np.column_stack((trend_ok.all(axis=1), super_ok.all(axis=1)))
+
+
+def signal_names(row, names=SIGNALS) -> list:
+    """Return the names of the active signals in one row of :func:`confluence_matrix`."""
+    return [name for name, active in zip(names, row) if active]
+
+
+def min_confluences(strength: str = "media", levels=STRENGTH_LEVELS) -> int:
+    """Return the confluence count needed to reach *strength*."""
+    return dict((name, minimum) for minimum, name in levels)[strength]
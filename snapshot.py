@@ -0,0 +1,89 @@
+"""Session snapshot: state restored on the next start instead of rebuilt.
+
+One ``.npz`` file holds named sections of arrays, e.g. the candle buffers
+of :py:meth:`candle_store.CandleStore.snapshot` and the counters of
+:py:meth:`risk.RiskManager.snapshot`. It is written to a temporary file and
+moved over the previous snapshot with ``os.replace``, so a crash while
+saving leaves the last complete one. Loading reads no pickles and takes a
+few milliseconds.
+
+:class:`SnapshotWriter` keeps the file current while the bot runs: state
+changes (an order placed, a result, the end of a cycle) mark it dirty and
+the next :py:meth:`SnapshotWriter.flush` rewrites it, so a crash loses at
+most the change in progress rather than the whole session.
+"""
+
+import os
+import time
+
+import numpy as np
+
+from utils import log
+
+
+def save(path: str, sections: dict) -> None:
+    """Write ``{section: {name: array}}`` to *path* atomically."""
+    arrays = {
+        f"{section}.{name}": np.asarray(value)
+        for section, values in sections.items()
+        for name, value in values.items()
+    }
+    tmp = f"{path}.tmp"
+    with open(tmp, 'wb') as file:
+        np.savez(file, **arrays)
+    os.replace(tmp, path)
+
+
+def load(path: str) -> dict:
+    """Return the sections saved in *path*, or ``{}`` if there is no usable snapshot."""
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with np.load(path) as data:
+            sections = {}
+            for key in data.files:
+                section, name = key.split('.', 1)
+                sections.setdefault(section, {})[name] = data[key]
+            return sections
+    except (OSError, ValueError) as exc:
+        log(f"Snapshot {path} ignorado: {exc}", level="warning")
+        return {}
+
+
+def session(model_version=None, clock=time.time) -> dict:
+    """The ``session`` section: when the snapshot was taken and with which model."""
+    return {'saved_at': clock(), 'model_version': model_version or ''}
+
+
+class SnapshotWriter:
+    """Rewrite a snapshot from live state whenever it changed.
+
+    ``sources`` maps section names to callables returning the section, e.g.
+    ``{'risk': risk.snapshot}``. :py:meth:`mark` flags a change and
+    :py:meth:`flush` saves every section if anything changed since the last
+    save. Without *path* nothing is written.
+    """
+
+    def __init__(self, path: str, sources: dict):
+        self.path = path
+        self.sources = sources
+        self.saves = 0
+        self._dirty = False
+
+    def mark(self) -> None:
+        """Note that the state changed and must be written on the next :py:meth:`flush`."""
+        self._dirty = True
+
+    def flush(self, force: bool = False) -> bool:
+        """Save the snapshot if it changed (or *force*); return ``True`` if it was written."""
+        if not self.path or not (self._dirty or force):
+            return False
+        self._dirty = False
+        try:
+            save(self.path, {name: source() for name, source in self.sources.items()})
+        except OSError as exc:
+            self._dirty = True
+            log(f"Erro ao salvar snapshot: {exc}", level="error")
+            return False
+        self.saves += 1
+        return True
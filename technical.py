@@ -1,17 +1,62 @@
 import os
 os.environ.setdefault("PANDAS_TA_SUPPRESS", "1")  # Silence TA-Lib warnings
+import numpy as np
 import pandas as pd
-import pandas_ta as ta
-from finta import TA
+from numpy.lib.stride_tricks import sliding_window_view
+from indicators import StreamingIndicators
+from patterns import PatternScanner
 from utils import log
 
+
+def _column(frame: pd.DataFrame, prefix: str) -> pd.Series:
+    """Return the first column of a pandas-ta result whose name starts with *prefix*.
+
+    Column suffixes differ between pandas-ta releases (``SUPERT_10_3.0`` vs
+    ``SUPERT_10_3``), so lookups match on the stable prefix only.
+    """
+    return frame[[c for c in frame.columns if c.startswith(prefix)][0]]
+
+
+def _supertrend(high: pd.Series, low: pd.Series, close: pd.Series, length: int = 10, multiplier: float = 3.0) -> pd.Series:
+    """Supertrend line computed like ``ta.supertrend`` but over plain lists.
+
+    pandas-ta walks the bands with ``Series.iat`` reads and writes, which
+    dominates the cost of :py:meth:`TechnicalAnalyzer.add_m5_indicators`.
+    """
+    import pandas_ta as ta
+
+    matr = multiplier * ta.atr(high=high, low=low, close=close, length=length)
+    hl2 = (high + low) / 2
+    lb = (hl2 - matr).tolist()
+    ub = (hl2 + matr).tolist()
+    closes = close.tolist()
+    trend = [float('nan')] * len(closes)
+    direction = 1
+    for i in range(1, len(closes)):
+        if closes[i] > ub[i - 1]:
+            direction = 1
+        elif closes[i] < lb[i - 1]:
+            direction = -1
+        else:
+            if direction > 0 and lb[i] < lb[i - 1]:
+                lb[i] = lb[i - 1]
+            if direction < 0 and ub[i] > ub[i - 1]:
+                ub[i] = ub[i - 1]
+        trend[i] = lb[i] if direction > 0 else ub[i]
+    return pd.Series(trend, index=close.index)
+
+
 class TechnicalAnalyzer:
-    """Compute technical indicators using pandas-ta and detect candlestick patterns with pure pandas logic via Finta."""
+    """Compute technical indicators using pandas-ta and detect candlestick patterns with vectorized NumPy rules."""
 
-    def __init__(self, ma_fast: int = 20, ma_slow: int = 50, volume_period: int = 20):
+    def __init__(self, ma_fast: int = 20, ma_slow: int = 50, volume_period: int = 20, periods=None):
         self.ma_fast = ma_fast
         self.ma_slow = ma_slow
         self.volume_period = volume_period
+        # asset -> (ma_fast, ma_slow) used instead of the defaults by stream_indicators.
+        self.periods = dict(periods or {})
+        self._streams = {}
+        self._patterns = PatternScanner()
 
     def calculate_moving_averages(self, df: pd.DataFrame) -> pd.DataFrame:
         """Add simple moving average columns to df using rolling mean."""
@@ -21,34 +66,54 @@ class TechnicalAnalyzer:
 
     def add_m5_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
         """Enrich df with recommended M5 indicators using pandas-ta functions."""
+        # Imported on first use: the streaming engine never needs pandas-ta.
+        import pandas_ta as ta
+
         df['VWAP'] = ta.vwap(
             high=df['high'], low=df['low'], close=df['close'], volume=df['volume']
         )
-        supertrend = ta.supertrend(
-            high=df['high'], low=df['low'], close=df['close'], length=10, multiplier=3
-        )
-        df['SUPERT'] = supertrend['SUPERT_10_3.0']
+        df['SUPERT'] = _supertrend(df['high'], df['low'], df['close'], length=10, multiplier=3)
         df['EMA5'] = ta.ema(df['close'], length=5)
         df['EMA20'] = ta.ema(df['close'], length=20)
         df['EMA_CROSS'] = df['EMA5'] > df['EMA20']
         df['RSI7'] = ta.rsi(df['close'], length=7)
         macd = ta.macd(df['close'], fast=12, slow=26, signal=9)
-        df['MACD_HIST'] = macd['MACDh_12_26_9']
+        df['MACD_HIST'] = _column(macd, 'MACDh_')
         bbands = ta.bbands(df['close'], length=20, std=2)
-        df['BB_UP'] = bbands['BBU_20_2.0']
-        df['BB_DN'] = bbands['BBL_20_2.0']
+        df['BB_UP'] = _column(bbands, 'BBU_')
+        df['BB_DN'] = _column(bbands, 'BBL_')
         adx = ta.adx(
             high=df['high'], low=df['low'], close=df['close'], length=14
         )
-        df['ADX14'] = adx['ADX_14']
+        df['ADX14'] = _column(adx, 'ADX_')
         df['ATR14'] = ta.atr(
             high=df['high'], low=df['low'], close=df['close'], length=14
         )
         return df
 
-    def detect_trend(self, df: pd.DataFrame) -> str:
-        """Return 'up', 'down' or 'flat' based on moving averages."""
-        last = df.iloc[-1]
+    def stream_indicators(self, asset: str, df: pd.DataFrame) -> dict:
+        """Update the incremental indicator state of *asset* and return the latest values.
+
+        Only candles not older than the last one seen are processed, so a
+        refreshed window costs O(1) per new or updated candle. Keys match the
+        columns written by :py:meth:`calculate_moving_averages` and
+        :py:meth:`add_m5_indicators`.
+        """
+        stream = self._streams.get(asset)
+        if stream is None:
+            stream = self._streams[asset] = StreamingIndicators(*self.periods.get(asset, (self.ma_fast, self.ma_slow)))
+        return stream.update_frame(df)
+
+    def latest_values(self, df: pd.DataFrame) -> dict:
+        """Return the last row of a DataFrame enriched by the batch indicator path."""
+        return df.iloc[-1].to_dict()
+
+    def detect_trend(self, df) -> str:
+        """Return 'up', 'down' or 'flat' based on moving averages.
+
+        Accepts either an indicator DataFrame or a mapping of latest values.
+        """
+        last = df.iloc[-1] if isinstance(df, pd.DataFrame) else df
         if last['MA_fast'] > last['MA_slow']:
             return "up"
         elif last['MA_fast'] < last['MA_slow']:
@@ -72,22 +137,51 @@ class TechnicalAnalyzer:
             return "breakout_down"
         return None
 
+    def detect_breakouts(self, df: pd.DataFrame, lookback: int = 50) -> np.ndarray:
+        """Vectorized :py:meth:`detect_breakout` for every candle of *df*.
+
+        Element ``i`` equals ``detect_breakout(df.iloc[:i + 1], lookback)``
+        encoded as ``1`` (``breakout_up``), ``-1`` (``breakout_down``) or ``0``.
+        """
+        n = len(df)
+        if n == 0 or lookback < 3:
+            return np.zeros(n, dtype=np.int8)
+        pad = np.full(lookback - 1, np.nan)
+        window = lambda col: sliding_window_view(np.concatenate([pad, df[col].to_numpy(dtype=float)]), lookback)
+        lows, highs, closes = window('low'), window('high'), window('close')
+
+        counts = np.minimum(np.arange(1, n + 1), lookback)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.sqrt(np.nansum((closes - np.nanmean(closes, axis=1)[:, None]) ** 2, axis=1) / (counts - 1))
+        tolerance = np.where(counts > 1, std * 0.02, 0.0)[:, None]
+
+        def level(values, extreme, fill, compare):
+            mid = values[:, 1:-1]
+            local = compare(mid, values[:, :-2]) & compare(mid, values[:, 2:])
+            found = local.any(axis=1)
+            lvl = extreme(np.where(local, mid, fill), axis=1)
+            with np.errstate(invalid='ignore'):
+                touches = (np.abs(values - lvl[:, None]) <= tolerance).sum(axis=1)
+            return np.where(found & (touches >= 2), lvl, np.nan)
+
+        support = level(lows, np.min, np.inf, np.less_equal)
+        resistance = level(highs, np.max, -np.inf, np.greater_equal)
+        close = df['close'].to_numpy(dtype=float)
+        valid = ~np.isnan(support) & ~np.isnan(resistance)
+        up = valid & (close > resistance)
+        down = valid & ~up & (close < support)
+        return np.where(up, 1, np.where(down, -1, 0)).astype(np.int8)
+
     def detect_candlestick_patterns(self, df: pd.DataFrame) -> list:
-        """Detect all candlestick patterns using pure-Python 'finta' library (no TA-Lib)."""
-        patterns = []
-        if df.empty:
-            return patterns
-        for name in dir(TA):
-            if not name.startswith('CDL'):
-                continue
-            func = getattr(TA, name)
-            try:
-                series = func(df)
-            except Exception:
-                continue
-            if hasattr(series, 'iloc') and series.iloc[-1] != 0:
-                patterns.append((name.lower(), int(series.iloc[-1])))
-        return patterns
+        """Return ``(name, value)`` for each candlestick pattern formed by the last candle.
+
+        Only the last few candles are inspected; see :py:class:`patterns.PatternScanner`.
+        """
+        return self._patterns.scan(df)
+
+    def label_candlestick_patterns(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Return pattern values for every candle of *df* (batch mode for backtests)."""
+        return self._patterns.label(df)
 
     def support_resistance(self, df: pd.DataFrame, lookback: int = 50) -> tuple:
         """Return support and resistance touched at least twice.
@@ -0,0 +1,135 @@
+import sys
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+pytest.importorskip('pandas_ta')
+from backtest import Backtester, compute_signals
+from signals import confluence_matrix, trade_direction
+from technical import TechnicalAnalyzer
+
+CONFIG = {
+    'assets': ['EURUSD', 'GBPUSD'],
+    'timeframe_main': 300,
+    'trade_duration': 5,
+    'trend_ma_fast': 20,
+    'trend_ma_slow': 50,
+    'volume_period': 20,
+    'breakout_lookback': 20,
+    'min_payout': 0.75,
+    'max_payout': 0.95,
+    'stop_loss_amount': 10 ** 9,
+    'stop_loss_consecutive': 100,
+    'stop_win_amount': 10 ** 9,
+    'stop_win_victories': 100,
+    'strategy': 'martingale',
+    'martingale_factor': 2,
+    'soros_level': 2,
+    'use_martingale_if_high_chance': True,
+    'use_soros_if_low_payout': True,
+    'min_payout_for_soros': 0.8,
+}
+
+
+def make_candles(n=400, seed=1):
+    rng = np.random.default_rng(seed)
+    close = 1.1 + np.cumsum(rng.normal(0, 0.0008, n))
+    open_ = np.r_[close[0], close[:-1]]
+    times = 1700000000 + np.arange(n) * 300
+    return pd.DataFrame(
+        {
+            'from': times, 'open': open_,
+            'high': np.maximum(open_, close) + rng.uniform(0, 0.0005, n),
+            'low': np.minimum(open_, close) - rng.uniform(0, 0.0005, n),
+            'close': close, 'volume': rng.integers(1, 100, n).astype(float),
+        },
+        index=pd.to_datetime(times, unit='s'),
+    )
+
+
+def live_signals(technical, df):
+    """Evaluate the last candle of *df* the way ``bot._run_loop`` does."""
+    latest = technical.latest_values(technical.add_m5_indicators(technical.calculate_moving_averages(df.copy())))
+    trend = technical.detect_trend(latest)
+    breakout = technical.detect_breakout(df, lookback=CONFIG['breakout_lookback'])
+    patterns = technical.detect_candlestick_patterns(df)
+    avg_volume = df['volume'].rolling(CONFIG['volume_period']).mean().iloc[-1]
+    volume_ratio = latest['volume'] / avg_volume if avg_volume > 0 else 0
+    direction = int(trade_direction(trend, latest['close'], latest['SUPERT'])[0])
+    matrix = confluence_matrix(
+        trend, bool(breakout), bool(patterns), volume_ratio, latest['EMA_CROSS'],
+        latest['MACD_HIST'], latest['ADX14'], latest['close'], latest['SUPERT'], latest['VWAP'], False,
+    )
+    return direction, int(matrix.sum())
+
+
+def test_compute_signals_matches_live_evaluation():
+    df = make_candles()
+    technical = TechnicalAnalyzer(ma_fast=20, ma_slow=50, volume_period=20)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        signals = compute_signals(df, CONFIG)
+        for end in range(60, len(df) + 1, 17):
+            expected = live_signals(technical, df.iloc[:end])
+            row = signals.iloc[end - 1]
+            assert (int(row['direction']), int(row['confluences'])) == expected, end
+
+
+def test_run_respects_open_positions_and_risk_sizing():
+    candles = {asset: make_candles(3000, seed=i) for i, asset in enumerate(CONFIG['assets'])}
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        result = Backtester(CONFIG).run(candles, payouts=0.85)
+    trades = result.trades
+    assert not trades.empty
+    for _, group in trades.groupby('asset'):
+        # Martingale: the stake doubles after a loss and resets after a win.
+        previous = group['win'].shift(fill_value=True).to_numpy()
+        amounts = group['amount'].to_numpy()
+        assert (amounts[previous] == 1).all()
+        assert (amounts[1:][~previous[1:]] == 2 * amounts[:-1][~previous[1:]]).all()
+        # One open position per asset until expiry.
+        gaps = group['time'].diff().dropna()
+        assert (gaps >= pd.Timedelta(minutes=CONFIG['trade_duration'])).all()
+    assert np.allclose(trades['profit'], np.where(trades['win'], trades['amount'] * 0.85, -trades['amount']))
+
+    summary = result.summary()
+    assert summary.loc['TOTAL', 'trades'] == len(trades)
+    assert summary.loc['TOTAL', 'profit'] == pytest.approx(trades['profit'].sum())
+
+
+def test_payout_filter_and_daily_stop_win():
+    candles = {asset: make_candles(3000, seed=i) for i, asset in enumerate(CONFIG['assets'])}
+    backtester = Backtester(dict(CONFIG, stop_win_victories=2))
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        result = backtester.run(candles, payouts={'EURUSD': 0.85, 'GBPUSD': 0.5})
+    trades = result.trades
+    assert set(trades['asset']) == {'EURUSD'}
+    day = trades['time'].dt.date
+    wins_before = trades.groupby(day)['win'].transform(lambda w: w.cumsum().shift(fill_value=0))
+    assert (wins_before < 2).all()
+
+
+def test_daily_stop_win_counts_wins_when_they_settle():
+    assets = ['EURUSD', 'GBPUSD', 'USDJPY', 'AUDUSD', 'EURGBP', 'USDCHF']
+    candles = {asset: make_candles(3000, seed=i) for i, asset in enumerate(assets)}
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        trades = Backtester(dict(CONFIG, stop_win_victories=1)).run(candles, payouts=0.85).trades
+    expiry = trades['time'] + pd.Timedelta(minutes=CONFIG['trade_duration'])
+    day = trades['time'].dt.date
+    settled_wins = [
+        (trades['win'] & (expiry <= time) & (day == time.date())).sum() for time in trades['time']
+    ]
+    assert max(settled_wins) < 1
+    # A win still open does not stop other entries yet.
+    open_wins = [
+        (trades['win'][:j] & (expiry[:j] > time) & (day[:j] == time.date())).sum()
+        for j, time in enumerate(trades['time'])
+    ]
+    assert max(open_wins) >= 1
@@ -0,0 +1,89 @@
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from candle_history import CandleHistory, _ROW_BYTES
+from candle_store import CandleStore
+
+DAY = 86400
+START = 1700006400  # 2023-11-15 00:00 UTC
+
+
+def candle(t, close):
+    return {"from": t, "open": 1.0, "max": 2.0, "min": 0.5, "close": close, "volume": 1}
+
+
+def test_append_partitions_by_day_and_reads_ranges(tmp_path):
+    history = CandleHistory(str(tmp_path))
+    times = START + np.arange(0, 3 * DAY, 300)
+    history.append("EURUSD", 300, [candle(int(t), float(i)) for i, t in enumerate(times)])
+
+    assert len(os.listdir(tmp_path / "EURUSD" / "300")) == 3
+    assert len(history.read("EURUSD", 300)) == len(times)
+
+    rows = history.read("EURUSD", 300, START + DAY - 600, START + DAY + 600)
+    assert list(rows[:, 0]) == [START + DAY - 600, START + DAY - 300, START + DAY, START + DAY + 300]
+
+    one_day = history.read("EURUSD", 300, START + 600, START + 1200)
+    assert isinstance(one_day, np.memmap)
+
+    df = history.frame("EURUSD", 300, "2023-11-16", "2023-11-17")
+    assert len(df) == DAY // 300
+    assert df.index[0].isoformat() == "2023-11-16T00:00:00"
+
+
+def test_partial_candles_are_deduplicated_and_compacted(tmp_path):
+    history = CandleHistory(str(tmp_path))
+    for close in (1.0, 1.1, 1.2):
+        history.append("EURUSD", 300, [candle(START, close)])
+    history.append("EURUSD", 300, [candle(START + 300, 2.0)])
+
+    rows = history.read("EURUSD", 300)
+    assert list(rows[:, 4]) == [1.2, 2.0]
+
+    assert history.compact("EURUSD", 300) == 2
+    assert os.path.getsize(next((tmp_path / "EURUSD" / "300").iterdir())) == 2 * _ROW_BYTES
+    assert list(history.read("EURUSD", 300)[:, 4]) == [1.2, 2.0]
+
+
+def test_previous_day_is_compacted_on_rollover(tmp_path):
+    history = CandleHistory(str(tmp_path))
+    history.append("EURUSD", 300, [candle(START, 1.0)])
+    history.append("EURUSD", 300, [candle(START, 1.5)])
+    history.append("EURUSD", 300, [candle(START + DAY, 2.0)])
+    first = tmp_path / "EURUSD" / "300" / "2023-11-15.f8"
+    assert os.path.getsize(first) == _ROW_BYTES
+
+
+def test_torn_tail_is_ignored_and_repaired(tmp_path):
+    history = CandleHistory(str(tmp_path))
+    history.append("EURUSD", 300, [candle(START, 1.0)])
+    path = tmp_path / "EURUSD" / "300" / "2023-11-15.f8"
+    with open(path, "ab") as file:
+        file.write(b"\x00" * 10)
+    assert len(history.read("EURUSD", 300)) == 1
+
+    history.append("EURUSD", 300, [candle(START + 300, 2.0)])
+    assert list(history.read("EURUSD", 300)[:, 4]) == [1.0, 2.0]
+
+
+def test_store_appends_and_warm_starts_from_history(tmp_path):
+    now = START + 200 * 300 + 10
+
+    def fetch(asset, timeframe, count):
+        requests.append(count)
+        last = now // timeframe * timeframe
+        return [candle(t, float(t)) for t in range(last - (count - 1) * timeframe, last + 1, timeframe)]
+
+    requests = []
+    CandleStore(fetch, 300, size=50, clock=lambda: now, history=CandleHistory(str(tmp_path))).refresh("EURUSD")
+
+    now += 3 * 300
+    restarted = CandleStore(fetch, 300, size=50, clock=lambda: now, history=CandleHistory(str(tmp_path)))
+    df = restarted.refresh("EURUSD")
+    assert requests == [50, 4]
+    assert len(df) == 50
+    assert np.all(np.diff(df["from"].to_numpy()) == 300)
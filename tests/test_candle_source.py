@@ -0,0 +1,106 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from candle_source import PollingSource, StreamingSource
+from candle_store import CandleStore
+
+
+def candle(start, close, volume=10):
+    return {'from': start, 'open': close, 'max': close, 'min': close, 'close': close, 'volume': volume}
+
+
+class FakeStreamClient:
+    """Keeps ``real_time_candles`` like ``IQ_Option``; ``push`` plays the websocket thread."""
+
+    def __init__(self):
+        self.real_time_candles = {}
+        self.starts = []
+        self.stops = []
+
+    def start_candles_stream(self, asset, size, maxdict):
+        self.starts.append((asset, size))
+        self.real_time_candles.setdefault(asset, {}).setdefault(size, {})
+
+    def stop_candles_stream(self, asset, size):
+        self.stops.append((asset, size))
+        self.real_time_candles.get(asset, {}).pop(size, None)
+
+    def get_realtime_candles(self, asset, size):
+        return self.real_time_candles.get(asset, {}).get(size)
+
+    def reconnect(self):
+        self.real_time_candles.clear()
+
+    def push(self, asset, size, *candles):
+        stream = self.real_time_candles.get(asset, {}).get(size)
+        if stream is None:
+            return
+        for c in candles:
+            stream[c['from']] = c
+
+
+class FakeRest:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, asset, timeframe, count):
+        self.calls.append((asset, count))
+        return [candle(1000 + i * 60, 1.0 + i) for i in range(count)]
+
+
+def test_polling_source_delegates():
+    rest = FakeRest()
+    source = PollingSource(rest)
+    assert len(source.fetch('EURUSD', 60, 3)) == 3
+    assert source.updated(['EURUSD', 'GBPUSD']) == ['EURUSD', 'GBPUSD']
+
+
+def test_streaming_backfills_then_serves_from_stream():
+    client, rest = FakeStreamClient(), FakeRest()
+    source = StreamingSource(client, rest, maxdict=5)
+    store = CandleStore(source.fetch, timeframe=60, size=10, clock=lambda: 1000 + 9 * 60 + 5)
+
+    df = store.refresh('EURUSD')
+    assert len(df) == 10 and rest.calls == [('EURUSD', 10)]
+    assert client.starts == [('EURUSD', 60)]
+
+    client.push('EURUSD', 60, candle(1000 + 9 * 60, 9.5), candle(1000 + 10 * 60, 11.0))
+    store.clock = lambda: 1000 + 10 * 60 + 5
+    df = store.refresh('EURUSD')
+    assert rest.calls == [('EURUSD', 10)]
+    assert df['close'].iloc[-2:].tolist() == [9.5, 11.0]
+    assert client.starts == [('EURUSD', 60)]
+
+
+def test_updated_reports_only_changed_streams():
+    client, rest = FakeStreamClient(), FakeRest()
+    source = StreamingSource(client, rest)
+    assert source.updated(['EURUSD']) == ['EURUSD']
+    source.fetch('EURUSD', 60, 1)
+    source.fetch('GBPUSD', 60, 1)
+    client.push('EURUSD', 60, candle(1000, 1.0))
+    client.push('GBPUSD', 60, candle(1000, 2.0))
+    assert source.updated(['EURUSD', 'GBPUSD']) == ['EURUSD', 'GBPUSD']
+    client.push('GBPUSD', 60, candle(1000, 2.1))
+    assert source.updated(['EURUSD', 'GBPUSD']) == ['GBPUSD']
+
+
+def test_resubscribe_after_reconnect_and_on_stale_stream():
+    client, rest = FakeStreamClient(), FakeRest()
+    now = [0.0]
+    source = StreamingSource(client, rest, maxdict=2, stale_seconds=30, clock=lambda: now[0])
+    source.fetch('EURUSD', 60, 1)
+    client.reconnect()
+    assert source.fetch('EURUSD', 60, 1)  # stream gone: served by REST
+    source.resubscribe()
+    assert client.starts == [('EURUSD', 60)] * 2
+
+    client.push('EURUSD', 60, candle(1000, 1.0))
+    assert source.fetch('EURUSD', 60, 1) == [candle(1000, 1.0)]
+    now[0] = 31
+    source.fetch('EURUSD', 60, 1)
+    assert client.starts == [('EURUSD', 60)] * 3
+
+    source.close()
+    assert client.stops == [('EURUSD', 60)]
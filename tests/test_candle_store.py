@@ -0,0 +1,64 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from candle_store import CandleBuffer, CandleStore
+
+
+class FakeFeed:
+    """Serves candles up to the current fake time and records request sizes."""
+
+    def __init__(self, timeframe=300):
+        self.timeframe = timeframe
+        self.now = 100 * timeframe + 10
+        self.requests = []
+
+    def get_candles(self, asset, timeframe, count):
+        self.requests.append(count)
+        last = int(self.now // timeframe) * timeframe
+        return [
+            {"from": t, "open": 1.0, "max": 2.0, "min": 0.5, "close": t / timeframe + (self.now - last), "volume": 1}
+            for t in range(last - (count - 1) * timeframe, last + 1, timeframe)
+        ]
+
+
+def candle(t, close):
+    return {"from": t, "open": 1.0, "max": 2.0, "min": 0.5, "close": close, "volume": 1}
+
+
+def test_buffer_keeps_last_candles_in_order():
+    buf = CandleBuffer(size=5)
+    for i in range(12):
+        buf.merge([candle(i * 60, float(i))])
+    df = buf.to_frame()
+    assert list(df["close"]) == [7.0, 8.0, 9.0, 10.0, 11.0]
+    assert df.index.is_monotonic_increasing
+    assert np.shares_memory(df.to_numpy(), buf._data)
+
+
+def test_buffer_updates_in_progress_candle():
+    buf = CandleBuffer(size=5)
+    assert buf.merge([candle(0, 1.0), candle(60, 2.0)]) == 2
+    assert buf.merge([candle(60, 2.5)]) == 0
+    assert buf.merge([candle(0, 9.0)]) == 0
+    assert list(buf.to_frame()["close"]) == [1.0, 2.5]
+
+
+def test_store_requests_only_missing_candles():
+    feed = FakeFeed()
+    store = CandleStore(feed.get_candles, timeframe=300, size=100, clock=lambda: feed.now)
+    df = store.refresh("EURUSD")
+    assert len(df) == 100
+
+    feed.now += 5
+    df = store.refresh("EURUSD")
+    assert feed.requests[-1] == 1
+    assert df["close"].iloc[-1] == 100 + 15
+
+    feed.now += 300
+    df = store.refresh("EURUSD")
+    assert feed.requests[-1] == 2
+    assert len(df) == 100
+    assert df["from"].iloc[-1] == 101 * 300
@@ -0,0 +1,54 @@
+import sys
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from compiled_forest import CompiledForest
+from ml_model import MLModel
+
+
+def make_data(n=400, features=12, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, features))
+    X[:, -3:] = rng.integers(0, 2, size=(n, 3))
+    y = (X[:, 0] + 0.5 * X[:, 1] * X[:, -1] + rng.normal(0, 0.5, n)) > 0
+    return X, y.astype(int)
+
+
+def test_matches_sklearn_exactly():
+    X, y = make_data()
+    model = RandomForestClassifier(n_estimators=50, random_state=1).fit(X, y)
+    compiled = CompiledForest.from_model(model)
+    test, _ = make_data(300, seed=2)
+    assert np.array_equal(compiled.predict_proba(test), model.predict_proba(test))
+    assert np.array_equal(compiled.predict_proba(test[5]), model.predict_proba(test[5:6]))
+
+
+def test_save_and_load(tmp_path):
+    X, y = make_data()
+    model = RandomForestClassifier(n_estimators=10, max_depth=4, random_state=1).fit(
+        pd.DataFrame(X, columns=[f"f{i}" for i in range(X.shape[1])]), y,
+    )
+    CompiledForest.from_model(model).save(str(tmp_path / "forest.npz"))
+    loaded = CompiledForest.load(str(tmp_path / "forest.npz"))
+    assert loaded.feature_names == list(model.feature_names_in_)
+    assert np.array_equal(loaded.predict_proba(X), model.predict_proba(pd.DataFrame(X, columns=loaded.feature_names)))
+
+
+def test_ml_model_uses_compiled_forest(tmp_path):
+    rng = np.random.default_rng(3)
+    rows = [
+        {"trend": rng.choice(["up", "down"]), "volume_ratio": rng.uniform(0, 3), "payout": 0.85}
+        for _ in range(200)
+    ]
+    train = pd.get_dummies(pd.DataFrame(rows))
+    model = RandomForestClassifier(n_estimators=30, random_state=0).fit(train, train["volume_ratio"] > 1.2)
+    joblib.dump({"model": model, "version": "test", "trades": 200}, tmp_path / "m.pkl")
+
+    ml = MLModel(filename=str(tmp_path / "j.bin"), model_file=str(tmp_path / "m.pkl"), legacy_csv=None)
+    assert ml._compiled is not None
+    assert np.array_equal(ml.probabilities(rows), model.predict_proba(train)[:, 1])
@@ -0,0 +1,118 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from connection import CircuitOpenError, ConnectionSupervisor
+
+
+class FakeClient:
+    """``IQ_Option`` stand-in whose connection can be dropped and refused."""
+
+    def __init__(self):
+        self.connected = True
+        self.refuse = False
+        self.connects = 0
+        self.lock = threading.Lock()
+
+    def connect(self):
+        with self.lock:
+            self.connects += 1
+        if self.refuse:
+            return False, "refused"
+        self.connected = True
+        return True, None
+
+    def check_connect(self):
+        return self.connected
+
+    def get_candles(self):
+        if not self.connected:
+            raise ConnectionError("socket closed")
+        return [{'from': 0}]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def make_supervisor(client, clock, **kwargs):
+    kwargs.setdefault('heartbeat_seconds', 0)
+    return ConnectionSupervisor(client, clock=clock, sleep=clock.sleep, rand=lambda: 1.0, **kwargs)
+
+
+def test_call_reconnects_and_retries():
+    client, clock = FakeClient(), FakeClock()
+    supervisor = make_supervisor(client, clock)
+    resubscribed = []
+    supervisor.on_reconnect.append(lambda: resubscribed.append(True))
+    client.connected = False
+    assert supervisor.call(client.get_candles) == [{'from': 0}]
+    metrics = supervisor.metrics()
+    assert metrics['reconnects'] == 1 and metrics['call_failures'] == 1
+    assert resubscribed == [True]
+
+
+def test_backoff_grows_and_is_capped():
+    supervisor = make_supervisor(FakeClient(), FakeClock(), base_delay=1, max_delay=8)
+    assert [supervisor.backoff(n) for n in range(6)] == [0.0, 1, 2, 4, 8, 8]
+    supervisor.rand = lambda: 0.0
+    assert supervisor.backoff(3) == 2
+
+
+def test_circuit_opens_then_recovers():
+    client, clock = FakeClient(), FakeClock()
+    supervisor = make_supervisor(client, clock, failure_threshold=3, reset_seconds=60)
+    client.connected, client.refuse = False, True
+    with pytest.raises(ConnectionError):
+        supervisor.call(client.get_candles)
+    assert supervisor.state == "open" and not supervisor.available()
+    assert clock.sleeps == [0.0, 1.0, 2.0]
+
+    with pytest.raises(CircuitOpenError):
+        supervisor.call(client.get_candles)
+    assert client.connects == 3 and supervisor.metrics()['rejected'] == 1
+
+    clock.now += 60
+    client.refuse = False
+    assert supervisor.available()
+    assert supervisor.call(client.get_candles)
+    assert supervisor.state == "closed"
+
+
+def test_concurrent_failures_reconnect_once():
+    client = FakeClient()
+    supervisor = ConnectionSupervisor(client, heartbeat_seconds=0, sleep=lambda s: time.sleep(0.05))
+    client.connected = False
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(supervisor.call(client.get_candles))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(results) == 8
+    assert client.connects == 1
+
+
+def test_heartbeat_reconnects_dropped_session():
+    client = FakeClient()
+    supervisor = ConnectionSupervisor(client, heartbeat_seconds=0.01)
+    supervisor.start()
+    client.connected = False
+    deadline = time.time() + 5
+    while not client.connected and time.time() < deadline:
+        time.sleep(0.01)
+    supervisor.stop()
+    assert client.connected and supervisor.metrics()['reconnects'] >= 1
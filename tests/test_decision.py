@@ -0,0 +1,84 @@
+import sys
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+pytest.importorskip('pandas_ta')
+import decision
+from backtest import IndicatorCache
+from signals import HTF_SIGNALS, SIGNALS
+
+
+def make_candles(n=300, seed=3):
+    rng = np.random.default_rng(seed)
+    close = 1.1 + np.cumsum(rng.normal(0, 0.0008, n))
+    open_ = np.r_[close[0], close[:-1]]
+    return pd.DataFrame({
+        'open': open_,
+        'high': np.maximum(open_, close) + rng.uniform(0, 0.0005, n),
+        'low': np.minimum(open_, close) - rng.uniform(0, 0.0005, n),
+        'close': close,
+        'volume': rng.integers(1, 100, n).astype(float),
+    }, index=pd.date_range("2024-01-01", periods=n, freq="5min"))
+
+
+def test_single_record_matches_series():
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        cache = IndicatorCache(make_candles())
+    trend = cache.trend(20, 50)
+    breakout = cache.breakouts(20)
+    ratio = cache.volume_ratio(20)
+    direction, matrix = decision.score(cache.df, trend, breakout, cache.pattern, ratio, True)
+
+    for i in (-1, -40, -120):
+        record = cache.df.iloc[i].to_dict()
+        one_direction, one_matrix = decision.score(record, trend[i], breakout[i], cache.pattern[i], ratio[i], True)
+        assert one_direction[0] == direction[i]
+        assert (one_matrix[0] == matrix[i]).all()
+
+    records = [cache.df.iloc[i].to_dict() for i in (-3, -2, -1)]
+    stacked_direction, stacked = decision.score(
+        decision.stack(records), trend[-3:], breakout[-3:], cache.pattern[-3:], ratio[-3:], True,
+    )
+    assert (stacked == matrix[-3:]).all() and (stacked_direction == direction[-3:]).all()
+
+
+def test_volume_ratio_matches_rolling_mean():
+    volume = pd.Series(np.arange(1.0, 31.0))
+    expected = volume.iloc[-1] / volume.rolling(20).mean().iloc[-1]
+    assert decision.volume_ratio(volume.to_numpy(), 20) == pytest.approx(expected)
+    assert decision.volume_ratio(volume.to_numpy()[:5], 20) == 0.0
+
+
+def test_feature_rows_broadcast_scalars():
+    values = decision.stack([{'EMA_CROSS': 1.0, 'RSI7': 60.0}, {}])
+    rows = decision.feature_rows(decision.feature_columns(
+        values, np.array(["up", "down"]), np.array([1, 0]), np.array(["cdlhammer", None], dtype=object),
+        np.array([1.5, 0.5]), 0.85,
+    ))
+    assert rows == [
+        {'pattern_name': 'cdlhammer', 'breakout': 'breakout_up', 'trend': 'up', 'volume_ratio': 1.5,
+         'payout': 0.85, 'ema_cross': True, 'rsi7': 60.0, 'macd_hist': 0.0, 'adx14': 0.0, 'atr14': 0.0},
+        {'pattern_name': 'unknown', 'breakout': 'none', 'trend': 'down', 'volume_ratio': 0.5,
+         'payout': 0.85, 'ema_cross': False, 'rsi7': 50.0, 'macd_hist': 0.0, 'adx14': 0.0, 'atr14': 0.0},
+    ]
+
+
+def test_htf_columns_are_appended():
+    values = decision.stack([{'close': 1.2, 'SUPERT': 1.1}, {'close': 1.0, 'SUPERT': 1.1}])
+    htf = (np.array([["up"], ["up"]]), np.array([[2.0], [2.0]]), np.array([[1.0], [1.0]]))
+    direction, matrix = decision.score(values, np.array(["up", "down"]), 0, None, 1.0, False, htf)
+    assert direction.tolist() == [1, -1]
+    assert matrix.shape == (2, len(SIGNALS) + len(HTF_SIGNALS))
+    assert matrix[:, -2:].tolist() == [[True, True], [False, False]]
+    assert decision.signal_columns(True)[-2:] == HTF_SIGNALS
+
+
+def test_benchmark_runs():
+    result = decision.benchmark(assets=5, repeat=3)
+    assert result['per_asset'] > 0 and result['kernel'] > 0
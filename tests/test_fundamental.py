@@ -0,0 +1,76 @@
+import functools
+import sys
+import threading
+from email.utils import formatdate
+from http.server import HTTPServer, SimpleHTTPRequestHandler
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from fundamental import FundamentalAnalyzer, asset_currencies
+
+NOW = 1750000000.0
+
+
+def write_feed(path, events):
+    items = "".join(
+        f"<item><title>{title}</title><category>{impact}</category>"
+        f"<pubDate>{formatdate(NOW + minutes * 60, usegmt=True)}</pubDate></item>"
+        for title, impact, minutes in events
+    )
+    path.write_text(f'<?xml version="1.0"?><rss version="2.0"><channel><title>cal</title>{items}</channel></rss>')
+
+
+@pytest.fixture
+def feed_server(tmp_path):
+    handler = functools.partial(SimpleHTTPRequestHandler, directory=str(tmp_path))
+    handler.log_message = lambda *args: None
+    server = HTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/feed.xml"
+    server.shutdown()
+
+
+def test_asset_currencies():
+    assert asset_currencies("EURUSD") == {"EUR", "USD"}
+    assert asset_currencies("BTCUSD-OTC") == {"BTC", "USD"}
+
+
+def test_blackout_is_per_currency(tmp_path):
+    feed = tmp_path / "feed.xml"
+    write_feed(feed, [
+        ("USD Non-Farm Employment Change", "High", 30),
+        ("JPY BOJ Press Conference", "High", 120),
+        ("EUR German ZEW", "Low", 10),
+        ("USD CPI", "High", -5),
+    ])
+    news = FundamentalAnalyzer(buffer_minutes=60, feed_url=str(feed), clock=lambda: NOW)
+    assert news.check_high_impact_news()
+    assert news.check_high_impact_news("EURUSD")
+    assert news.check_high_impact_news("BTCUSD-OTC")
+    assert not news.check_high_impact_news("EURJPY")
+    assert not news.check_high_impact_news("GBPJPY-OTC")
+
+
+def test_unknown_currency_pauses_everything(tmp_path):
+    feed = tmp_path / "feed.xml"
+    write_feed(feed, [("Central bank speech", "High", 15)])
+    news = FundamentalAnalyzer(buffer_minutes=60, feed_url=str(feed), clock=lambda: NOW)
+    assert news.check_high_impact_news("EURJPY")
+
+
+def test_refresh_is_cached_and_conditional(tmp_path, feed_server):
+    write_feed(tmp_path / "feed.xml", [("GBP GDP", "High", 30)])
+    clock = [NOW]
+    news = FundamentalAnalyzer(buffer_minutes=60, refresh_seconds=300, feed_url=feed_server, clock=lambda: clock[0])
+    assert news.check_high_impact_news("GBPUSD")
+    first_refresh = news.last_refresh
+
+    clock[0] += 10
+    assert news.check_high_impact_news("GBPUSD")
+    assert news.last_refresh == first_refresh
+
+    clock[0] += 300
+    assert news.refresh() is False  # 304 Not Modified
+    assert news.check_high_impact_news("GBPUSD")
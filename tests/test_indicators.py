@@ -0,0 +1,110 @@
+import sys
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from indicators import StreamingIndicators
+
+COLUMNS = [
+    'MA_fast', 'MA_slow', 'VWAP', 'SUPERT', 'EMA5', 'EMA20', 'RSI7',
+    'MACD_HIST', 'BB_UP', 'BB_DN', 'ADX14', 'ATR14',
+]
+
+
+def make_candles(n=600, seed=1):
+    rng = np.random.default_rng(seed)
+    close = 1.1 + np.cumsum(rng.normal(0, 0.0008, n))
+    open_ = np.r_[close[0], close[:-1]]
+    high = np.maximum(open_, close) + rng.uniform(0, 0.0005, n)
+    low = np.minimum(open_, close) - rng.uniform(0, 0.0005, n)
+    times = 1700000000 + np.arange(n) * 300
+    return pd.DataFrame(
+        {
+            'from': times, 'open': open_, 'high': high, 'low': low,
+            'close': close, 'volume': rng.integers(1, 100, n).astype(float),
+        },
+        index=pd.to_datetime(times, unit='s'),
+    )
+
+
+def stream(df, partial_updates=0):
+    state = StreamingIndicators(ma_fast=20, ma_slow=50)
+    rows = []
+    for t, o, h, l, c, v in df[['from', 'open', 'high', 'low', 'close', 'volume']].itertuples(index=False):
+        for k in range(partial_updates):
+            state.update(int(t), o, max(o, c - 0.001 * k), min(o, c), c + 0.001 * k, v / 2)
+        rows.append(dict(state.update(int(t), o, h, l, c, v)))
+    return pd.DataFrame(rows, index=df.index)
+
+
+def test_parity_with_pandas_ta_batch():
+    pytest.importorskip('pandas_ta')
+    from technical import TechnicalAnalyzer
+
+    df = make_candles()
+    ta = TechnicalAnalyzer(ma_fast=20, ma_slow=50)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        batch = ta.add_m5_indicators(ta.calculate_moving_averages(df.copy()))
+    streamed = stream(df)
+
+    # Compared from each indicator's first valid candle, warm-up included.
+    for col in COLUMNS:
+        expected = batch[col].to_numpy(dtype=float)
+        first = int(np.argmax(~np.isnan(expected)))
+        values = streamed[col].to_numpy(dtype=float)
+        assert np.isnan(values[:first]).all(), col
+        np.testing.assert_allclose(values[first:], expected[first:], rtol=1e-6, atol=1e-9, err_msg=col)
+    assert (streamed['EMA_CROSS'].to_numpy() == batch['EMA_CROSS'].to_numpy()).all()
+
+
+def test_stream_indicators_syncs_from_refreshed_window():
+    pytest.importorskip('pandas_ta')
+    from technical import TechnicalAnalyzer
+
+    df = make_candles(300)
+    ta = TechnicalAnalyzer()
+    for end in [*range(100, 300, 7), 300]:
+        latest = ta.stream_indicators('EURUSD', df.iloc[max(0, end - 100):end])
+    expected = stream(df).iloc[-1]
+    for col in COLUMNS:
+        assert latest[col] == pytest.approx(expected[col], rel=1e-9), col
+
+
+def test_stream_indicators_use_per_asset_periods():
+    pytest.importorskip('pandas_ta')
+    from technical import TechnicalAnalyzer
+
+    df = make_candles(120)
+    ta = TechnicalAnalyzer(periods={'GBPUSD': (5, 10)})
+    custom, default = ta.stream_indicators('GBPUSD', df), ta.stream_indicators('EURUSD', df)
+    assert custom['MA_fast'] == pytest.approx(df['close'].iloc[-5:].mean())
+    assert custom['MA_slow'] == pytest.approx(df['close'].iloc[-10:].mean())
+    assert default['MA_slow'] == pytest.approx(df['close'].iloc[-50:].mean())
+
+
+def test_in_progress_updates_match_final_candles():
+    df = make_candles(200)
+    final_only = stream(df)
+    with_partials = stream(df, partial_updates=3)
+    pd.testing.assert_frame_equal(final_only, with_partials, rtol=1e-12)
+
+
+def test_moving_averages_match_rolling_mean():
+    df = make_candles(300)
+    streamed = stream(df)
+    for col, length in (('MA_fast', 20), ('MA_slow', 50)):
+        expected = df['close'].rolling(length).mean().to_numpy()
+        np.testing.assert_allclose(streamed[col].to_numpy(), expected, rtol=1e-12)
+        assert np.isnan(streamed[col].to_numpy()[:length - 1]).all()
+
+
+def test_older_candles_are_ignored():
+    state = StreamingIndicators()
+    state.update(600, 1, 2, 0.5, 1.5, 10)
+    values = dict(state.update(300, 1, 9, 0.1, 9.0, 10))
+    assert values['close'] == 1.5
@@ -0,0 +1,73 @@
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from metrics import BUCKETS, Histogram, Metrics
+
+
+def test_histogram_buckets_and_quantile():
+    histogram = Histogram()
+    for value in (0.0004, 0.003, 0.003, 0.2, 7.0):
+        histogram.observe(value)
+    assert histogram.count == 5 and histogram.max == 7.0
+    assert histogram.counts[0] == 1
+    assert histogram.counts[BUCKETS.index(0.005)] == 2
+    assert histogram.quantile(0.5) == 0.005
+    assert histogram.quantile(1.0) == 7.0
+
+
+def test_render_prometheus_text():
+    metrics = Metrics()
+    with metrics.time('fetch', 'EURUSD'):
+        pass
+    metrics.observe('bot_candle_age_seconds', 1.5, asset='EURUSD')
+    metrics.gauges['bot_connection'] = lambda: {'reconnects': 2, 'state': 'closed'}
+    text = metrics.render()
+    assert '# TYPE bot_stage_seconds histogram' in text
+    assert 'bot_stage_seconds_bucket{asset="EURUSD",stage="fetch",le="+Inf"} 1' in text
+    assert 'bot_candle_age_seconds_bucket{asset="EURUSD",le="2.5"} 1' in text
+    assert 'bot_candle_age_seconds_sum{asset="EURUSD"} 1.5' in text
+    assert 'bot_connection_reconnects 2.0' in text
+    assert 'state' not in text
+
+
+def test_timed_wrapper_and_summary():
+    metrics = Metrics()
+    fetch = metrics.timed('fetch', lambda asset, timeframe, count: [asset] * count)
+    assert fetch('EURUSD', 60, 2) == ['EURUSD', 'EURUSD']
+    fetch('GBPUSD', 60, 1)
+    summary = metrics.summary()
+    assert summary[('bot_stage_seconds', 'fetch')]['count'] == 2
+
+
+def test_dump_if_due():
+    now = [0.0]
+    metrics = Metrics(dump_seconds=60, clock=lambda: now[0])
+    metrics.observe('bot_stage_seconds', 0.01, stage='cycle')
+    assert not metrics.dump_if_due()
+    now[0] = 61
+    assert metrics.dump_if_due()
+    assert not metrics.dump_if_due()
+
+
+def test_http_endpoint():
+    metrics = Metrics()
+    metrics.observe('bot_stage_seconds', 0.02, stage='cycle')
+    port = metrics.serve(0)
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+            body = response.read().decode()
+        assert 'bot_stage_seconds_count{stage="cycle"} 1' in body
+    finally:
+        metrics.close()
+
+
+def test_overhead_is_small():
+    metrics = Metrics()
+    start = time.perf_counter()
+    for _ in range(10000):
+        with metrics.time('patterns', 'EURUSD'):
+            pass
+    assert (time.perf_counter() - start) / 10000 < 50e-6
@@ -0,0 +1,121 @@
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from ml_model import FeatureEncoder, MLModel, benchmark
+
+
+def make_rows(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "pattern_name": rng.choice(["unknown", "cdl_doji", "cdl_hammer", "cdl_engulfing"]),
+            "breakout": rng.choice(["none", "breakout_up", "breakout_down"]),
+            "trend": rng.choice(["up", "down", "flat"]),
+            "volume_ratio": rng.uniform(0, 3), "payout": rng.uniform(0.75, 0.95),
+            "ema_cross": bool(rng.integers(2)), "rsi7": rng.uniform(0, 100),
+            "macd_hist": rng.normal(0, 1e-4), "adx14": rng.uniform(0, 50), "atr14": rng.uniform(0, 1e-3),
+        }
+        for _ in range(n)
+    ]
+
+
+def legacy_proba(model, features):
+    """The former per-row ``predict_high_chance`` encoding."""
+    X = pd.get_dummies(pd.DataFrame([features]))
+    for col in model.feature_names_in_:
+        if col not in X.columns:
+            X[col] = 0
+    return model.predict_proba(X[model.feature_names_in_])[0, 1]
+
+
+def fitted_model(tmp_path):
+    train = pd.DataFrame(make_rows(300, seed=1))
+    y = (train["volume_ratio"] > 1.5) & (train["trend"] != "flat")
+    model = RandomForestClassifier(n_estimators=20, random_state=0).fit(pd.get_dummies(train), y)
+    ml = MLModel(filename=str(tmp_path / "j.bin"), model_file=str(tmp_path / "m.pkl"), legacy_csv=None)
+    ml.model = model
+    return ml
+
+
+def test_encoder_matches_get_dummies_layout():
+    rows = make_rows(20)
+    columns = list(pd.get_dummies(pd.DataFrame(rows)).columns)
+    encoded = FeatureEncoder(columns).encode(rows)
+    expected = pd.get_dummies(pd.DataFrame(rows))[columns].to_numpy(dtype=float)
+    assert np.array_equal(encoded, expected)
+
+
+def test_batch_prediction_matches_per_row_path(tmp_path):
+    ml = fitted_model(tmp_path)
+    rows = make_rows(33, seed=2)
+    rows[0]["pattern_name"] = "never_seen"
+    batch = ml.predict_high_chances(rows)
+    expected = np.array([legacy_proba(ml.model, row) >= 0.8 for row in rows])
+    assert batch.dtype == bool and np.array_equal(batch, expected)
+
+    result = benchmark(ml, rows, repeat=2)
+    assert result['rows'] == 33 and result['per_row'] > 0 and result['batched'] > 0
+    assert ml.predict_high_chance(rows[1]) == expected[1]
+
+
+def test_batch_without_model_allows_all(tmp_path):
+    ml = MLModel(filename=str(tmp_path / "j.bin"), model_file=str(tmp_path / "m.pkl"), legacy_csv=None)
+    assert ml.predict_high_chances(make_rows(3)).tolist() == [True, True, True]
+
+
+def journal_with_trades(path, n=80):
+    from trade_journal import TradeJournal
+
+    journal = TradeJournal(str(path), batch_size=1000)
+    for i, row in enumerate(make_rows(n, seed=3)):
+        journal.append(row, row["volume_ratio"] > 1.5)
+    journal.close()
+
+
+def test_background_training_publishes_and_swaps_model(tmp_path):
+    journal_with_trades(tmp_path / "j.bin")
+    ml = MLModel(filename=str(tmp_path / "j.bin"), model_file=str(tmp_path / "m.pkl"), legacy_csv=None, n_jobs=2)
+    assert ml.model is None and ml._training is not None
+    assert ml.predict_high_chances(make_rows(2)).tolist() == [True, True]
+
+    deadline = time.time() + 60
+    while not ml.poll_training():
+        assert time.time() < deadline
+        time.sleep(0.05)
+    assert ml.model is not None and ml.version
+    assert not list(tmp_path.glob("*.tmp"))
+
+    reloaded = MLModel(filename=str(tmp_path / "j.bin"), model_file=str(tmp_path / "m.pkl"), legacy_csv=None)
+    assert reloaded.version == ml.version and reloaded._training is None
+    ml.close()
+
+
+def test_loads_legacy_bare_model(tmp_path):
+    import joblib
+
+    joblib.dump(fitted_model(tmp_path).model, tmp_path / "legacy.pkl")
+    ml = MLModel(filename=str(tmp_path / "j.bin"), model_file=str(tmp_path / "legacy.pkl"), legacy_csv=None)
+    assert ml.version == "legacy" and ml.model is not None
+
+
+def test_restart_loads_compiled_snapshot_without_unpickling(tmp_path):
+    import joblib
+
+    model = fitted_model(tmp_path).model
+    joblib.dump({'model': model, 'version': 'v1', 'trades': 300}, tmp_path / "m.pkl")
+    first = MLModel(filename=str(tmp_path / "j.bin"), model_file=str(tmp_path / "m.pkl"), legacy_csv=None)
+    assert (tmp_path / "m.npz").exists() and first._model is not None
+
+    second = MLModel(filename=str(tmp_path / "j.bin"), model_file=str(tmp_path / "m.pkl"), legacy_csv=None)
+    assert second.version == "v1" and second._model is None
+    rows = make_rows(33, seed=4)
+    assert np.array_equal(second.predict_high_chances(rows), first.predict_high_chances(rows))
+    assert second._model is None
+    # The sklearn model is still available, unpickled on first access.
+    assert second.model is not None and second.model.n_estimators == model.n_estimators
@@ -0,0 +1,118 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from indicators import StreamingIndicators
+from multi_timeframe import MultiTimeframeEngine
+from signals import htf_confluence_matrix
+
+
+def make_m1(n=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 1.1 + np.cumsum(rng.normal(0, 0.0003, n))
+    open_ = np.r_[close[0], close[:-1]]
+    times = 1700006400 + np.arange(n) * 60
+    return pd.DataFrame(
+        {
+            'from': times.astype(float), 'open': open_,
+            'high': np.maximum(open_, close) + rng.uniform(0, 0.0002, n),
+            'low': np.minimum(open_, close) - rng.uniform(0, 0.0002, n),
+            'close': close, 'volume': rng.integers(1, 100, n).astype(float),
+        },
+        index=pd.to_datetime(times, unit='s'),
+    )
+
+
+def resample(m1, timeframe):
+    bars = m1.resample(f"{timeframe}s").agg(
+        {'from': 'first', 'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
+    )
+    return bars
+
+
+def test_bars_and_indicators_match_direct_computation():
+    m1 = make_m1()
+    engine = MultiTimeframeEngine(60, [300, 900], live=(300,), size=1000)
+    for end in range(100, len(m1) + 1, 100):
+        engine.update("EURUSD", m1.iloc[:end])
+
+    m5 = resample(m1, 300)
+    frame = engine.frame("EURUSD", 300)
+    assert np.allclose(frame[['open', 'high', 'low', 'close', 'volume']].to_numpy(),
+                       m5[['open', 'high', 'low', 'close', 'volume']].to_numpy()[-len(frame):])
+
+    direct = StreamingIndicators()
+    for t, o, h, l, c, v in m5.itertuples(index=False):
+        direct.update(int(t), o, h, l, c, v)
+    live = engine.values("EURUSD", 300)
+    assert all(np.isclose(live[k], direct.values[k], equal_nan=True) for k in direct.values)
+
+    # M15 only holds closed bars: the last, in-progress one is not applied yet.
+    m15 = resample(m1, 900)
+    assert engine.frame("EURUSD", 900)['close'].iloc[-1] == m15['close'].iloc[-2]
+
+
+def test_higher_timeframe_updates_only_on_bar_close():
+    m1 = make_m1(180)
+    engine = MultiTimeframeEngine(60, [300, 3600], live=(300,))
+    engine.update("EURUSD", m1.iloc[:61])
+    h1 = engine.series("EURUSD", 3600).indicators
+    assert h1.last_time == m1['from'].iloc[0]
+
+    updated = m1.iloc[:61].copy()
+    updated.iloc[-1, updated.columns.get_loc('close')] += 0.01
+    before = dict(h1.values)
+    assert engine.update("EURUSD", updated) == []
+    assert h1.values == before
+    assert engine.values("EURUSD", 300)['close'] == updated['close'].iloc[-1]
+
+    assert engine.update("EURUSD", m1.iloc[:121]) == [300, 3600]
+    assert h1.last_time == m1['from'].iloc[60]
+
+
+def test_htf_confluences_require_every_timeframe_to_agree():
+    matrix = htf_confluence_matrix(
+        [1, 1, -1],
+        [["up", "up"], ["up", "down"], ["down", "down"]],
+        [[1.2, 1.2], [1.2, 1.2], [1.0, 1.2]],
+        [[1.1, 1.1], [1.1, 1.3], [1.1, 1.1]],
+    )
+    assert matrix.tolist() == [[True, True], [False, False], [True, False]]
+
+
+def test_higher_timeframes_are_backfilled_on_first_update():
+    m1 = make_m1(6000)
+    requests = []
+
+    def fetch(asset, timeframe, count):
+        requests.append(timeframe)
+        bars = resample(m1, timeframe).iloc[-count:]
+        return [
+            {'from': t, 'open': o, 'max': h, 'min': l, 'close': c, 'volume': v}
+            for t, o, h, l, c, v in bars.itertuples(index=False)
+        ]
+
+    engine = MultiTimeframeEngine(60, [300, 3600], live=(300,), size=100, fetch=fetch)
+    # Only 100 M1 candles (under two hours) from the live feed.
+    engine.update("EURUSD", m1.iloc[-100:])
+    assert sorted(requests) == [300, 3600]
+
+    h1 = resample(m1, 3600)
+    direct = StreamingIndicators()
+    for t, o, h, l, c, v in h1.iloc[-100:-1].itertuples(index=False):
+        direct.update(int(t), o, h, l, c, v)
+    values = engine.values("EURUSD", 3600)
+    assert not np.isnan(values['MA_slow'])
+    assert all(np.isclose(values[k], direct.values[k], equal_nan=True) for k in direct.values)
+
+    m5 = resample(m1, 300)
+    live = StreamingIndicators()
+    for t, o, h, l, c, v in m5.iloc[-100:].itertuples(index=False):
+        live.update(int(t), o, h, l, c, v)
+    assert all(np.isclose(engine.values("EURUSD", 300)[k], live.values[k], equal_nan=True) for k in live.values)
+
+    engine.update("EURUSD", m1)
+    assert sorted(requests) == [300, 3600]
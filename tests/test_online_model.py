@@ -0,0 +1,83 @@
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from ml_model import MLModel
+from online_model import OnlineModel
+
+
+def make_rows(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "pattern_name": rng.choice(["unknown", "cdldoji", "cdlhammer"]),
+            "breakout": rng.choice(["none", "breakout_up", "breakout_down"]),
+            "trend": rng.choice(["up", "down", "flat"]),
+            "volume_ratio": rng.uniform(0, 3), "payout": rng.uniform(0.75, 0.95),
+            "ema_cross": bool(rng.integers(2)), "rsi7": rng.uniform(0, 100),
+            "macd_hist": rng.normal(0, 1e-4), "adx14": rng.uniform(0, 50), "atr14": rng.uniform(0, 1e-3),
+        }
+        for _ in range(n)
+    ]
+
+
+def outcome(row):
+    return row["trend"] == "up" and row["volume_ratio"] > 1.5
+
+
+def test_learns_rule_one_trade_at_a_time():
+    model = OnlineModel(learning_rate=0.1)
+    for row in make_rows(3000, seed=4):
+        model.update([row], [outcome(row)])
+    test = make_rows(500, seed=5)
+    predicted = model.predict_proba(test) >= 0.5
+    assert (predicted == np.array([outcome(r) for r in test])).mean() > 0.85
+    assert model.updates == 3000
+
+
+def test_update_cost_does_not_grow_with_history():
+    model = OnlineModel()
+    rows = make_rows(64, seed=6)
+    results = [outcome(r) for r in rows]
+
+    def timed(n):
+        start = time.perf_counter()
+        for _ in range(n):
+            model.update(rows[:8], results[:8])
+        return (time.perf_counter() - start) / n
+
+    early = timed(200)
+    for _ in range(2000):
+        model.update(rows[:8], results[:8])
+    assert timed(200) < 3 * early
+    assert model.weights.nbytes == model.size * 8
+
+
+def test_save_and_load_round_trip(tmp_path):
+    model = OnlineModel()
+    rows = make_rows(50, seed=7)
+    model.update(rows, [outcome(r) for r in rows])
+    model.save(str(tmp_path / "online.npz"))
+    restored = OnlineModel.load(str(tmp_path / "online.npz"))
+    assert np.allclose(restored.predict_proba(rows), model.predict_proba(rows))
+    assert restored.updates == 50
+
+
+def test_ml_model_runs_online_side_by_side(tmp_path):
+    ml = MLModel(
+        filename=str(tmp_path / "j.bin"), model_file=str(tmp_path / "m.pkl"), legacy_csv=None,
+        online_file=str(tmp_path / "online.npz"), mode="online",
+    )
+    rows = make_rows(200, seed=8)
+    for row in rows:
+        ml.log_trade(row, outcome(row))
+    summary = ml.comparison.summary()
+    assert ml.comparison.trades == 200 and set(summary) == {"batch", "online"}
+    assert summary["online"]["accuracy"] > summary["batch"]["accuracy"] - 0.2
+    assert ml.predict_high_chances(rows[:3]).dtype == bool
+    ml.close()
+    assert (tmp_path / "online.npz").exists()
+    assert len(ml.journal) == 200
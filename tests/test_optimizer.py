@@ -0,0 +1,107 @@
+import json
+import sys
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from backtest import Backtester
+from optimizer import AssetEvaluator, best_configs, folds, optimize, parameter_sets, walk_forward
+from utils import entry_strength, load_asset_overrides
+
+CONFIG = {
+    'assets': ['EURUSD', 'GBPUSD'], 'timeframe_main': 300, 'trade_duration': 5,
+    'min_payout': 0.75, 'max_payout': 0.95, 'trend_ma_fast': 20, 'trend_ma_slow': 50,
+    'volume_period': 20, 'breakout_lookback': 20, 'stop_loss_amount': 1e9,
+    'stop_loss_consecutive': 10 ** 6, 'stop_win_amount': 1e9, 'stop_win_victories': 10 ** 6,
+    'strategy': 'normal', 'martingale_factor': 2, 'soros_level': 3,
+    'use_martingale_if_high_chance': True, 'use_soros_if_low_payout': True, 'min_payout_for_soros': 0.8,
+}
+SPACE = {
+    'trend_ma_fast': (5, 20), 'trend_ma_slow': (20, 50), 'volume_period': (10, 20),
+    'breakout_lookback': (20,), 'min_payout': (0.75,), 'min_confluences': (5, 6),
+}
+
+
+def make_candles(n=4000, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 1.1 + np.cumsum(rng.normal(0, 0.0008, n))
+    open_ = np.r_[close[0], close[:-1]]
+    times = 1700006400 + np.arange(n) * 300
+    return pd.DataFrame(
+        {
+            'from': times, 'open': open_,
+            'high': np.maximum(open_, close) + rng.uniform(0, 0.0005, n),
+            'low': np.minimum(open_, close) - rng.uniform(0, 0.0005, n),
+            'close': close, 'volume': rng.integers(1, 100, n).astype(float),
+        },
+        index=pd.to_datetime(times, unit='s'),
+    )
+
+
+def test_parameter_sets_skip_invalid_and_sample():
+    grid = parameter_sets(SPACE)
+    assert all(p['trend_ma_fast'] < p['trend_ma_slow'] for p in grid)
+    assert len(grid) == 3 * 2 * 2
+    assert len(parameter_sets(SPACE, trials=5)) == 5
+
+
+def test_folds_step_by_test_window():
+    times = pd.date_range("2024-01-01", periods=20 * 288, freq="5min").to_numpy()
+    splits = folds(times, train_days=10, test_days=3)
+    assert len(splits) == 3
+    assert splits[0] == (0, 10 * 288, 13 * 288)
+    assert splits[1][0] == 3 * 288
+
+
+def test_evaluation_matches_backtester():
+    df = make_candles()
+    params = {'trend_ma_fast': 20, 'trend_ma_slow': 50, 'volume_period': 20,
+              'breakout_lookback': 20, 'min_payout': 0.75, 'min_confluences': 5}
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        result = AssetEvaluator(df, CONFIG, payout=0.85).evaluate(params)
+        trades = Backtester(CONFIG).run({'EURUSD': df}, payouts=0.85).trades
+    assert result['trades'] == len(trades)
+    assert result['wins'] == int(trades['win'].sum())
+    assert np.isclose(result['profit'], trades['profit'].sum())
+
+
+def test_optimize_writes_best_config_per_asset(tmp_path):
+    candles = {'EURUSD': make_candles(seed=1), 'GBPUSD': make_candles(seed=2)}
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        results = optimize(candles, CONFIG, parameter_sets(SPACE), payouts=0.85, workers=0,
+                           train_days=5, test_days=2, min_trades=1)
+    configs = best_configs(results)
+    assert set(configs) == {'EURUSD', 'GBPUSD'}
+    for asset, result in results.items():
+        assert len(result['folds']) == len(folds(candles[asset].index.to_numpy(), 5, 2)) == 4
+        assert configs[asset]['strength_levels'][1] == result['params']['min_confluences']
+        assert result['out_of_sample']['trades'] == sum(f['test']['trades'] for f in result['folds'])
+
+    path = tmp_path / "optimized_params.json"
+    path.write_text(json.dumps(configs))
+    overrides = load_asset_overrides(str(path))
+    media = results['EURUSD']['params']['min_confluences']
+    assert entry_strength(media, overrides['EURUSD']['strength_levels']) == "media"
+    assert entry_strength(media - 1, overrides['EURUSD']['strength_levels']) != "media"
+    assert load_asset_overrides(str(tmp_path / "missing.json")) == {}
+
+
+def test_min_payout_is_searched_only_with_per_candle_payouts():
+    df = make_candles(1500, seed=3)
+    candidates = parameter_sets(dict(SPACE, min_payout=(0.75, 0.85)))
+    with pytest.raises(ValueError):
+        walk_forward('EURUSD', df, CONFIG, candidates, payout=0.85)
+
+    payout = np.where(np.arange(len(df)) % 2, 0.8, 0.9)
+    evaluator = AssetEvaluator(df, CONFIG, payout=payout)
+    params = dict(candidates[0], min_payout=0.75)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        assert evaluator.evaluate(dict(params, min_payout=0.85))['trades'] < evaluator.evaluate(params)['trades']
+        assert walk_forward('EURUSD', df, CONFIG, candidates, payout=payout, min_trades=1)['params']
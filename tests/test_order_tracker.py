@@ -0,0 +1,72 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from order_tracker import OrderTracker
+
+
+class FakeBroker:
+    """``check_win`` stand-in that blocks until the test releases an order."""
+
+    def __init__(self):
+        self.released = {}
+        self.results = {}
+
+    def release(self, order_id, won):
+        self.results[order_id] = won
+        self.released.setdefault(order_id, threading.Event()).set()
+
+    def check_win(self, order_id):
+        self.released.setdefault(order_id, threading.Event()).wait(5)
+        if self.results[order_id] is None:
+            raise ConnectionError("socket closed")
+        return self.results[order_id], 0.85 if self.results[order_id] else -1
+
+
+def wait_closed(tracker, count):
+    closed = []
+    deadline = time.time() + 5
+    while len(closed) < count and time.time() < deadline:
+        closed += tracker.poll()
+        time.sleep(0.01)
+    return closed
+
+
+def test_track_does_not_block_and_dispatches_on_poll():
+    broker = FakeBroker()
+    seen = []
+    tracker = OrderTracker(broker.check_win, workers=4, on_result=[lambda p: seen.append((p.asset, p.result))])
+    start = time.perf_counter()
+    for i, asset in enumerate(["EURUSD", "GBPUSD", "USDJPY"]):
+        tracker.track(asset, i, amount=1, features={"payout": 0.85})
+    assert time.perf_counter() - start < 0.5
+    assert tracker.is_open("EURUSD") and len(tracker.open_positions) == 3
+
+    broker.release(1, True)
+    assert wait_closed(tracker, 1)[0].asset == "GBPUSD"
+    assert seen == [("GBPUSD", True)]
+    assert not tracker.is_open("GBPUSD") and tracker.is_open("EURUSD")
+
+    broker.release(0, False)
+    broker.release(2, None)
+    wait_closed(tracker, 2)
+    assert sorted(seen) == [("EURUSD", False), ("GBPUSD", True), ("USDJPY", False)]
+    assert tracker.open_positions == []
+    tracker.close()
+
+
+def test_callback_errors_do_not_stop_dispatch():
+    broker = FakeBroker()
+    seen = []
+
+    def failing(position):
+        raise RuntimeError("boom")
+
+    tracker = OrderTracker(broker.check_win, on_result=[failing, lambda p: seen.append(p.order_id)])
+    tracker.track("EURUSD", 7, amount=2)
+    broker.release(7, True)
+    wait_closed(tracker, 1)
+    assert seen == [7]
+    tracker.close()
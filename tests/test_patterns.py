@@ -0,0 +1,54 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from patterns import PatternScanner
+
+
+def frame(rows):
+    return pd.DataFrame(rows, columns=['open', 'high', 'low', 'close'])
+
+
+def random_candles(n=500, seed=3):
+    rng = np.random.default_rng(seed)
+    close = 1 + np.cumsum(rng.normal(0, 0.002, n))
+    open_ = close + rng.normal(0, 0.002, n)
+    high = np.maximum(open_, close) + rng.uniform(0, 0.002, n)
+    low = np.minimum(open_, close) - rng.uniform(0, 0.002, n)
+    return pd.DataFrame({'open': open_, 'high': high, 'low': low, 'close': close})
+
+
+def test_bullish_engulfing():
+    df = frame([
+        [1.10, 1.11, 1.05, 1.06],
+        [1.05, 1.12, 1.04, 1.11],
+    ])
+    assert ('cdlengulfing', 100) in PatternScanner().scan(df)
+
+
+def test_doji_and_empty_frame():
+    scanner = PatternScanner(['cdldoji'])
+    assert scanner.scan(frame([[1.0, 1.1, 0.9, 1.005]])) == [('cdldoji', 100)]
+    assert scanner.scan(frame([])) == []
+
+
+def test_scan_only_needs_last_candles():
+    df = random_candles()
+    scanner = PatternScanner()
+    assert scanner.scan(df) == scanner.scan(df.tail(scanner.lookback))
+
+
+def test_label_matches_live_scan():
+    df = random_candles(200)
+    scanner = PatternScanner()
+    labels = scanner.label(df)
+    first = scanner.first_pattern(df)
+    assert (labels != 0).to_numpy().any()
+    for i in range(len(df)):
+        live = scanner.scan(df.iloc[:i + 1])
+        row = labels.iloc[i]
+        assert live == [(name, int(v)) for name, v in row.items() if v != 0]
+        assert first[i] == (live[0][0] if live else None)
@@ -0,0 +1,109 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from replay import Recorder, ReplayClient, SimulatedClock, SimulatedIQOption, SimulationFinished, benchmark
+
+START = 1_700_000_000.0
+
+
+def test_instant_clock_advances_on_sleep_and_finishes_at_end():
+    clock = SimulatedClock(speed=0, start=START, end=START + 600)
+    clock.sleep(300)
+    assert START + 300 <= clock.time() < START + 301
+    clock.sleep(300)
+    with pytest.raises(SimulationFinished):
+        clock.sleep(1)
+
+
+def test_simulated_candles_are_deterministic_and_aggregated_from_closed_bars():
+    clock = SimulatedClock(speed=0, start=START + 150)
+    sim = SimulatedIQOption(["EURUSD"], clock, history=100)
+    m1 = sim.get_candles("EURUSD", 60, 20, clock.time())
+    m5 = sim.get_candles("EURUSD", 300, 4, clock.time())
+
+    assert m1 == SimulatedIQOption(["EURUSD"], SimulatedClock(speed=0, start=START + 150), history=100).get_candles(
+        "EURUSD", 60, 20, START + 150
+    )
+    assert all(a['close'] == b['open'] for a, b in zip(m1, m1[1:]))
+    assert m1[-1]['to'] <= clock.time()
+    # The newest M5 candle is still in progress and only holds the M1 bars closed so far.
+    in_progress = [c for c in m1 if c['from'] >= m5[-1]['from']]
+    assert m5[-1]['open'] == in_progress[0]['open'] and m5[-1]['close'] == in_progress[-1]['close']
+    assert m5[-1]['volume'] == sum(c['volume'] for c in in_progress)
+
+    with pytest.raises(ValueError):
+        sim.get_candles("EURUSD", 90, 10, clock.time())
+
+
+def test_simulated_orders_settle_on_the_price_path():
+    clock = SimulatedClock(speed=0, start=START)
+    sim = SimulatedIQOption(["EURUSD"], clock, history=10)
+    entry = sim.price("EURUSD")
+    ok, call = sim.buy(10, "EURUSD", "call", 1)
+    _, put = sim.buy(10, "EURUSD", "put", 1)
+    assert ok and sim.balance == 10_000 - 20
+    clock.sleep(120)
+
+    moved_up = sim.price("EURUSD", START + 60) > entry
+    payout = sim.get_all_profit()["EURUSD"]["turbo"]
+    assert sim.check_win(call) == ((True, 10 * payout) if moved_up else (False, -10))
+    assert sim.check_win(put) == ((False, -10) if moved_up else (True, 10 * payout))
+    assert sim.balance == pytest.approx(10_000 + 10 * payout - 10)
+
+
+class FlakyClient:
+    def __init__(self):
+        self.failed = False
+
+    def get_candles(self, asset, interval, count, endtime):
+        if not self.failed:
+            self.failed = True
+            raise ConnectionError("socket closed")
+        return [{'from': 60 * i, 'close': float(i)} for i in range(count)]
+
+    def buy(self, amount, asset, action, duration):
+        return True, 42
+
+    def check_win(self, order_id):
+        return True, 0.85
+
+    def get_all_profit(self):
+        return {"EURUSD": {"turbo": 0.85}}
+
+
+def test_recorded_session_replays_responses_errors_and_orders(tmp_path):
+    path = tmp_path / "session.jsonl.gz"
+    now = [START]
+    recorder = Recorder(FlakyClient(), path, clock=lambda: now[0])
+    with pytest.raises(ConnectionError):
+        recorder.get_candles("EURUSD", 60, 3, now[0])
+    now[0] += 10
+    candles = recorder.get_candles("EURUSD", 60, 3, now[0])
+    assert recorder.get_all_profit() == {"EURUSD": {"turbo": 0.85}}
+    assert recorder.buy(1, "EURUSD", "call", 1) == (True, 42)
+    now[0] += 60
+    assert recorder.check_win(42) == (True, 0.85)
+    recorder.close()
+
+    replay = ReplayClient(path, speed=0)
+    assert replay.clock.start == START and replay.clock.end == START + 70
+    with pytest.raises(ConnectionError):
+        replay.get_candles("EURUSD", 60, 3, 0)
+    replay.clock.sleep(10)
+    assert replay.get_candles("EURUSD", 60, 2, 0) == candles[-2:]
+    assert replay.get_all_profit() == {"EURUSD": {"turbo": 0.85}}
+    assert replay.buy(1, "EURUSD", "call", 1) == (True, 42)
+    assert replay.buy(1, "EURUSD", "call", 1) == (False, None)
+    replay.clock.sleep(60)
+    assert replay.check_win(42) == (True, 0.85)
+    with pytest.raises(SimulationFinished):
+        replay.get_all_profit()
+
+
+def test_benchmark_runs_the_bot_loop_offline():
+    result = benchmark(hours=0.5, speed=0, assets=3)
+    assert result['cycles'] >= 5
+    assert result['candle_requests'] >= result['cycles']
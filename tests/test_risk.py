@@ -1,6 +1,7 @@
 # tests/test_risk.py
 
 import sys
+import time
 from pathlib import Path
 import pytest
 
@@ -99,3 +100,112 @@ def test_next_amount_reset_on_limit_all_assets(rm_martingale):
         rm.assets[asset]['current_amount'] = 4
         # deve resetar para o valor mínimo (1)
         assert rm.next_amount(asset) == 1, f"reset no limite para {asset} deveria dar 1"
+
+
+def make_portfolio(**limits):
+    return RiskManager(
+        stop_loss_amount=100, stop_loss_consecutive=5, stop_win_amount=100, stop_win_victories=5,
+        strategy='martingale', martingale_factor=2, soros_level=3,
+        use_martingale_if_high_chance=False, use_soros_if_low_payout=False, min_payout_for_soros=0.8,
+        assets=ASSETS, **limits,
+    )
+
+
+def test_global_and_currency_exposure():
+    rm = make_portfolio(max_open_trades=3, max_currency_exposure=2)
+    rm.open_trade("EURUSD", 1)
+    rm.open_trade("EURGBP", 1)
+    mask = rm.allowed(["GBPUSD", "USDJPY", "AUDCAD", "EURJPY"])
+    # EUR is at its cap; USD and GBP have room for one more unit.
+    assert mask.tolist() == [True, True, True, False]
+    rm.open_trade("AUDCAD", 1)
+    assert not rm.allowed(["NZDJPY"])[0]
+    rm.register_trade("EURUSD", True, amount=1, payout=0.8)
+    assert rm.allowed(["NZDJPY"])[0]
+    assert rm.state("EURUSD")["open"] == 0
+
+
+def test_correlated_groups():
+    rm = make_portfolio(max_correlated=1, correlated_groups=[["BTCUSD-OTC", "ETHUSD-OTC", "LTCUSD-OTC"]])
+    rm.open_trade("EURUSD", 1)
+    rm.open_trade("BTCUSD-OTC", 1)
+    assert rm.allowed(["EURUSD-OTC", "ETHUSD-OTC", "GBPUSD"]).tolist() == [False, False, True]
+
+    # config.yaml form: one "A, B, C" line per group.
+    rm = make_portfolio(max_correlated=1, correlated_groups=["BTCUSD-OTC, ETHUSD-OTC, LTCUSD-OTC"])
+    rm.open_trade("BTCUSD-OTC", 1)
+    assert rm.allowed(["ETHUSD-OTC", "EURUSD"]).tolist() == [False, True]
+    with pytest.raises(ValueError):
+        make_portfolio(correlated_groups=["[BTCUSD-OTC, ETHUSD-OTC]"])
+
+
+def test_daily_drawdown_blocks_until_next_day():
+    rm = make_portfolio(max_daily_drawdown=3)
+    rm.roll_day("2024-01-01")
+    rm.register_trade("EURUSD", True, amount=2, payout=1.0)
+    rm.register_trade("GBPUSD", False, amount=2)
+    assert rm.can_trade("USDJPY")
+    rm.register_trade("GBPUSD", False, amount=1)
+    assert not rm.can_trade("USDJPY")
+    rm.roll_day("2024-01-02")
+    assert rm.can_trade("USDJPY")
+
+
+def test_martingale_and_stops_per_asset():
+    rm = make_portfolio()
+    assert rm.next_amount("EURUSD") == 1
+    rm.register_trade("EURUSD", False)
+    assert rm.next_amount("EURUSD") == 2
+    rm.register_trade("EURUSD", True)
+    assert rm.next_amount("EURUSD") == 1
+    for _ in range(5):
+        rm.register_trade("GBPUSD", False)
+    assert not rm.can_trade("GBPUSD") and rm.can_trade("EURUSD")
+    assert rm.allowed(["GBPUSD", "EURUSD"]).tolist() == [False, True]
+
+
+def test_exposure_is_checked_with_the_martingale_stake():
+    rm = make_portfolio(max_exposure=3)
+    rm.open_trade("USDJPY", 1)
+    rm.register_trade("EURUSD", False, amount=1)
+    # The next EURUSD stake is 2 after the loss, which would take the exposure to 3.
+    assert rm.stake("EURUSD") == 2 and rm.state("EURUSD")["last_result"] is False
+    assert rm.can_trade("EURUSD", rm.stake("EURUSD"))
+    rm.open_trade("GBPUSD", 1)
+    assert rm.can_trade("EURUSD") and not rm.can_trade("EURUSD", rm.stake("EURUSD"))
+    assert rm.next_amount("EURUSD") == 2
+
+
+def test_stake_resets_after_a_win_for_the_exposure_check():
+    rm = make_portfolio(max_exposure=3)
+    rm.open_trade("USDJPY", 2)
+    rm.current_amount[rm.index["EURUSD"]] = 8
+    rm.register_trade("EURUSD", True, amount=8)
+    # current_amount still holds the escalated 8, but the next stake is 1 and fits.
+    assert not rm.allowed(["EURUSD"])[0]
+    assert rm.stake("EURUSD") == 1 and rm.allowed(["EURUSD"], [rm.stake("EURUSD")])[0]
+
+
+def test_assets_view_reads_and_writes_the_arrays():
+    rm = make_portfolio()
+    rm.register_trade("EURUSD", False, amount=1)
+    assert rm.assets["EURUSD"]["consecutive_losses"] == 1 and rm.assets["EURUSD"]["last_result"] is False
+    rm.assets["EURUSD"]["losses_amount"] = rm.stop_loss_amount
+    assert not rm.can_trade("EURUSD")
+    rm.assets["GBPUSD"]["current_amount"] = 4
+    rm.assets["GBPUSD"]["last_result"] = None
+    assert rm.next_amount("GBPUSD") == 4
+
+
+def test_thousands_of_trades_per_second():
+    rm = make_portfolio(max_open_trades=10, max_currency_exposure=50, max_correlated=2, max_daily_drawdown=1e9)
+    rm.stop_loss_consecutive = rm.stop_win_victories = 10 ** 9
+    rm.stop_loss_amount = rm.stop_win_amount = 1e12
+    start = time.perf_counter()
+    for n in range(5000):
+        asset = ASSETS[n % len(ASSETS)]
+        if rm.can_trade(asset):
+            amount = rm.next_amount(asset)
+            rm.open_trade(asset, amount)
+            rm.register_trade(asset, n % 3 == 0, amount=amount, payout=0.85)
+    assert 5000 / (time.perf_counter() - start) > 2000
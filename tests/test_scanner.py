@@ -0,0 +1,73 @@
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from scanner import AssetScanner
+
+
+class FakeIQ:
+    """Minimal ``IQ_Option`` stand-in that answers ``get_candles`` after a delay."""
+
+    def __init__(self, latency=0.05, failing=()):
+        self.latency = latency
+        self.failing = set(failing)
+
+    def get_candles(self, asset, timeframe, count, endtime):
+        time.sleep(self.latency)
+        if asset in self.failing:
+            raise ConnectionError("timeout")
+        start = int(endtime) - count * timeframe
+        return [
+            {"from": start + i * timeframe, "open": 1.0, "max": 1.1, "min": 0.9, "close": 1.0 + i, "volume": 10}
+            for i in range(count)
+        ]
+
+
+def fetch_df(IQ, asset):
+    candles = IQ.get_candles(asset, 300, 10, time.time())
+    df = pd.DataFrame(candles).rename(columns={"min": "low", "max": "high"})
+    return df
+
+
+def last_close(df):
+    return float(df["close"].iloc[-1])
+
+
+ASSETS = [f"ASSET{i}" for i in range(20)]
+
+
+def test_scan_fetches_concurrently():
+    IQ = FakeIQ(latency=0.05)
+    scanner = AssetScanner(lambda a: fetch_df(IQ, a), analyze=last_close, fetch_workers=10, process_workers=0)
+    try:
+        results = dict(scanner.scan(ASSETS))
+    finally:
+        scanner.close()
+    assert sorted(results) == sorted(ASSETS)
+    assert all(v == 10.0 for v in results.values())
+    # 20 serial fetches would take 1s
+    assert scanner.last_cycle_seconds < 0.5
+
+
+def test_scan_skips_failed_assets():
+    IQ = FakeIQ(latency=0.01, failing={"ASSET3"})
+    scanner = AssetScanner(lambda a: fetch_df(IQ, a), analyze=last_close, process_workers=0)
+    try:
+        results = dict(scanner.scan(ASSETS))
+    finally:
+        scanner.close()
+    assert "ASSET3" not in results
+    assert len(results) == len(ASSETS) - 1
+
+
+def test_scan_with_process_pool():
+    IQ = FakeIQ(latency=0.01)
+    scanner = AssetScanner(lambda a: fetch_df(IQ, a), analyze=last_close, process_workers=2)
+    try:
+        results = dict(scanner.scan(ASSETS[:4]))
+    finally:
+        scanner.close()
+    assert results == {asset: 10.0 for asset in ASSETS[:4]}
@@ -0,0 +1,91 @@
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from scheduler import CLOSE, INTRA, CandleScheduler
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def make_scheduler(clock, **kwargs):
+    return CandleScheduler(300, clock=clock, sleep=clock.sleep, rand=lambda: 0.5, **kwargs)
+
+
+def frame(rows):
+    return pd.DataFrame(rows, columns=['from', 'close', 'volume'])
+
+
+def test_wakes_at_candle_close_plus_settle_and_jitter():
+    clock = FakeClock(1_000_010)
+    scheduler = make_scheduler(clock, settle=1.0, jitter=2.0)
+    assert scheduler.wait() == CLOSE
+    assert clock.sleeps == []
+    assert scheduler.wait() == CLOSE
+    assert clock.now == 1_000_200 + 2.0
+    assert scheduler.wait() == CLOSE
+    assert clock.now == 1_000_500 + 2.0
+
+
+def test_missed_close_is_handled_without_sleeping():
+    clock = FakeClock(1_000_010)
+    scheduler = make_scheduler(clock, settle=1.0)
+    scheduler.wait()
+    clock.now = 1_000_150
+    scheduler.wait()
+    clock.now += 400  # slow cycle overran the next close
+    assert scheduler.wait() == CLOSE
+    assert clock.sleeps == [51.0]
+    scheduler.wait()
+    assert clock.now == 1_000_801
+
+
+def test_intra_candle_wakeups_for_spikes():
+    clock = FakeClock(1_000_201)
+    scheduler = make_scheduler(clock, settle=1.0, spike_interval=60)
+    scheduler.wait()
+    kinds = [scheduler.wait() for _ in range(5)]
+    assert kinds == [INTRA] * 4 + [CLOSE]
+    assert clock.now == 1_000_501
+
+
+def test_interval_mode_polls():
+    clock = FakeClock(1_000_010)
+    scheduler = make_scheduler(clock, interval=5)
+    assert [scheduler.wait() for _ in range(3)] == [CLOSE] * 3
+    assert clock.sleeps == [5, 5]
+
+
+def test_changed_and_spike():
+    scheduler = make_scheduler(FakeClock(0), spike_ratio=2.0)
+    df = frame([(0, 1.0, 10), (300, 1.1, 10), (600, 1.2, 5)])
+    assert scheduler.changed('EURUSD', df)
+    assert not scheduler.changed('EURUSD', df)
+    assert scheduler.changed('GBPUSD', df)
+    assert not scheduler.spike('EURUSD', df, period=2)
+
+    df = frame([(0, 1.0, 10), (300, 1.1, 10), (600, 1.3, 25)])
+    assert scheduler.changed('EURUSD', df)
+    assert scheduler.spike('EURUSD', df, period=2)
+    assert not scheduler.spike('EURUSD', frame([(0, 1.0, 10), (300, 1.1, 10), (600, 1.3, 40)]), period=2)
+
+
+def test_closed_drops_the_candle_that_has_just_opened():
+    clock = FakeClock(1_000_201)
+    scheduler = make_scheduler(clock)
+    df = frame([[999_600, 1.0, 10], [999_900, 1.1, 12], [1_000_200, 1.2, 0.1]])
+    assert scheduler.closed(df)['from'].tolist() == [999_600, 999_900]
+    assert scheduler.closed(df.iloc[:2])['from'].tolist() == [999_600, 999_900]
+    assert len(scheduler.closed(df, now=999_950)) == 1
@@ -0,0 +1,126 @@
+import sys
+import threading
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+import snapshot
+from candle_store import CandleStore
+from order_tracker import OrderTracker
+from risk import RiskManager
+from scheduler import CandleScheduler
+
+
+def make_risk(assets):
+    return RiskManager(
+        stop_loss_amount=100, stop_loss_consecutive=5, stop_win_amount=100, stop_win_victories=5,
+        strategy='martingale', martingale_factor=2, soros_level=3,
+        use_martingale_if_high_chance=False, use_soros_if_low_payout=False, min_payout_for_soros=0.8,
+        assets=assets,
+    )
+
+
+def feed(asset, timeframe, count):
+    last = 1000 * timeframe
+    return [
+        {"from": t, "open": 1.0, "max": 2.0, "min": 0.5, "close": t / timeframe, "volume": 1}
+        for t in range(last - (count - 1) * timeframe, last + 1, timeframe)
+    ]
+
+
+def test_save_and_load_sections(tmp_path):
+    path = str(tmp_path / "session.npz")
+    snapshot.save(path, {'risk': {'assets': np.array(["EURUSD"]), 'daily_pnl': 1.5}, 'session': snapshot.session("v1")})
+    loaded = snapshot.load(path)
+    assert loaded['risk']['assets'].tolist() == ["EURUSD"] and float(loaded['risk']['daily_pnl']) == 1.5
+    assert str(loaded['session']['model_version']) == "v1"
+    assert not list(tmp_path.glob("*.tmp"))
+
+    assert snapshot.load(str(tmp_path / "missing.npz")) == {}
+    (tmp_path / "broken.npz").write_bytes(b"not a zip")
+    assert snapshot.load(str(tmp_path / "broken.npz")) == {}
+
+
+def test_candle_buffers_restore_and_only_missing_candles_are_fetched(tmp_path):
+    store = CandleStore(feed, timeframe=300, size=20, clock=lambda: 1000 * 300 + 10)
+    store.refresh("EURUSD")
+    path = str(tmp_path / "session.npz")
+    snapshot.save(path, {'candles': store.snapshot()})
+
+    requests = []
+    restored = CandleStore(
+        lambda *args: requests.append(args[2]) or feed(*args), timeframe=300, size=20,
+        clock=lambda: 1002 * 300 + 10,
+    )
+    assert restored.restore(snapshot.load(path)['candles']) == 1
+    assert np.array_equal(restored.buffer("EURUSD").values(), store.buffer("EURUSD").values())
+    restored.refresh("EURUSD")
+    assert requests == [3]
+
+    assert CandleStore(feed, timeframe=60, size=20).restore(snapshot.load(path)['candles']) == 0
+    # Candles newer than the clock (a snapshot from a simulated run) are not restored.
+    assert CandleStore(feed, timeframe=300, size=20, clock=lambda: 0).restore(snapshot.load(path)['candles']) == 0
+
+
+def test_risk_counters_restore_by_asset_name(tmp_path):
+    risk = make_risk(["EURUSD", "GBPUSD"])
+    risk.roll_day(date(2024, 5, 1))
+    risk.register_trade("GBPUSD", False, amount=1)
+    risk.register_trade("GBPUSD", False, amount=2)
+    path = str(tmp_path / "session.npz")
+    snapshot.save(path, {'risk': risk.snapshot()})
+
+    restored = make_risk(["GBPUSD", "USDJPY"])
+    assert restored.restore(snapshot.load(path)['risk']) == 1
+    assert restored.state("GBPUSD") == dict(risk.state("GBPUSD"), open=0)
+    assert restored.next_amount("GBPUSD") == 2
+    assert restored.state("USDJPY")["consecutive_losses"] == 0
+    assert restored.day == date(2024, 5, 1) and restored.daily_pnl == risk.daily_pnl
+
+
+def test_writer_saves_only_after_changes(tmp_path):
+    risk = make_risk(["EURUSD"])
+    risk.roll_day(date(2024, 5, 1))
+    path = tmp_path / "session.npz"
+    writer = snapshot.SnapshotWriter(str(path), {'risk': risk.snapshot, 'session': lambda: snapshot.session("v1")})
+    assert not writer.flush() and not path.exists()
+
+    risk.register_trade("EURUSD", True, amount=1)
+    writer.mark()
+    assert writer.flush() and not writer.flush()
+    restored = make_risk(["EURUSD"])
+    restored.restore(snapshot.load(str(path))['risk'])
+    assert restored.daily_wins == 1 and restored.state("EURUSD")["consecutive_wins"] == 1
+
+    assert not snapshot.SnapshotWriter(None, {'risk': risk.snapshot}).flush(force=True)
+
+
+def test_open_orders_and_processed_candles_survive_restart(tmp_path):
+    release = threading.Event()
+    tracker = OrderTracker(lambda order_id: release.wait(5) and (True, 0.8), clock=lambda: 1000.0)
+    tracker.track("EURUSD", 7, amount=2, direction="call", features={"payout": 0.8, "trend": "up"})
+    tracker.track("GBPUSD", 8, amount=1, direction="put", features={"payout": 0.9}, opened_at=100.0)
+    scheduler = CandleScheduler(300)
+    df = pd.DataFrame({"from": [600.0], "close": [1.1], "volume": [5.0]})
+    assert scheduler.changed("EURUSD", df)
+    path = str(tmp_path / "session.npz")
+    snapshot.save(path, {'orders': tracker.snapshot(), 'scheduler': scheduler.snapshot()})
+    release.set()
+    tracker.close()
+
+    saved = snapshot.load(path)
+    checked, seen = [], []
+    restored = OrderTracker(lambda order_id: checked.append(order_id) or (True, 0.8), on_result=[seen.append])
+    # GBPUSD expired before the restart (opened before *since*), so only EURUSD is tracked again.
+    positions = restored.restore(saved['orders'], since=500.0)
+    assert [(p.asset, p.order_id, p.amount, p.opened_at) for p in positions] == [("EURUSD", 7, 2, 1000.0)]
+    restored.close(wait=True)
+    assert checked == [7] and seen[0].result and seen[0].features == {"payout": 0.8, "trend": "up"}
+
+    restarted = CandleScheduler(300)
+    assert restarted.restore(saved['scheduler']) == 1
+    assert not restarted.changed("EURUSD", df)
+    assert restarted.changed("EURUSD", df.assign(close=[1.2]))
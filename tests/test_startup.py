@@ -0,0 +1,91 @@
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+import bot
+import snapshot
+from replay import SimulatedClock, SimulatedIQOption
+from utils import load_config
+
+
+def test_import_does_not_load_optional_heavy_modules():
+    code = (
+        "import sys, bot; "
+        "print(','.join(m for m in ('sklearn', 'joblib', 'pandas_ta', 'feedparser', 'iqoptionapi', 'replay') if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == ""
+
+
+class CountingClient(SimulatedIQOption):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.counts = []
+
+    def get_candles(self, asset, interval, count, endtime):
+        self.counts.append(count)
+        return super().get_candles(asset, interval, count, endtime)
+
+
+class PartialCandleClient(SimulatedIQOption):
+    """Also returns the candle in progress, with a sliver of volume, as the live API does."""
+
+    def get_candles(self, asset, interval, count, endtime):
+        candles = super().get_candles(asset, interval, count, endtime)
+        start = candles[-1]['from'] + interval
+        if start <= self.clock.time():
+            candles.append(dict(candles[-1], id=candles[-1]['id'] + 1, to=start + interval, volume=0.1, **{'from': start}))
+        return candles[-count:]
+
+
+def start(config, cycles=1, client_class=CountingClient):
+    clock = SimulatedClock(speed=0)
+    client = client_class(config['assets'], clock)
+    started = time.perf_counter()
+    bot.main(config, client=client, clock=clock, started=started, cycles=cycles)
+    return time.perf_counter() - started, client
+
+
+def make_config(tmp_path):
+    config = load_config(str(ROOT / "config.yaml"))
+    config.update(
+        assets=config['assets'][:5], log_file=str(tmp_path / "bot.log"), log_level="warning",
+        trade_journal_file=str(tmp_path / "journal.bin"), ml_online_file=None, history_dir=None,
+        metrics_dump_seconds=0, heartbeat_seconds=0, news_enabled=False, schedule_jitter_seconds=0,
+        snapshot_file=str(tmp_path / "session.npz"),
+    )
+    return config
+
+
+def test_first_decision_within_budget_and_state_survives_restart(tmp_path):
+    config = make_config(tmp_path)
+    elapsed, client = start(config)
+    assert elapsed < config['startup_budget_seconds']
+    assert client.counts == [config['base_buffer_size']] * 5 and (tmp_path / "session.npz").exists()
+
+    _, client = start(config)
+    # Buffers came from the snapshot, so every asset only asked for the newest candles.
+    assert len(client.counts) == 5 and max(client.counts) <= 2
+    saved = snapshot.load(config['snapshot_file'])
+    assert {'candles', 'risk', 'orders', 'scheduler', 'session'} <= set(saved)
+    assert len(saved['scheduler']['assets']) == 5
+
+
+def test_decisions_at_a_close_use_the_closed_candle(tmp_path, monkeypatch):
+    seen = []
+    detect = bot.TechnicalAnalyzer.detect_candlestick_patterns
+
+    def spy(self, df):
+        seen.append((df['from'].iloc[-1], df['volume'].iloc[-1]))
+        return detect(self, df)
+
+    monkeypatch.setattr(bot.TechnicalAnalyzer, "detect_candlestick_patterns", spy)
+    config = make_config(tmp_path)
+    config.update(snapshot_file=None)
+    _, client = start(config, client_class=PartialCandleClient)
+    opened = client.clock.start // config['timeframe_main'] * config['timeframe_main']
+    assert len(seen) == 5
+    assert all(start < opened and volume > 0.1 for start, volume in seen)
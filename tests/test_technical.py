@@ -1,9 +1,11 @@
 import sys
 from pathlib import Path
+import numpy as np
 import pandas as pd
+import pandas_ta
 
 sys.path.append(str(Path(__file__).resolve().parents[1]))
-from technical import TechnicalAnalyzer
+from technical import TechnicalAnalyzer, _supertrend
 
 
 def test_breakout_repeated_level():
@@ -28,3 +30,12 @@ def test_no_breakout_without_touches():
         'volume':[1]*4,
     })
     assert ta.detect_breakout(df, lookback=4) is None
+
+
+def test_supertrend_matches_pandas_ta():
+    rng = np.random.default_rng(0)
+    close = pd.Series(1.1 + np.cumsum(rng.normal(0, 0.0008, 1000)))
+    high = close + rng.uniform(0, 0.0005, 1000)
+    low = close - rng.uniform(0, 0.0005, 1000)
+    expected = pandas_ta.supertrend(high, low, close, length=10, multiplier=3).iloc[:, 0]
+    np.testing.assert_array_equal(_supertrend(high, low, close).to_numpy(), expected.to_numpy())
@@ -0,0 +1,115 @@
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from trade_journal import RECORD, TradeJournal
+
+ROOT = Path(__file__).resolve().parents[1]
+FEATURES = {
+    "pattern_name": "cdl_hammer", "breakout": "none", "trend": "up", "volume_ratio": 1.5,
+    "payout": 0.85, "ema_cross": True, "rsi7": 55.0, "macd_hist": 1e-5, "adx14": 22.0, "atr14": 2e-4,
+}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_append_is_buffered_and_does_not_modify_features(tmp_path):
+    clock = FakeClock()
+    journal = TradeJournal(str(tmp_path / "j.bin"), batch_size=3, flush_seconds=10, clock=clock)
+    features = dict(FEATURES)
+    journal.append(features, True)
+    journal.append(features, False)
+    assert features == FEATURES
+    assert not (tmp_path / "j.bin").exists()
+
+    journal.append(features, True)
+    assert (tmp_path / "j.bin").stat().st_size == 3 * RECORD.itemsize
+
+    journal.append(features, False)
+    clock.now = 11
+    journal.flush_if_due()
+    assert (tmp_path / "j.bin").stat().st_size == 4 * RECORD.itemsize
+
+
+def test_read_returns_time_range_only(tmp_path):
+    journal = TradeJournal(str(tmp_path / "j.bin"), batch_size=100)
+    start = datetime(2025, 6, 1)
+    for day in range(30):
+        journal.append(FEATURES, day % 2 == 0, timestamp=start + timedelta(days=day))
+
+    df = journal.read(since=start + timedelta(days=23))
+    assert len(df) == 7
+    assert df["timestamp"].iloc[0] == start + timedelta(days=23)
+    assert list(df["result"]) == [0, 1, 0, 1, 0, 1, 0]
+    assert df["pattern_name"].iloc[0] == "cdl_hammer"
+    assert isinstance(journal.records(since=start), np.memmap)
+
+
+def test_timestamps_are_utc_across_a_dst_fall_back(tmp_path):
+    journal = TradeJournal(str(tmp_path / "j.bin"), batch_size=100)
+    summer, winter = timezone(timedelta(hours=-4)), timezone(timedelta(hours=-5))
+    # Local wall clock 01:30 twice: before (UTC-4) and after (UTC-5) the clocks go back.
+    times = [
+        datetime(2025, 11, 2, 1, 0, tzinfo=summer), datetime(2025, 11, 2, 1, 30, tzinfo=summer),
+        datetime(2025, 11, 2, 1, 10, tzinfo=winter), datetime(2025, 11, 2, 1, 30, tzinfo=winter),
+    ]
+    for i, timestamp in enumerate(times):
+        journal.append(FEATURES, i % 2 == 0, timestamp=timestamp)
+    df = journal.read()
+    assert df["timestamp"].is_monotonic_increasing
+    assert df["timestamp"].iloc[2] == datetime(2025, 11, 2, 6, 10)
+    assert len(journal.read(since=datetime(2025, 11, 2, 1, 20, tzinfo=winter))) == 1
+    assert len(journal.read(since=datetime(2025, 11, 2, 1, 20, tzinfo=summer))) == 3
+
+    journal.append(FEATURES, True)
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    assert abs(journal.read()["timestamp"].iloc[-1] - now) < timedelta(minutes=1)
+
+
+def test_torn_tail_is_ignored_and_repaired(tmp_path):
+    path = tmp_path / "j.bin"
+    journal = TradeJournal(str(path), batch_size=1)
+    journal.append(FEATURES, True)
+    with open(path, "ab") as file:
+        file.write(b"\x01" * 7)
+    assert len(journal.read()) == 1
+
+    journal.append(FEATURES, False)
+    assert list(journal.read()["result"]) == [1, 0]
+
+
+def test_import_converts_local_csv_times_to_utc(tmp_path, monkeypatch):
+    monkeypatch.setenv("TZ", "EST5EDT,M3.2.0,M11.1.0")
+    time.tzset()
+    try:
+        legacy = pd.read_csv(ROOT / "trade_data.csv").head(2)
+        legacy["timestamp"] = ["2025-07-01 12:00:00.250000", "2025-12-01 12:00:00"]
+        legacy.to_csv(tmp_path / "legacy.csv", index=False)
+        journal = TradeJournal(str(tmp_path / "j.bin"))
+        journal.import_csv(str(tmp_path / "legacy.csv"))
+        assert list(journal.read()["timestamp"]) == [
+            pd.Timestamp("2025-07-01 16:00:00.250000"), pd.Timestamp("2025-12-01 17:00:00"),
+        ]
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+
+
+def test_import_legacy_csv(tmp_path):
+    journal = TradeJournal(str(tmp_path / "j.bin"))
+    imported = journal.import_csv(str(ROOT / "trade_data.csv"))
+    df = journal.read()
+    assert imported == len(df) == 80
+    assert df["timestamp"].is_monotonic_increasing
+    assert set(df["trend"]) <= {"up", "down", "flat"}
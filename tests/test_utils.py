@@ -1,8 +1,12 @@
+import json
 import sys
 from pathlib import Path
 
+import pytest
+
 sys.path.append(str(Path(__file__).resolve().parents[1]))
-from utils import load_config, entry_strength
+import utils
+from utils import configure_logging, entry_strength, load_config, log, log_enabled
 
 
 def test_env_override(tmp_path, monkeypatch):
@@ -36,4 +40,53 @@ items:
     c = load_config(str(cfg))
     assert c["threshold"] == 10
     assert c["active"] is True
-    assert c["items"] == ["a", "b"]
\ No newline at end of file
+    assert c["items"] == ["a", "b"]
+
+@pytest.fixture
+def log_file(tmp_path):
+    path = tmp_path / "bot.log"
+    yield path
+    utils._stop_listener()
+    utils._LOGGER = None
+
+
+def read_log(path):
+    utils._stop_listener()
+    return path.read_text(encoding="utf-8").splitlines()
+
+
+def test_json_lines_with_asset_and_stage(log_file):
+    configure_logging({"log_file": str(log_file), "log_format": "json", "log_console": False})
+    log("[%s] Entrando %s", "EURUSD", "call", asset="EURUSD", stage="decision")
+    log("sem campos", level="error")
+    first, second = (json.loads(line) for line in read_log(log_file))
+    assert first["message"] == "[EURUSD] Entrando call"
+    assert first["asset"] == "EURUSD" and first["stage"] == "decision"
+    assert second["level"] == "ERROR" and "asset" not in second
+
+
+def test_filtered_messages_are_not_formatted(log_file):
+    configure_logging({"log_file": str(log_file), "log_console": False, "log_level": "info"})
+    formatted = []
+
+    class Expensive:
+        def __init__(self, name):
+            self.name = name
+
+        def __str__(self):
+            formatted.append(self.name)
+            return "x"
+
+    log("debug %s", Expensive("debug"), level="debug")
+    assert not log_enabled("debug")
+    log("info %s", Expensive("info"))
+    assert read_log(log_file)[-1].endswith("info x")
+    assert "debug" not in formatted and "info" in formatted
+
+
+def test_rotation_is_configurable(log_file):
+    configure_logging({"log_file": str(log_file), "log_console": False, "log_max_bytes": 2000, "log_backup_count": 2})
+    for i in range(200):
+        log("mensagem número %d com algum texto para encher o arquivo", i)
+    read_log(log_file)
+    assert sorted(p.name for p in log_file.parent.iterdir()) == ["bot.log", "bot.log.1", "bot.log.2"]
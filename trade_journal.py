@@ -0,0 +1,181 @@
+"""Append-only binary journal of trade features and outcomes.
+
+Trades are fixed-size NumPy records (:data:`RECORD`) appended in time
+order, so the journal can be memory-mapped and a time range found with a
+binary search on ``timestamp`` instead of parsing the whole file. Appends
+are buffered and written in batches; a record torn by a crash is ignored
+on read and truncated before the next write. Timestamps are stored in UTC,
+so they stay monotonic (and the search valid) across DST changes.
+"""
+
+import atexit
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+# Field order matches the columns of the legacy ``trade_data.csv``.
+RECORD = np.dtype([
+    ('pattern_name', 'S32'),
+    ('breakout', 'S16'),
+    ('trend', 'S8'),
+    ('volume_ratio', '<f8'),
+    ('payout', '<f8'),
+    ('ema_cross', '?'),
+    ('rsi7', '<f8'),
+    ('macd_hist', '<f8'),
+    ('adx14', '<f8'),
+    ('atr14', '<f8'),
+    ('timestamp', '<M8[us]'),
+    ('result', 'i1'),
+])
+TEXT_FIELDS = tuple(name for name in RECORD.names if RECORD[name].kind == 'S')
+_DEFAULTS = {'pattern_name': 'unknown', 'breakout': 'none', 'trend': 'flat'}
+
+
+def _local_to_utc(stamps) -> np.ndarray:
+    """Convert naive local-time timestamps to naive UTC ``datetime64[us]`` with the host's DST rules."""
+    seconds = [time.mktime(t.timetuple()) + t.microsecond / 1e6 for t in stamps]
+    return np.round(np.array(seconds, dtype=float) * 1e6).astype('int64').astype('datetime64[us]')
+
+
+def _utc(value) -> np.datetime64:
+    """Convert *value* to the journal's naive UTC time; naive datetimes are taken as UTC."""
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return np.datetime64(value, 'us')
+
+
+class TradeJournal:
+    """Buffered writer and time-indexed reader for a trade journal file.
+
+    Records are written once ``batch_size`` trades are pending or
+    ``flush_seconds`` have passed since the last write (checked on every
+    :py:meth:`append` and :py:meth:`flush_if_due`). Written data is
+    ``fsync``-ed at most every ``fsync_seconds`` and always on
+    :py:meth:`close`, which also runs at interpreter exit.
+    """
+
+    def __init__(
+        self,
+        path: str = 'trade_journal.bin',
+        batch_size: int = 16,
+        flush_seconds: float = 5.0,
+        fsync_seconds: float = 30.0,
+        clock=time.monotonic,
+    ):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.fsync_seconds = fsync_seconds
+        self.clock = clock
+        self._pending = []
+        self._lock = threading.Lock()
+        self._last_flush = self._last_fsync = clock()
+        atexit.register(self.close)
+
+    def __len__(self) -> int:
+        return self._stored_count() + len(self._pending)
+
+    def _stored_count(self) -> int:
+        try:
+            return os.path.getsize(self.path) // RECORD.itemsize
+        except FileNotFoundError:
+            return 0
+
+    def append(self, features: dict, result: bool, timestamp: datetime = None) -> None:
+        """Queue one trade (at *timestamp*, default now, in UTC); *features* is copied, never modified."""
+        record = np.zeros((), dtype=RECORD)
+        for name in RECORD.names:
+            if name in TEXT_FIELDS:
+                record[name] = str(features.get(name) or _DEFAULTS[name]).encode()
+            elif name not in ('timestamp', 'result'):
+                record[name] = features.get(name, 0)
+        record['timestamp'] = _utc(timestamp or datetime.now(timezone.utc))
+        record['result'] = int(result)
+        with self._lock:
+            self._pending.append(record)
+            due = len(self._pending) >= self.batch_size
+        if due:
+            self.flush()
+        else:
+            self.flush_if_due()
+
+    def flush_if_due(self) -> None:
+        """Write pending trades if ``flush_seconds`` elapsed since the last write."""
+        if self._pending and self.clock() - self._last_flush >= self.flush_seconds:
+            self.flush()
+
+    def flush(self, sync: bool = False) -> None:
+        """Write pending trades; ``fsync`` when *sync* or ``fsync_seconds`` elapsed."""
+        with self._lock:
+            now = self.clock()
+            self._last_flush = now
+            if not self._pending and not sync:
+                return
+            records = np.array(self._pending, dtype=RECORD)
+            with open(self.path, 'ab') as file:
+                torn = file.tell() % RECORD.itemsize
+                if torn:
+                    file.truncate(file.tell() - torn)
+                file.write(records.tobytes())
+                file.flush()
+                if sync or now - self._last_fsync >= self.fsync_seconds:
+                    os.fsync(file.fileno())
+                    self._last_fsync = now
+            self._pending = []
+
+    def close(self) -> None:
+        """Flush and ``fsync`` pending trades."""
+        if self._pending:
+            self.flush(sync=True)
+
+    def records(self, since=None, until=None) -> np.ndarray:
+        """Return the records with ``since <= timestamp < until`` (memory-mapped when possible).
+
+        Aware datetimes are compared in UTC, naive ones are taken as UTC.
+
+        Pending trades are written first. The range is located by binary
+        search, so only the selected part of the file is read.
+        """
+        self.flush()
+        count = self._stored_count()
+        if count == 0:
+            return np.zeros(0, dtype=RECORD)
+        records = np.memmap(self.path, dtype=RECORD, mode='r', shape=(count,))
+        times = records['timestamp']
+        lo = 0 if since is None else np.searchsorted(times, _utc(since), side='left')
+        hi = count if until is None else np.searchsorted(times, _utc(until), side='left')
+        return records[lo:hi]
+
+    def read(self, since=None, until=None) -> pd.DataFrame:
+        """Return :py:meth:`records` as a DataFrame with text fields decoded."""
+        records = self.records(since, until)
+        frame = pd.DataFrame({name: records[name] for name in RECORD.names})
+        for name in TEXT_FIELDS:
+            frame[name] = frame[name].str.decode('utf-8')
+        return frame
+
+    def import_csv(self, csv_path: str) -> int:
+        """Append the trades of a legacy ``trade_data.csv``; return how many were imported.
+
+        The CSV was written with local ``datetime.now()``, so its timestamps
+        are converted from the host's local time to UTC.
+        """
+        df = pd.read_csv(csv_path)
+        # str(datetime) omits the microseconds when they are zero, so formats are mixed.
+        df['timestamp'] = _local_to_utc(pd.to_datetime(df['timestamp'], format='ISO8601'))
+        df = df.sort_values('timestamp', kind='stable')
+        records = np.zeros(len(df), dtype=RECORD)
+        for name in RECORD.names:
+            if name in TEXT_FIELDS:
+                records[name] = df[name].fillna(_DEFAULTS[name]).astype(str).str.encode('utf-8')
+            elif name in df:
+                records[name] = df[name].to_numpy()
+        with self._lock:
+            self._pending.extend(records)
+        self.flush(sync=True)
+        return len(records)
@@ -1,31 +1,106 @@
-"""Utility functions for logging and configuration."""
-
+"""Utility functions for logging and configuration.
+
+Log records are put on a queue by :func:`log` and written to the rotating
+file and the console by a :class:`logging.handlers.QueueListener` thread,
+so the trading loop never waits for disk or terminal I/O. Messages may use
+``%``-style placeholders with *args*; they are only merged (on the listener
+thread) if the level is enabled, so arguments must not be mutated after the
+call. With ``log_format: json`` every record is one JSON line carrying the
+optional ``asset`` and ``stage`` fields.
+"""
+
+import atexit
+import json
 import logging
-from logging.handlers import RotatingFileHandler
 import os
+import queue
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
 import yaml
 
 _LOGGER = None
-
-
-def _setup_logger(log_file: str = "bot.log") -> logging.Logger:
-    """Create and configure a rotating file logger."""
+_LISTENER = None
+_LEVELS = {
+    "debug": logging.DEBUG, "info": logging.INFO, "warning": logging.WARNING,
+    "error": logging.ERROR, "critical": logging.CRITICAL,
+}
+_TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+
+class JsonFormatter(logging.Formatter):
+    """Format a record as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "message": record.getMessage(),
+        }
+        for field in ("asset", "stage"):
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _LazyQueueHandler(QueueHandler):
+    """Queue the record as is; the listener thread does all the formatting."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def _setup_logger(
+    log_file: str = "bot.log",
+    max_bytes: int = 1024 * 1024,
+    backup_count: int = 3,
+    log_format: str = "text",
+    level: str = "info",
+    console: bool = True,
+) -> logging.Logger:
+    """(Re)configure the ``bot`` logger to write through a background queue listener."""
+    global _LISTENER
     logger = logging.getLogger("bot")
-    if logger.handlers:
-        return logger
+    if _LISTENER is not None:
+        _LISTENER.stop()
+        _LISTENER = None
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+
+    logger.setLevel(_LEVELS.get(str(level).lower(), logging.INFO))
+    logger.propagate = False
+    formatter = JsonFormatter() if log_format == "json" else logging.Formatter(_TEXT_FORMAT)
+
+    handlers = []
+    if log_file:
+        file_handler = RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+    if console:
+        stream = logging.StreamHandler()
+        stream.setFormatter(logging.Formatter(_TEXT_FORMAT))
+        handlers.append(stream)
+
+    records = queue.SimpleQueue()
+    logger.addHandler(_LazyQueueHandler(records))
+    _LISTENER = QueueListener(records, *handlers, respect_handler_level=True)
+    _LISTENER.start()
+    return logger
 
-    logger.setLevel(logging.INFO)
-    formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
 
-    file_handler = RotatingFileHandler(log_file, maxBytes=1024 * 1024, backupCount=3)
-    file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
+def _stop_listener() -> None:
+    """Write out the queued records and stop the listener thread."""
+    global _LISTENER
+    if _LISTENER is not None:
+        _LISTENER.stop()
+        _LISTENER = None
 
-    console = logging.StreamHandler()
-    console.setFormatter(formatter)
-    logger.addHandler(console)
 
-    return logger
+atexit.register(_stop_listener)
 
 
 def get_logger() -> logging.Logger:
@@ -36,10 +111,35 @@ def get_logger() -> logging.Logger:
     return _LOGGER
 
 
-def log(message: str, level: str = "info") -> None:
-    """Log *message* with the specified severity *level*."""
-    logger = get_logger()
-    getattr(logger, level.lower())(message)
+def configure_logging(config: dict) -> logging.Logger:
+    """Apply the ``log_*`` settings of *config* to the shared logger."""
+    global _LOGGER
+    _LOGGER = _setup_logger(
+        log_file=config.get("log_file", "bot.log"),
+        max_bytes=config.get("log_max_bytes", 1024 * 1024),
+        backup_count=config.get("log_backup_count", 3),
+        log_format=config.get("log_format", "text"),
+        level=config.get("log_level", "info"),
+        console=config.get("log_console", True),
+    )
+    return _LOGGER
+
+
+def log_enabled(level: str = "debug") -> bool:
+    """Return ``True`` if messages of *level* would be written (to skip building them otherwise)."""
+    return get_logger().isEnabledFor(_LEVELS[level.lower()])
+
+
+def log(message: str, *args, level: str = "info", asset=None, stage=None) -> None:
+    """Log *message* (``%``-formatted with *args*, lazily) with the specified severity *level*."""
+    logger = _LOGGER or get_logger()
+    levelno = _LEVELS[level.lower()]
+    if not logger.isEnabledFor(levelno):
+        return
+    extra = None
+    if asset is not None or stage is not None:
+        extra = {"asset": asset, "stage": stage}
+    logger.log(levelno, message, *args, extra=extra)
 
 
 def load_config(path: str = "config.yaml") -> dict:
@@ -52,12 +152,90 @@ def load_config(path: str = "config.yaml") -> dict:
     return config
 
 
-def entry_strength(confluence_count: int) -> str:
+# Minimum confluence count for each entry strength, strongest first.
+STRENGTH_LEVELS = ((7, "forte"), (5, "media"), (3, "fraca"))
+
+
+def entry_strength(confluence_count: int, levels=STRENGTH_LEVELS) -> str:
     """Classify entry strength based on the number of confluences."""
-    if confluence_count >= 7:
-        return "forte"
-    if confluence_count >= 5:
-        return "media"
-    if confluence_count >= 3:
-        return "fraca"
-    return "nenhuma"
\ No newline at end of file
+    for minimum, strength in levels:
+        if confluence_count >= minimum:
+            return strength
+    return "nenhuma"
+
+
+def load_asset_overrides(path: str) -> dict:
+    """Return the per-asset settings written by ``optimizer.py`` (``{}`` without a file).
+
+    ``strength_levels`` (``[forte, media, fraca]`` minimums) is turned into
+    the *levels* of :func:`entry_strength`.
+    """
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as file:
+        overrides = json.load(file)
+    names = [name for _, name in STRENGTH_LEVELS]
+    for settings in overrides.values():
+        if "strength_levels" in settings:
+            settings["strength_levels"] = tuple(zip(settings["strength_levels"], names))
+    return overrides
+
+
+def benchmark(messages: int = 20000, directory: str = ".") -> dict:
+    """Mean cost (seconds) per call on the caller's thread: synchronous handlers vs the queue pipeline.
+
+    ``debug_*`` entries are filtered-out debug messages built with an
+    f-string (old call style) or passed lazily; ``info_*`` entries are
+    written messages.
+    """
+    signals = {"breakout": "breakout_up", "pattern": "cdlengulfing", "volume_ratio": 1.37, "trend": "up"}
+    path = os.path.join(directory, "log_benchmark.log")
+
+    sync = logging.getLogger("bot.benchmark.sync")
+    sync.propagate = False
+    sync.setLevel(logging.INFO)
+    handler = RotatingFileHandler(path, maxBytes=1024 * 1024, backupCount=1, encoding="utf-8")
+    handler.setFormatter(logging.Formatter(_TEXT_FORMAT))
+    sync.addHandler(handler)
+
+    def mean(fn):
+        start = time.perf_counter()
+        for _ in range(messages):
+            fn()
+        return (time.perf_counter() - start) / messages
+
+    result = {
+        "debug_fstring": mean(lambda: sync.debug(f"[EURUSD] Debug signals: {signals}")),
+        "debug_lazy": mean(lambda: log("[%s] Debug signals: %s", "EURUSD", signals, level="debug")),
+        "info_sync": mean(lambda: sync.info(f"[EURUSD] Debug signals: {signals}")),
+    }
+    sync.removeHandler(handler)
+    handler.close()
+
+    queued = logging.getLogger("bot.benchmark.queue")
+    queued.propagate = False
+    queued.setLevel(logging.INFO)
+    handler = RotatingFileHandler(path, maxBytes=1024 * 1024, backupCount=1, encoding="utf-8")
+    handler.setFormatter(logging.Formatter(_TEXT_FORMAT))
+    records = queue.SimpleQueue()
+    queued.addHandler(_LazyQueueHandler(records))
+    listener = QueueListener(records, handler)
+    listener.start()
+    try:
+        result["info_queue"] = mean(lambda: queued.info("[%s] Debug signals: %s", "EURUSD", signals))
+    finally:
+        listener.stop()
+        queued.handlers.clear()
+        handler.close()
+    for name in os.listdir(directory):
+        if name.startswith("log_benchmark.log"):
+            os.remove(os.path.join(directory, name))
+    return result
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, seconds in benchmark(directory=tmp).items():
+            print(f"{name:14s} {seconds * 1e6:8.2f} µs/chamada")